@@ -0,0 +1,192 @@
+"""
+Overload Protection
+Admission control for crew runs and a circuit breaker for the LLM
+
+- AdmissionController: at most MAX_IN_FLIGHT analyses run at once and at
+  most MAX_WAITING wait for a slot; anyone beyond that is turned away
+  straight away instead of piling up behind Ollama.
+- CircuitBreaker: after BREAKER_FAILURES LLM errors or timeouts in a row
+  the breaker opens and analyses skip the LLM for BREAKER_RESET_SECONDS.
+  Then one trial run is let through; if it works the breaker closes.
+
+In both cases callers answer with the deterministic database result
+(flagged as degraded) instead of an error.
+"""
+import asyncio
+import os
+import threading
+import time
+
+from telemetry import record_admission, record_breaker_transition
+
+# Settings (environment variables override the defaults)
+MAX_IN_FLIGHT = int(os.environ.get("ALLERPREDICT_MAX_IN_FLIGHT", "4"))
+MAX_WAITING = int(os.environ.get("ALLERPREDICT_MAX_WAITING", "16"))
+ADMISSION_WAIT_SECONDS = float(os.environ.get("ALLERPREDICT_ADMISSION_WAIT_SECONDS", "30"))
+BREAKER_FAILURES = int(os.environ.get("ALLERPREDICT_BREAKER_FAILURES", "3"))
+BREAKER_RESET_SECONDS = float(os.environ.get("ALLERPREDICT_BREAKER_RESET_SECONDS", "30"))
+
+# Longest one LLM call (and one whole async analysis) may take
+LLM_TIMEOUT_SECONDS = int(os.environ.get("ALLERPREDICT_LLM_TIMEOUT_SECONDS", "120"))
+
+
+class Overloaded(Exception):
+    """Raised when no analysis slot is free and the waiting line is full"""
+
+
+class AdmissionController:
+    """
+    Bounded in-flight limit with a bounded waiting line (async)
+
+    Usage:
+        async with controller.slot():
+            ...run the crew...
+
+    Args:
+        max_in_flight: Analyses allowed to run at once
+        max_waiting: Requests allowed to wait for a slot
+        wait_seconds: Longest a request waits before it is turned away
+    """
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, max_waiting=MAX_WAITING,
+                 wait_seconds=ADMISSION_WAIT_SECONDS):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_waiting = max(0, max_waiting)
+        self.wait_seconds = wait_seconds
+        self.slots = asyncio.Semaphore(self.max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+
+    def slot(self):
+        """Async context manager holding one analysis slot"""
+        return _Slot(self)
+
+    async def acquire(self):
+        # Free slot: take it without queueing
+        if self.in_flight < self.max_in_flight and not self.waiting:
+            await self.slots.acquire()
+            self.in_flight += 1
+            record_admission("admitted")
+            return
+
+        if self.waiting >= self.max_waiting:
+            record_admission("rejected")
+            raise Overloaded(f"{self.in_flight} analyses running and {self.waiting} waiting")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.slots.acquire(), timeout=self.wait_seconds)
+        except asyncio.TimeoutError:
+            record_admission("timed_out")
+            raise Overloaded(f"No analysis slot free after {self.wait_seconds:.0f}s")
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        record_admission("admitted")
+
+    def release(self):
+        self.in_flight -= 1
+        self.slots.release()
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_waiting": self.max_waiting,
+        }
+
+
+class _Slot:
+    def __init__(self, controller):
+        self.controller = controller
+
+    async def __aenter__(self):
+        await self.controller.acquire()
+
+    async def __aexit__(self, *exc_info):
+        self.controller.release()
+
+
+class CircuitBreaker:
+    """
+    Stops calling the LLM after repeated failures (thread-safe)
+
+    States:
+        closed: normal, every call goes to the LLM
+        open: calls skip the LLM until reset_seconds have passed
+        half_open: one trial call is allowed; its result decides
+
+    Args:
+        failure_threshold: Consecutive failures that open the breaker
+        reset_seconds: How long the breaker stays open
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURES, reset_seconds=BREAKER_RESET_SECONDS):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_running = False
+        self.last_error = ""
+
+    def allow(self):
+        """
+        May the next call use the LLM?
+
+        Returns:
+            bool: False while the breaker is open
+        """
+        with self.lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self._set_state("half_open")
+
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.trial_running = False
+            if self.state != "closed":
+                self._set_state("closed")
+
+    def record_failure(self, error=""):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            self.last_error = str(error)
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state("open")
+
+    def release_trial(self):
+        """The trial call ended without a verdict (e.g. it was cancelled)"""
+        with self.lock:
+            self.trial_running = False
+
+    def stats(self):
+        with self.lock:
+            retry_in = 0.0
+            if self.state == "open":
+                retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "retry_in_seconds": round(retry_in, 1),
+                "last_error": self.last_error,
+            }
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        print(f"🔌 LLM circuit breaker: {self.state} -> {state}")
+        self.state = state
+        record_breaker_transition(state)
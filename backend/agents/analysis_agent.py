@@ -2,9 +2,18 @@
 Simplified Analysis Agent
 Clear, easy-to-understand AI agent for product safety analysis
 """
+import os
 from crewai import Agent
 from langchain_community.llms import Ollama
 
+from admission import LLM_TIMEOUT_SECONDS
+
+# Where the Ollama server runs (point at a stub server for benchmarks)
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+
+# Ollama model every agent uses
+LLM_MODEL = "mistral"
+
 class SafetyAnalysisAgent:
     """
     Creates and manages the Product Safety Analyst agent
@@ -24,8 +33,10 @@ class SafetyAnalysisAgent:
         """
         # Create AI language model
         ai_model = Ollama(
-            model="mistral",
-            temperature=0.3  # Lower temperature = more focused and accurate
+            model=LLM_MODEL,
+            base_url=OLLAMA_BASE_URL,
+            temperature=0.3,  # Lower temperature = more focused and accurate
+            timeout=LLM_TIMEOUT_SECONDS  # A hung Ollama counts as a failure
         )
         
         return Agent(
@@ -84,8 +95,10 @@ YOUR REPORT MUST INCLUDE:
 - Product category
 
 ⚠️ ALLERGEN INFORMATION
-- List EVERY allergen found (be complete and accurate)
-- If no allergens: clearly state "No allergens detected"
+- Copy the tool's "allergens" (or "Detected Allergens") list exactly (it already includes
+  allergens found in the ingredients); do not add or remove allergens
+- If the tool says "allergens: none": clearly state "No allergens detected"
+- Mention any "may_contain" (traces) allergens separately
 - Explain what each allergen means
 
 📊 RISK ASSESSMENT
@@ -115,6 +128,133 @@ A complete safety report with:
 """
         }
 
+    
+    @staticmethod
+    def create_risk_task(agent, product_name, facts):
+        """
+        Allergen and risk part of the parallel pipeline
+        
+        The database facts are already in the prompt, so the agent does
+        not need a tool call first.
+        
+        Args:
+            agent: The safety analyst agent
+            product_name: Product (and any user note)
+            facts: The analysis tool's report for the product
+            
+        Returns:
+            dict: Task configuration
+        """
+        return {
+            "description": f"""
+TASK: Explain the allergens and risk of: "{product_name}"
+
+DATABASE FACTS (already looked up, do not search again):
+{facts}
+
+YOUR REPORT MUST INCLUDE:
+
+✅ PRODUCT IDENTIFICATION
+- Exact product name, brand and category
+
+⚠️ ALLERGEN INFORMATION
+- Copy the "allergens" list exactly; do not add or remove allergens
+- If it says "allergens: none": clearly state "No allergens detected"
+- Mention any "may_contain" (traces) allergens separately
+- Explain what each allergen means
+
+📊 RISK ASSESSMENT
+- Risk level: Low, Medium, or High
+- Explain WHY this risk level was assigned
+
+⚠️ IMPORTANT RULES:
+- Do NOT make up information
+- If the product was not found, say so clearly
+""",
+            
+            "expected_output": """
+A short safety report with:
+1. Product identification (name, brand, category)
+2. Complete allergen list with explanations
+3. Risk level with clear reasoning
+"""
+        }
+
+
+class EthicsAnalysisAgent:
+    """
+    Creates the Ethics Analyst agent (parallel pipeline only)
+    Explains the ethical score while the safety report is being written
+    """
+    
+    @staticmethod
+    def create():
+        """
+        Create the ethics analyst agent
+        
+        Returns:
+            Agent: Configured ethics analyst
+        """
+        ai_model = Ollama(
+            model=LLM_MODEL,
+            base_url=OLLAMA_BASE_URL,
+            temperature=0.3,
+            timeout=LLM_TIMEOUT_SECONDS
+        )
+        
+        return Agent(
+            role="Ethics Analyst",
+            
+            goal="Explain how ethical a product and its brand are, based only on the facts given",
+            
+            backstory="""You review food brands for fair labor, sustainability and honesty.
+
+You always:
+1. Base your assessment on the facts you are given
+2. Name concrete concerns and positive factors
+3. Say clearly when there is little information""",
+            
+            verbose=True,
+            allow_delegation=False,
+            llm=ai_model
+        )
+    
+    @staticmethod
+    def create_task(agent, product_name, facts):
+        """
+        Ethical assessment part of the parallel pipeline
+        
+        Args:
+            agent: The ethics analyst agent
+            product_name: Product (and any user note)
+            facts: The analysis tool's report for the product
+            
+        Returns:
+            dict: Task configuration
+        """
+        return {
+            "description": f"""
+TASK: Assess the ethics of: "{product_name}"
+
+DATABASE FACTS:
+{facts}
+
+YOUR ASSESSMENT MUST INCLUDE:
+
+🌍 ETHICAL INFORMATION
+- The "ethical_score" (0-100), copied exactly
+- What the "ethical_notes" mean for the buyer
+- Any concerns or positive factors
+
+⚠️ IMPORTANT RULES:
+- Do NOT make up information
+- If there are no ethical notes, say so
+""",
+            
+            "expected_output": """
+A short ethical assessment with the score and its explanation
+"""
+        }
 
 class RecommendationAgent:
     """
@@ -131,8 +271,10 @@ class RecommendationAgent:
             Agent: Configured recommendation specialist
         """
         ai_model = Ollama(
-            model="mistral",
-            temperature=0.5  # Slightly creative for recommendations
+            model=LLM_MODEL,
+            base_url=OLLAMA_BASE_URL,
+            temperature=0.5,  # Slightly creative for recommendations
+            timeout=LLM_TIMEOUT_SECONDS
         )
         
         return Agent(
@@ -217,4 +359,54 @@ A helpful recommendation report with:
 3. Practical shopping tips
 4. Final recommendation and rating
 """
-        }
\ No newline at end of file
+        }
+    
+    @staticmethod
+    def create_ranking_task(agent, product_name, facts):
+        """
+        Alternatives part of the parallel pipeline
+        
+        Works from the database facts (allergens, risk and listed
+        alternatives), so it does not wait for the safety report.
+        
+        Args:
+            agent: The recommendation agent
+            product_name: Product (and any user note)
+            facts: The analysis tool's report for the product
+            
+        Returns:
+            dict: Task configuration
+        """
+        return {
+            "description": f"""
+TASK: Recommend alternatives to: "{product_name}"
+
+DATABASE FACTS:
+{facts}
+
+YOUR RECOMMENDATIONS MUST INCLUDE:
+
+💡 ALTERNATIVE PRODUCTS (2-4 suggestions)
+- Rank the products listed under "alternatives" first, best first
+- For each alternative, explain why it is safer or more ethical
+
+🛒 SHOPPING TIPS
+- What to look for on labels, given the "allergens" and "may_contain" lists
+
+✅ FINAL RECOMMENDATION
+- Should they avoid this product? (Yes/No/With Caution)
+- Overall safety rating (1-5 stars)
+- One-sentence summary
+
+⚠️ IMPORTANT RULES:
+- Be specific with product names when possible
+- If no alternatives are listed, give general guidance
+""",
+            
+            "expected_output": """
+A recommendation report with:
+1. 2-4 ranked alternative products with explanations
+2. Practical shopping tips
+3. Final recommendation and rating
+"""
+        }
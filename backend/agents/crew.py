@@ -1,34 +1,122 @@
 """
 Simplified Crew Manager
-Coordinates the two AI agents to analyze products
+Coordinates the AI agents to analyze products
 """
+import asyncio
+import os
+import threading
+import time
 from crewai import Crew, Task, Process
 from typing import Dict, Any
 
+from admission import CircuitBreaker, LLM_TIMEOUT_SECONDS
+from reports import ReportStore, content_hash, product_id
+from agents.pipeline import StageClock, run_dag
+from agents.schemas import ProductReport
+from rag.report_format import estimate_tokens, format_report, TOOL_OUTPUT_FORMAT
+from telemetry import stage, record_degraded, record_llm_tokens, record_tool_output
+
+# How the agents run (ALLERPREDICT_PIPELINE):
+# - dag: allergen/risk, ethics and alternatives run in parallel (default)
+# - sequential: safety analyst, then recommendation specialist (the baseline)
+PIPELINE_MODES = ("dag", "sequential")
+PIPELINE_MODE = os.environ.get("ALLERPREDICT_PIPELINE", "dag")
+if PIPELINE_MODE not in PIPELINE_MODES:
+    PIPELINE_MODE = "dag"
+
+# Pipeline stages reported to progress callbacks, per mode
+PIPELINE_STAGES = {
+    "sequential": ("retrieval", "safety_agent", "recommendation_agent"),
+    "dag": ("retrieval", "allergen_risk", "ethics", "alternatives", "merge"),
+}
+
+
+TOKEN_KEYS = ("prompt_tokens", "completion_tokens", "total_tokens")
+
+
+def agent_token_usage(agent):
+    """
+    Tokens an agent has used so far
+
+    CrewAI keeps one running total per agent (agent._token_process), so
+    the tokens of one stage are the difference before and after it.
+
+    Returns:
+        dict: prompt_tokens, completion_tokens, total_tokens
+    """
+    process = getattr(agent, "_token_process", None)
+    summary = process.get_summary() if process is not None else None
+    if summary is None:
+        return dict.fromkeys(TOKEN_KEYS, 0)
+    if not isinstance(summary, dict):
+        summary = {key: getattr(summary, key, 0) for key in TOKEN_KEYS}
+    return {key: int(summary.get(key) or 0) for key in TOKEN_KEYS}
+
+
+def token_delta(agent, before, stage_name):
+    """
+    Tokens an agent used since `before` (and record them for a stage)
+
+    Returns:
+        dict: prompt_tokens, completion_tokens, total_tokens
+    """
+    after = agent_token_usage(agent)
+    usage = {key: after[key] - before[key] for key in TOKEN_KEYS}
+    record_llm_tokens(usage, stage_name)
+    return usage
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside a running analysis when the caller cancelled it"""
+
+
 class ProductAnalysisCrew:
     """
     Manages the team of AI agents that analyze products
     Simple and reliable workflow
     """
     
-    def __init__(self, analysis_tool):
+    def __init__(self, analysis_tool, reports=None):
         """
-        Set up the crew with both agents
+        Set up the crew (the agents are created for each analysis)
         
         Args:
             analysis_tool: The product analysis tool
+            reports: ReportStore of pre-generated reports (default: the
+                one at REPORTS_DATABASE, see reports.py)
         """
-        # Import agent creators
-        from agents.analysis_agent import SafetyAnalysisAgent, RecommendationAgent
-        
-        # Create both agents
-        self.safety_agent = SafetyAnalysisAgent.create(analysis_tool)
-        self.recommendation_agent = RecommendationAgent.create()
-        
         # Store the tool for later use
         self.analysis_tool = analysis_tool
         
-        print("✅ Both AI agents ready")
+        # Skips the LLM after repeated failures (see admission.py)
+        self.breaker = CircuitBreaker()
+        
+        # Reports written ahead of time (manage.py pregenerate-reports)
+        self.reports = reports if reports is not None else ReportStore()
+        
+        print(f"✅ AI crew ready ({PIPELINE_MODE} pipeline)")
+    
+    def create_agents(self):
+        """
+        A fresh set of agents for one analysis
+        
+        CrewAI agents keep state from the crew that ran them: the crew
+        itself and the step callback (kickoff only sets it when it is
+        still unset). Shared agents would keep the first analysis's
+        cancel check forever, and overlapping analyses would overwrite
+        each other's crew. Creating them per run costs no LLM call.
+        
+        Returns:
+            dict: "safety", "recommendation" and "ethics" agents (the
+            ethics analyst only runs in "dag" mode)
+        """
+        from agents.analysis_agent import SafetyAnalysisAgent, RecommendationAgent, EthicsAnalysisAgent
+        
+        return {
+            "safety": SafetyAnalysisAgent.create(self.analysis_tool),
+            "recommendation": RecommendationAgent.create(),
+            "ethics": EthicsAnalysisAgent.create(),
+        }
     
     def validate_query(self, query):
         """
@@ -61,16 +149,165 @@ class ProductAnalysisCrew:
         
         return True, "Valid query"
     
-    def analyze_product(self, product_query):
+    def get_structured_report(self, product_query):
+        """
+        Look up the deterministic facts for a product (no LLM involved)
+        
+        Args:
+            product_query: Product name to look up
+            
+        Returns:
+            ProductReport: Validated allergens, risk level and ethical score
+        """
+        analysis = self.analysis_tool.analyzer.analyze_product(product_query)
+        return ProductReport.from_analysis(analysis)
+    
+    def fallback_analysis(self, product_query, reason, error="", structured=None, analysis=None):
         """
-        Main function: Analyze a product using both agents
+        Answer from the database only, when the LLM cannot be used
+        
+        The text is the analysis tool's own report, the same facts the
+        agents would have been given.
         
         Args:
             product_query: Product name to analyze
+            reason: Why the LLM was skipped ("overloaded", "llm_unavailable",
+                "llm_error", "llm_timeout")
+            error: Optional error message to pass on
+            structured: ProductReport dict, if already looked up
+            analysis: The analyzer's result for the query, if already looked up
             
         Returns:
-            dict: Complete analysis with safety info and recommendations
+            dict: Same format as analyze_product, with degraded=True
         """
+        is_valid, error_message = self.validate_query(product_query)
+        if not is_valid:
+            return {
+                "success": False,
+                "product_query": product_query,
+                "error": error_message,
+                "structured": None
+            }
+        
+        record_degraded(reason)
+        if analysis is None:
+            analysis = self.analysis_tool.analyzer.analyze_product(product_query)
+        if structured is None:
+            structured = ProductReport.from_analysis(analysis).model_dump()
+        
+        # Formatted from the lookup we already have (no second search)
+        report = format_report(analysis, product_query, "full")
+        record_tool_output("full", estimate_tokens(report))
+        alternatives = structured.get("recommendations") or []
+        recommendations = "\n".join(f"- {name}" for name in alternatives) or "No specific alternatives listed"
+        
+        return {
+            "success": True,
+            "product_query": product_query,
+            "analysis": report,
+            "recommendations": recommendations,
+            "full_report": report,
+            "agents_used": [],
+            "error": error,
+            "structured": structured,
+            "product_index": analysis.get("index"),
+            "degraded": True,
+            "degraded_reason": reason
+        }
+    
+    def report_key(self, index, mode=None):
+        """
+        Where a product's pre-generated report is stored
+        
+        Args:
+            index: Catalog index of the product
+            mode: Pipeline mode (default: PIPELINE_MODE)
+            
+        Returns:
+            tuple: (product id, content hash)
+        """
+        from agents.analysis_agent import LLM_MODEL
+        
+        product = self.analysis_tool.analyzer.all_products[index]
+        return product_id(product, index), content_hash(product, mode or PIPELINE_MODE, LLM_MODEL)
+    
+    def stored_analysis(self, product_query, mode=None, analysis=None, structured=None):
+        """
+        The pre-generated report for a product, when there is a fresh one
+        
+        Args:
+            product_query: Product name (or barcode) asked for
+            mode: Pipeline mode (default: PIPELINE_MODE)
+            analysis: The analyzer's result for the query, if already looked up
+            structured: Its ProductReport dict, if already built
+            
+        Returns:
+            dict: Same format as analyze_product (with pregenerated=True),
+            or None
+        """
+        mode = mode or PIPELINE_MODE
+        if analysis is None:
+            analysis = self.analysis_tool.analyzer.analyze_product(product_query)
+        if not analysis.get("found"):
+            return None
+        
+        report = self.reports.get(*self.report_key(analysis["index"], mode))
+        if report is None:
+            return None
+        
+        if structured is None:
+            structured = ProductReport.from_analysis(analysis).model_dump()
+        return {
+            "success": True,
+            "product_query": product_query,
+            "analysis": report["analysis"],
+            "recommendations": report["recommendations"],
+            "full_report": report["full_report"],
+            "agents_used": report["agents_used"],
+            "structured": structured,
+            "product_index": analysis["index"],
+            "token_usage": {},  # No LLM call for this answer
+            "pregenerated": True,
+            "generated_at": report["generated_at"]
+        }
+    
+    def analyze_product(self, product_query, user_context="",
+                        progress_callback=None, cancel_event=None, mode=None, use_stored=True,
+                        analysis=None, timed_out=None):
+        """
+        Main function: Analyze a product using the agents
+        
+        Args:
+            product_query: Product name to analyze
+            user_context: Optional user note (e.g., "I have peanut allergy")
+            progress_callback: Optional function(stage, step, total) called
+                after each stage in PIPELINE_STAGES[mode] finishes
+            cancel_event: Optional threading.Event; when set, the run stops
+                at the next agent step and AnalysisCancelled is raised
+            mode: "dag" or "sequential" (default: PIPELINE_MODE)
+            use_stored: Answer from a fresh pre-generated report when
+                there is no user note (reports.py)
+            analysis: The analyzer's result for the query, if already looked up
+            timed_out: Optional threading.Event, set when the caller gave
+                up on the run and already counted it as an LLM failure;
+                the breaker then ignores how the run itself ends
+            
+        Returns:
+            dict: Complete analysis with safety info, recommendations,
+            per-stage timings and product_index (catalog index of the
+            product, None when not found)
+        """
+        mode = mode or PIPELINE_MODE
+        clock = StageClock(PIPELINE_STAGES[mode], progress_callback)
+        
+        def check_cancelled(*_):
+            if cancel_event is not None and cancel_event.is_set():
+                raise AnalysisCancelled(f"Analysis cancelled: {product_query}")
+        
+        def counts_for_breaker():
+            # A timed-out run was already recorded as a failure at the timeout
+            return timed_out is None or not timed_out.is_set()
+        
         # Step 1: Validate the query
         is_valid, error_message = self.validate_query(product_query)
         
@@ -81,88 +318,281 @@ class ProductAnalysisCrew:
                 "error": error_message,
                 "analysis": "",
                 "recommendations": "",
-                "full_report": ""
+                "full_report": "",
+                "structured": None
             }
         
-        # Step 2: Create safety analysis task
-        from agents.analysis_agent import SafetyAnalysisAgent
+        # Step 2: Get the deterministic facts (carried through unchanged)
+        started = time.perf_counter()
+        if analysis is None:
+            analysis = self.analysis_tool.analyzer.analyze_product(product_query)
+        structured = ProductReport.from_analysis(analysis).model_dump()
+        clock.done("retrieval", started)
+        check_cancelled()
+        
+        # Same report for everyone without a user note: use the stored one
+        if use_stored and not user_context:
+            stored = self.stored_analysis(product_query, mode, analysis, structured)
+            if stored is not None:
+                stored["timings"] = clock.report(mode)
+                return stored
+        
+        # LLM failing lately: answer from the database instead of waiting on it
+        if not self.breaker.allow():
+            return self.fallback_analysis(product_query, "llm_unavailable", structured=structured, analysis=analysis)
+        
+        # The agents see the user's note, the database lookup does not
+        agent_query = product_query
+        if user_context:
+            agent_query = f"{product_query} (User note: {user_context})"
+        
+        # Step 3: Run the agents
+        try:
+            print(f"\n🔍 Starting analysis for: {agent_query} ({mode})\n")
+            
+            if mode == "dag":
+                facts = format_report(analysis, product_query)
+                record_tool_output(TOOL_OUTPUT_FORMAT, estimate_tokens(facts))
+                output = self.run_parallel(agent_query, facts, clock, check_cancelled)
+            else:
+                output = self.run_sequential(agent_query, clock, check_cancelled)
+            if counts_for_breaker():
+                self.breaker.record_success()
+            
+        except AnalysisCancelled:
+            print(f"🛑 Analysis cancelled: {product_query}")
+            if counts_for_breaker():
+                self.breaker.release_trial()
+            raise
+            
+        except Exception as error:
+            print(f"❌ Error during analysis: {str(error)}")
+            if counts_for_breaker():
+                self.breaker.record_failure(error)
+            
+            # Still answer with the facts from the database
+            return self.fallback_analysis(product_query, "llm_error", str(error), structured, analysis)
+        
+        timings = clock.report(mode)
+        print(f"⏱️ {mode} pipeline: {timings['wall_ms']:.0f} ms wall, "
+              f"{timings['sequential_ms']:.0f} ms of stages")
+        
+        return {
+            "success": True,
+            "product_query": product_query,
+            "analysis": output["analysis"],
+            "recommendations": output["recommendations"],
+            "full_report": output["full_report"],
+            "agents_used": output["agents_used"],
+            "structured": structured,
+            "product_index": analysis.get("index"),
+            "token_usage": output["token_usage"],
+            "timings": timings
+        }
+    
+    def run_sequential(self, agent_query, clock, check_cancelled):
+        """
+        The original two-agent pipeline: safety analyst, then recommendations
+        
+        The safety analyst looks the product up with its tool; the
+        recommendation specialist reads its answer.
+        
+        Args:
+            agent_query: Product name plus any user note
+            clock: StageClock for this analysis
+            check_cancelled: Raises AnalysisCancelled when cancelled
+            
+        Returns:
+            dict: analysis, recommendations, full_report, agents_used, token_usage
+        """
+        from agents.analysis_agent import SafetyAnalysisAgent, RecommendationAgent
+        
+        agents = self.create_agents()
+        safety_agent = agents["safety"]
+        recommendation_agent = agents["recommendation"]
         
+        # Each stage runs from the end of the previous one
+        stage_started = [time.perf_counter()]
+        
+        def stage_done(stage_name):
+            now = time.perf_counter()
+            clock.done(stage_name, stage_started[0], now)
+            stage_started[0] = now
+            check_cancelled()
+        
+        # Safety analysis task
         safety_task_config = SafetyAnalysisAgent.create_task(
-            self.safety_agent,
-            product_query
+            safety_agent,
+            agent_query
         )
         
         safety_task = Task(
             description=safety_task_config["description"],
-            agent=self.safety_agent,
-            expected_output=safety_task_config["expected_output"]
+            agent=safety_agent,
+            expected_output=safety_task_config["expected_output"],
+            callback=lambda output: stage_done("safety_agent")
         )
         
-        # Step 3: Create recommendation task (waits for safety analysis)
-        from agents.analysis_agent import RecommendationAgent
+        # Recommendation task (waits for safety analysis)
+        recommendation_task_config = RecommendationAgent.create_task(
+            recommendation_agent,
+            "Previous analysis results"
+        )
         
         recommendation_task = Task(
-            description=RecommendationAgent.create_task(
-                self.recommendation_agent, 
-                "Previous analysis results"
-            )["description"],
-            agent=self.recommendation_agent,
-            expected_output=RecommendationAgent.create_task(
-                self.recommendation_agent,
-                "Previous analysis results"
-            )["expected_output"],
-            context=[safety_task]  # Wait for safety task to complete first
+            description=recommendation_task_config["description"],
+            agent=recommendation_agent,
+            expected_output=recommendation_task_config["expected_output"],
+            context=[safety_task],  # Wait for safety task to complete first
+            callback=lambda output: stage_done("recommendation_agent")
         )
         
-        # Step 4: Create the crew and execute
         crew = Crew(
-            agents=[self.safety_agent, self.recommendation_agent],
+            agents=[safety_agent, recommendation_agent],
             tasks=[safety_task, recommendation_task],
             process=Process.sequential,  # Run tasks one after another
+            step_callback=check_cancelled,  # Stop between agent steps if cancelled
             verbose=True
         )
         
-        # Step 5: Run the analysis
+        # Tokens per stage (the agents belong to this run only)
+        stage_agents = {"safety_agent": safety_agent, "recommendation_agent": recommendation_agent}
+        tokens_before = {name: agent_token_usage(agent) for name, agent in stage_agents.items()}
+        
+        stage_started[0] = time.perf_counter()
         try:
-            print(f"\n🔍 Starting analysis for: {product_query}\n")
-            
-            result = crew.kickoff()
-            
-            # Extract results from both tasks
-            safety_analysis = str(safety_task.output) if hasattr(safety_task, 'output') else "Safety analysis completed"
-            recommendations = str(recommendation_task.output) if hasattr(recommendation_task, 'output') else str(result)
-            
-            return {
-                "success": True,
-                "product_query": product_query,
-                "analysis": safety_analysis,
-                "recommendations": recommendations,
-                "full_report": str(result),
-                "agents_used": ["Product Safety Analyst", "Product Recommendation Specialist"]
+            with stage("crew_kickoff"):
+                result = crew.kickoff()
+        finally:
+            token_usage = {
+                name: token_delta(agent, tokens_before[name], name)
+                for name, agent in stage_agents.items()
             }
+        
+        # Extract results from both tasks
+        safety_analysis = str(safety_task.output) if hasattr(safety_task, 'output') else "Safety analysis completed"
+        recommendations = str(recommendation_task.output) if hasattr(recommendation_task, 'output') else str(result)
+        
+        return {
+            "analysis": safety_analysis,
+            "recommendations": recommendations,
+            "full_report": str(result),
+            "agents_used": ["Product Safety Analyst", "Product Recommendation Specialist"],
+            "token_usage": token_usage
+        }
+    
+    def run_parallel(self, agent_query, facts, clock, check_cancelled):
+        """
+        The DAG pipeline: three agent stages at once, then a merge
+        
+            retrieval ─┬─> allergen_risk ─┐
+                       ├─> ethics ────────┼─> merge
+                       └─> alternatives ──┘
+        
+        Every agent gets the database facts in its prompt, so none of them
+        waits for another one. The merge only joins the texts (no LLM).
+        
+        Args:
+            agent_query: Product name plus any user note
+            facts: The analysis tool's report (already looked up)
+            clock: StageClock for this analysis
+            check_cancelled: Raises AnalysisCancelled when cancelled
             
-        except Exception as error:
-            print(f"❌ Error during analysis: {str(error)}")
-            
+        Returns:
+            dict: analysis, recommendations, full_report, agents_used, token_usage
+        """
+        from agents.analysis_agent import SafetyAnalysisAgent, RecommendationAgent, EthicsAnalysisAgent
+        
+        agents = self.create_agents()
+        
+        # Set when one stage fails, so the others stop at their next step
+        stop_event = threading.Event()
+        token_usage = {}
+        
+        def check_stopped(*_):
+            check_cancelled()
+            if stop_event.is_set():
+                raise AnalysisCancelled("Another stage of this analysis failed")
+        
+        def run_agent(stage_name, agent, task_config):
+            # One agent, one task, in its own small crew
+            task = Task(
+                description=task_config["description"],
+                agent=agent,
+                expected_output=task_config["expected_output"]
+            )
+            crew = Crew(
+                agents=[agent],
+                tasks=[task],
+                process=Process.sequential,
+                step_callback=check_stopped,
+                verbose=True
+            )
+            tokens_before = agent_token_usage(agent)
+            try:
+                return str(crew.kickoff())
+            finally:
+                token_usage[stage_name] = token_delta(agent, tokens_before, stage_name)
+        
+        def merge(results):
+            analysis = f"{results['allergen_risk']}\n\n🌍 ETHICAL ASSESSMENT\n{results['ethics']}"
             return {
-                "success": False,
-                "product_query": product_query,
-                "error": str(error),
-                "message": "An error occurred. Please try again or contact support.",
-                "analysis": "",
-                "recommendations": "",
-                "full_report": ""
+                "analysis": analysis,
+                "recommendations": results["alternatives"],
+                "full_report": f"{analysis}\n\n{results['alternatives']}"
             }
+        
+        stages = {
+            "allergen_risk": ((), lambda results: run_agent(
+                "allergen_risk", agents["safety"],
+                SafetyAnalysisAgent.create_risk_task(agents["safety"], agent_query, facts))),
+            "ethics": ((), lambda results: run_agent(
+                "ethics", agents["ethics"],
+                EthicsAnalysisAgent.create_task(agents["ethics"], agent_query, facts))),
+            "alternatives": ((), lambda results: run_agent(
+                "alternatives", agents["recommendation"],
+                RecommendationAgent.create_ranking_task(agents["recommendation"], agent_query, facts))),
+            "merge": (("allergen_risk", "ethics", "alternatives"), merge),
+        }
+        
+        with stage("crew_kickoff"):
+            results = run_dag(stages, clock, check_cancelled, stop_event)
+        
+        output = results["merge"]
+        output["agents_used"] = ["Product Safety Analyst", "Ethics Analyst", "Product Recommendation Specialist"]
+        output["token_usage"] = token_usage
+        return output
     
-    async def analyze_product_async(self, product_query):
+    async def analyze_product_async(self, product_query, user_context="", progress_callback=None,
+                                    timeout=LLM_TIMEOUT_SECONDS, admission=None, cancel_event=None):
         """
         Async version for web servers
         
+        The crew runs on a worker thread so the event loop stays free.
+        The product is looked up first: a fresh pre-generated report is
+        returned without taking an admission slot. If the awaiting task
+        is cancelled, the crew is told to stop at its next agent step. A
+        run longer than `timeout` seconds is stopped the same way,
+        counted as an LLM failure and answered from the database.
+        
         Args:
             product_query: Product name to analyze
+            user_context: Optional user note
+            progress_callback: Optional function(stage, step, total),
+                called from the worker thread
+            timeout: Seconds before the run is given up
+            admission: Optional AdmissionController; its slot is held
+                until the crew thread has really finished, also when the
+                answer already went out after a timeout
+            cancel_event: Optional threading.Event the caller can set to
+                stop the run (e.g. a job being cancelled)
             
         Returns:
             dict: Analysis results
+            
+        Raises:
+            Overloaded: No admission slot free (only with admission)
+            AnalysisCancelled: cancel_event was set
         """
         # Validate first
         is_valid, error_message = self.validate_query(product_query)
@@ -171,12 +601,63 @@ class ProductAnalysisCrew:
             return {
                 "success": False,
                 "product_query": product_query,
-                "error": error_message
+                "error": error_message,
+                "structured": None
             }
         
-        # Run the regular analysis
-        # (CrewAI runs synchronously, so we just call the regular method)
-        return self.analyze_product(product_query)
+        def look_up():
+            analysis = self.analysis_tool.analyzer.analyze_product(product_query)
+            stored = None
+            if not user_context:
+                stored = self.stored_analysis(product_query, analysis=analysis)
+            return analysis, stored
+        
+        # A stored answer needs no LLM, so no crew slot either
+        analysis, stored = await asyncio.to_thread(look_up)
+        if stored is not None:
+            return stored
+        
+        if cancel_event is None:
+            cancel_event = threading.Event()
+        timed_out = threading.Event()
+        if admission is not None:
+            await admission.acquire()
+        
+        run = asyncio.ensure_future(asyncio.to_thread(
+            self.analyze_product,
+            product_query,
+            user_context,
+            progress_callback,
+            cancel_event,
+            use_stored=False,
+            analysis=analysis,
+            timed_out=timed_out
+        ))
+        
+        def run_finished(task):
+            # A timed-out crew still talks to the LLM until its next step
+            if admission is not None:
+                admission.release()
+            if not task.cancelled():
+                task.exception()  # Seen here, so asyncio does not warn about it
+        
+        run.add_done_callback(run_finished)
+        
+        try:
+            # shield: a timeout stops waiting, the thread itself cannot be killed
+            return await asyncio.wait_for(asyncio.shield(run), timeout)
+        except asyncio.TimeoutError:
+            # Counted as a failure now; how the thread ends later is not counted
+            timed_out.set()
+            cancel_event.set()
+            self.breaker.record_failure(f"Analysis timed out after {timeout}s")
+            return await asyncio.to_thread(
+                self.fallback_analysis, product_query, "llm_timeout",
+                f"Analysis timed out after {timeout}s", analysis=analysis
+            )
+        except asyncio.CancelledError:
+            cancel_event.set()
+            raise
     
     def get_all_products(self):
         """
@@ -200,6 +681,11 @@ class ProductAnalysisCrew:
             list: Products in that category
         """
         all_products = self.get_all_products()
+        
+        # SQLite catalog: look the category up through its index
+        if hasattr(all_products, 'in_category'):
+            return [all_products[index] for index in all_products.in_category(category)]
+        
         category_lower = category.lower()
         
         matching_products = [
@@ -218,29 +704,37 @@ class ProductAnalysisCrew:
             specific_allergen: Allergen to look for (e.g., "peanuts")
             
         Returns:
-            dict: Quick check result
+            dict: Quick check result (with product_index when found)
         """
-        # Get analysis
-        result = self.analyze_product(product_name)
-        
-        if not result["success"]:
+        # Read the allergens straight from the database (no LLM needed)
+        is_valid, error_message = self.validate_query(product_name)
+        if not is_valid:
             return {
                 "contains_allergen": False,
                 "certainty": "unknown",
-                "message": result.get("error", "Product not found")
+                "message": error_message
             }
         
-        # Parse allergens from analysis
-        analysis_text = result["analysis"].lower()
-        allergen_lower = specific_allergen.lower()
+        analysis = self.analysis_tool.analyzer.analyze_product(product_name)
+        report = ProductReport.from_analysis(analysis)
+        
+        if not report.found:
+            return {
+                "contains_allergen": False,
+                "certainty": "unknown",
+                "message": report.message or "Product not found"
+            }
         
-        contains = allergen_lower in analysis_text
+        contains = report.contains_allergen(specific_allergen)
         
         return {
-            "product": product_name,
+            "product": report.product_name,
             "allergen": specific_allergen,
             "contains_allergen": contains,
-            "certainty": "high" if result["success"] else "unknown",
+            "detected_allergens": report.detected_allergens,
+            "risk_level": report.risk_level,
+            "certainty": report.confidence,
             "recommendation": "Avoid this product" if contains else "Safe from this allergen",
-            "full_analysis_available": True
+            "full_analysis_available": True,
+            "product_index": analysis["index"]
         }
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+Analysis Pipeline Runner
+Runs the analysis stages as a small dependency graph (DAG) and times them
+
+    retrieval ─┬─> allergen_risk ─┐
+               ├─> ethics ────────┼─> merge
+               └─> alternatives ──┘
+
+Stages whose inputs are ready run at the same time on a thread pool,
+so the three LLM stages overlap instead of waiting for each other.
+Every stage's start and end are recorded next to the sequential sum
+(what the same stages cost one after another).
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from telemetry import record_stage
+
+
+class StageClock:
+    """
+    Start and end time of every stage of one analysis (thread-safe)
+
+    Args:
+        stages: Stage names in display order (for progress steps)
+        progress_callback: Optional function(stage, step, total), called
+            when a stage finishes; step counts finished stages
+    """
+
+    def __init__(self, stages, progress_callback=None):
+        self.stages = tuple(stages)
+        self.progress_callback = progress_callback
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.timings = {}
+
+    def done(self, name, started, ended=None):
+        """
+        Record one finished stage
+
+        Args:
+            name: Stage name
+            started: time.perf_counter() when the stage started
+            ended: time.perf_counter() when it ended (default: now)
+        """
+        ended = ended if ended is not None else time.perf_counter()
+        record_stage(name, ended - started)
+        with self.lock:
+            self.timings[name] = (started - self.started, ended - started)
+            step = len(self.timings)
+        if self.progress_callback is not None:
+            self.progress_callback(name, step, len(self.stages))
+
+    def report(self, mode):
+        """
+        Timings in milliseconds
+
+        Returns:
+            dict: mode, stages (name -> start_ms, ms), wall_ms (first start
+            to last end) and sequential_ms (sum of all stages)
+        """
+        with self.lock:
+            timings = dict(self.timings)
+        stages = {
+            name: {"start_ms": round(offset * 1000, 1), "ms": round(seconds * 1000, 1)}
+            for name, (offset, seconds) in sorted(timings.items(), key=lambda item: item[1][0])
+        }
+        wall = max((offset + seconds for offset, seconds in timings.values()), default=0.0)
+        return {
+            "mode": mode,
+            "stages": stages,
+            "wall_ms": round(wall * 1000, 1),
+            "sequential_ms": round(sum(seconds for _, seconds in timings.values()) * 1000, 1),
+        }
+
+
+def run_dag(stages, clock, check_cancelled=None, stop_event=None, max_workers=None):
+    """
+    Run stages as soon as the stages they depend on have finished
+
+    Args:
+        stages: dict of name -> (tuple of dependency names, function(results)),
+            where results holds the return values of finished stages
+        clock: StageClock that records every stage
+        check_cancelled: Optional function called between stages; it
+            raises to stop the run
+        stop_event: Optional threading.Event set when a stage fails, so
+            stages still running can stop early
+        max_workers: Thread pool size (default: one per stage)
+
+    Returns:
+        dict: Stage name -> return value
+
+    Raises:
+        The first exception raised by a stage (stages that have not
+        started yet are skipped)
+    """
+    results = {}
+    remaining = dict(stages)
+    running = {}
+
+    def timed(name, function):
+        started = time.perf_counter()
+        value = function(results)
+        clock.done(name, started)
+        return value
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages), thread_name_prefix="allerpredict-stage") as pool:
+        try:
+            while remaining or running:
+                # Start everything whose inputs are ready
+                for name, (dependencies, function) in list(remaining.items()):
+                    if all(dependency in results for dependency in dependencies):
+                        running[pool.submit(timed, name, function)] = name
+                        del remaining[name]
+
+                if not running:
+                    missing = {name: deps for name, (deps, _) in remaining.items()}
+                    raise ValueError(f"Stages can never run (unknown or circular dependencies): {missing}")
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                if check_cancelled is not None:
+                    check_cancelled()
+        except BaseException:
+            if stop_event is not None:
+                stop_event.set()
+            raise
+        finally:
+            for future in running:
+                future.cancel()
+
+    return results
@@ -3,6 +3,8 @@ Recommendation Agent - Generates safer and more ethical alternatives
 """
 from crewai import Agent
 from langchain_community.llms import Ollama
+
+from admission import LLM_TIMEOUT_SECONDS
 from typing import Dict, Any
 
 class RecommendationAgentConfig:
@@ -19,7 +21,8 @@ class RecommendationAgentConfig:
         # Use Ollama with Mistral model
         llm = Ollama(
             model="mistral",
-            temperature=0.5  # Slightly higher for creative recommendations
+            temperature=0.5,  # Slightly higher for creative recommendations
+            timeout=LLM_TIMEOUT_SECONDS
         )
         
         return Agent(
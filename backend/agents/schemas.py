@@ -0,0 +1,136 @@
+"""
+Structured Report Schemas
+Validated data that travels next to the agents' narrative
+"""
+import re
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+
+from rag.allergens import LEXICON
+
+
+class SimilarProduct(BaseModel):
+    """A close match offered when the product was not found"""
+    name: str = ""
+    brand: str = ""
+    name_match: float = 0.0
+    overall_match: float = 0.0
+
+
+class ProductReport(BaseModel):
+    """
+    Deterministic facts about one product
+
+    Built from AccurateProductAnalyzer.analyze_product, so every endpoint
+    can read allergens, risk and ethics directly instead of parsing
+    the LLM's prose.
+    """
+    found: bool = Field(..., description="Whether the product was matched in the database")
+    message: str = Field(default="", description="Explanation when the product was not found")
+    product_name: str = ""
+    brand: str = ""
+    category: str = ""
+    detected_allergens: List[str] = Field(default_factory=list)
+    inferred_allergens: List[str] = Field(default_factory=list, description="Major allergens found in the ingredient list")
+    trace_allergens: List[str] = Field(default_factory=list, description="'May contain' allergens")
+    allergen_count: int = Field(default=0, ge=0)
+    risk_level: Literal["low", "medium", "high", "unknown"] = "unknown"
+    ethical_score: int = Field(default=0, ge=0, le=100)
+    recommendations: List[str] = Field(default_factory=list)
+    confidence: Literal["high", "medium", "low", "none"] = "none"
+    match_score: float = 0.0
+    name_match_score: float = 0.0
+    warning: Optional[str] = None
+    similar_products: List[SimilarProduct] = Field(default_factory=list)
+
+    @classmethod
+    def from_analysis(cls, analysis):
+        """
+        Build a validated report from the analyzer's result dict
+
+        Args:
+            analysis: Output of AccurateProductAnalyzer.analyze_product
+
+        Returns:
+            ProductReport: The same values, validated
+        """
+        if not analysis.get("found"):
+            return cls(
+                found=False,
+                message=analysis.get("message", ""),
+                similar_products=analysis.get("similar_products", [])
+            )
+
+        return cls(
+            found=True,
+            product_name=analysis.get("product_name", ""),
+            brand=analysis.get("brand", ""),
+            category=analysis.get("category", ""),
+            detected_allergens=analysis.get("detected_allergens", []),
+            allergen_count=analysis.get("allergen_count", 0),
+            inferred_allergens=analysis.get("inferred_allergens", []),
+            trace_allergens=analysis.get("trace_allergens", []),
+            risk_level=analysis.get("risk_level", "unknown"),
+            ethical_score=analysis.get("ethical_score", 0),
+            recommendations=analysis.get("recommendations", []),
+            confidence=analysis.get("confidence", "low"),
+            match_score=analysis.get("match_score", 0.0),
+            name_match_score=analysis.get("name_match_score", 0.0),
+            warning=analysis.get("warning")
+        )
+
+    def contains_allergen(self, allergen):
+        """
+        Check one allergen against the detected list
+
+        Names the allergen lexicon knows are compared as canonical
+        allergens: "hazelnuts" matches "tree nuts" and "whey" matches
+        "milk", but "nuts" does not match "peanuts" nor "fish"
+        "shellfish". Other labels ("citrus") must appear as whole words.
+        """
+        allergen_lower = allergen.lower().strip()
+        if not allergen_lower:
+            return False
+
+        wanted = LEXICON.canonical(allergen_lower)
+        if wanted:
+            present = set(self.inferred_allergens)
+            for detected in self.detected_allergens:
+                present.update(LEXICON.canonical(detected))
+            return bool(wanted & present)
+
+        pattern = re.compile(r"\b" + re.escape(allergen_lower) + r"\b")
+        return any(pattern.search(detected.lower()) for detected in self.detected_allergens)
+
+
+class AllergenProfile(BaseModel):
+    """What a user must avoid"""
+    avoid: List[str] = Field(default_factory=list, description="Allergens to avoid, e.g. ['peanuts', 'milk']")
+    avoid_traces: bool = Field(default=True, description="Also avoid 'may contain' products")
+
+
+class SafeAlternative(BaseModel):
+    """A product from the same category without the user's allergens"""
+    id: Optional[str] = None
+    name: str = ""
+    brand: str = ""
+    category: str = ""
+    ethical_score: int = 0
+
+
+class ProfileVerdict(BaseModel):
+    """
+    Deterministic safety verdict for one product and one profile
+
+    Built from the precomputed allergen bitmasks, so it never waits
+    for the LLM.
+    """
+    product_name: str
+    found: bool
+    verdict: Literal["safe", "caution", "unsafe", "unknown"]
+    conflicts: List[str] = Field(default_factory=list, description="Avoided allergens the product contains")
+    traces: List[str] = Field(default_factory=list, description="Avoided allergens the product may contain")
+    avoiding: List[str] = Field(default_factory=list)
+    unrecognized: List[str] = Field(default_factory=list)
+    safe_alternatives: List[SafeAlternative] = Field(default_factory=list)
+    message: str = ""
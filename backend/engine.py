@@ -0,0 +1,270 @@
+"""
+Shared AllerPredict Engine
+One warm analyzer and crew used by both the FastAPI app and the MCP server
+"""
+import threading
+
+from rag.rag_engine import ProductAnalysisTool
+from rag.profiles import ProfileStore
+from agents.crew import ProductAnalysisCrew
+from agents.schemas import AllergenProfile, ProfileVerdict
+
+# Fields returned by default when listing products
+DEFAULT_PRODUCT_FIELDS = ["id", "name", "brand", "category"]
+
+# Largest page / batch a single call may ask for
+MAX_PAGE_SIZE = 200
+MAX_BATCH_SIZE = 50
+
+
+class AllerPredictEngine:
+    """
+    Owns the loaded model, product data and AI agents
+
+    Everything expensive happens in __init__, so callers create it once
+    (see get_engine) and every request afterwards is served warm.
+    """
+
+    def __init__(self):
+        """Load the analyzer and create both agents"""
+        self.analysis_tool = ProductAnalysisTool()
+        self.crew = ProductAnalysisCrew(self.analysis_tool)
+        self.profiles = ProfileStore()
+
+    @property
+    def analyzer(self):
+        """The AccurateProductAnalyzer behind the tool"""
+        return self.analysis_tool.analyzer
+
+    @property
+    def products(self):
+        """All products in the database"""
+        return self.analysis_tool.products
+
+    @property
+    def catalog_version(self):
+        """Changes whenever a product is added or replaced"""
+        return self.analyzer.catalog_version
+
+    def lookup(self, product_name):
+        """
+        Fast deterministic lookup (no LLM)
+
+        Args:
+            product_name: Product to look up
+
+        Returns:
+            dict: ProductReport fields, or an error message for invalid input
+        """
+        is_valid, error_message = self.crew.validate_query(product_name)
+        if not is_valid:
+            return {"found": False, "message": error_message}
+
+        return self.crew.get_structured_report(product_name).model_dump()
+
+    def batch_lookup(self, product_names):
+        """
+        Deterministic lookup for several products at once
+
+        Args:
+            product_names: List of product names (at most MAX_BATCH_SIZE)
+
+        Returns:
+            list: One lookup result per name, in the same order
+        """
+        if len(product_names) > MAX_BATCH_SIZE:
+            raise ValueError(f"At most {MAX_BATCH_SIZE} products per batch")
+
+        return [
+            dict(self.lookup(name), product_query=name)
+            for name in product_names
+        ]
+
+    def get_product(self, key):
+        """
+        A product by id or barcode (exact, no fuzzy matching)
+
+        Args:
+            key: Product id, or a GTIN-8/12/13/14 barcode
+
+        Returns:
+            dict: The product with its derived facts, or None
+        """
+        return self.analyzer.lookup_key(key)
+
+    def get_products(self, keys):
+        """
+        Several products by id or barcode, e.g. a basket of scans
+
+        Args:
+            keys: Ids or barcodes (at most MAX_PAGE_SIZE)
+
+        Returns:
+            list: One dict per key, in the same order: key, found and
+            the product (when found)
+        """
+        if len(keys) > MAX_PAGE_SIZE:
+            raise ValueError(f"At most {MAX_PAGE_SIZE} codes per lookup")
+
+        results = []
+        for key in keys:
+            product = self.get_product(key)
+            results.append({"key": key, "found": product is not None, "product": product})
+        return results
+
+    def record_view(self, index):
+        """Count one user request for a product (ranks it up in suggestions)"""
+        self.analyzer.record_view(index)
+
+    def check_allergen(self, product_name, allergen, record_view=False):
+        """
+        Quick check if a product contains a specific allergen
+
+        Args:
+            product_name: Product to look up
+            allergen: Allergen to look for
+            record_view: Count this as a user request for the product
+
+        Returns:
+            dict: Same format as ProductAnalysisCrew.quick_allergen_check
+            (without product_index)
+        """
+        result = self.crew.quick_allergen_check(product_name, allergen)
+        index = result.pop("product_index", None)
+        if record_view:
+            self.record_view(index)
+        return result
+
+    def resolve_profile(self, allergens=None, profile_id=None, avoid_traces=None):
+        """
+        Build the profile for a request
+
+        A saved profile (profile_id) is combined with any allergens sent
+        in the request; avoid_traces overrides the saved setting when given.
+
+        Returns:
+            AllergenProfile, or None when neither was given
+        """
+        if not allergens and not profile_id:
+            return None
+
+        profile = AllergenProfile()
+        if profile_id:
+            saved = self.profiles.get(profile_id)
+            if saved is None:
+                raise KeyError(f"Unknown profile '{profile_id}'")
+            profile = AllergenProfile(**saved)
+
+        avoid = list(profile.avoid) + [item for item in (allergens or []) if item not in profile.avoid]
+        traces = profile.avoid_traces if avoid_traces is None else avoid_traces
+        return AllergenProfile(avoid=avoid, avoid_traces=traces)
+
+    def check_profile(self, product_name, profile, record_view=False):
+        """
+        Safe / caution / unsafe verdict for one product (no LLM)
+
+        Args:
+            product_name: Product to look up
+            profile: AllergenProfile
+            record_view: Count this as a user request for the product
+
+        Returns:
+            ProfileVerdict
+        """
+        result = self.analyzer.check_profile(product_name, profile.avoid, profile.avoid_traces)
+        if record_view:
+            self.record_view(result["product_index"])
+        return ProfileVerdict(**result)
+
+    def safe_products(self, avoid=(), avoid_traces=True, categories=None, brands=None, offset=0, limit=25):
+        """
+        One page of products free of the given allergens (no LLM)
+
+        Args:
+            avoid: Allergen names to avoid
+            avoid_traces: Also drop "may contain" products
+            categories: Category names to keep (None = all)
+            brands: Brand names to keep (None = all)
+            offset: Index of the first match to return
+            limit: Page size (capped at MAX_PAGE_SIZE)
+
+        Returns:
+            dict: Same format as AccurateProductAnalyzer.filter_products
+        """
+        return self.analyzer.filter_products(
+            avoid, avoid_traces, categories, brands,
+            offset=max(0, offset), limit=max(1, min(limit, MAX_PAGE_SIZE))
+        )
+
+    def browse_products(self, text=None, category=None, avoid=(), offset=0, limit=25):
+        """
+        One page of products matching a text / category / allergen filter
+
+        Args:
+            text: Words the name, brand or ingredients must contain
+            category: Text the category must contain
+            avoid: Allergens the products must not contain
+            offset: Index of the first match to return
+            limit: Page size (capped at MAX_PAGE_SIZE)
+
+        Returns:
+            dict: Same format as AccurateProductAnalyzer.browse_products
+        """
+        return self.analyzer.browse_products(
+            text, category, avoid,
+            offset=max(0, offset), limit=max(1, min(limit, MAX_PAGE_SIZE))
+        )
+
+    def list_products(self, offset=0, limit=25, fields=None):
+        """
+        One page of products with only the requested fields
+
+        Args:
+            offset: Index of the first product to return
+            limit: Page size (capped at MAX_PAGE_SIZE)
+            fields: Product fields to include (defaults to DEFAULT_PRODUCT_FIELDS)
+
+        Returns:
+            dict: total, offset, limit and the projected products
+        """
+        offset = max(0, offset)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        fields = fields or DEFAULT_PRODUCT_FIELDS
+
+        page = self.products[offset:offset + limit]
+        projected = [
+            {field: product.get(field) for field in fields if field in product}
+            for product in page
+        ]
+
+        next_offset = offset + len(page)
+        return {
+            "total": len(self.products),
+            "offset": offset,
+            "limit": limit,
+            "next_offset": next_offset if next_offset < len(self.products) else None,
+            "products": projected
+        }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    Get the shared engine, creating it on first use
+
+    Thread-safe: concurrent first callers wait for the same instance.
+
+    Returns:
+        AllerPredictEngine: The process-wide engine
+    """
+    global _engine
+
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = AllerPredictEngine()
+
+    return _engine
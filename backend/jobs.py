@@ -0,0 +1,398 @@
+"""
+Analysis Job Queue
+Submit an analysis, get a job id back at once, poll for the result
+
+Jobs live in a small SQLite file, so queued work and finished results
+survive a restart. A pool of worker threads runs the crew:
+- "interactive" jobs (a person is waiting) always go first
+- "bulk" jobs may use every worker but one, so an interactive job
+  never waits behind a long batch
+Finished jobs are kept for JOB_TTL_SECONDS, then deleted.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from telemetry import record_job, record_queue_wait
+
+BASE_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Settings (environment variables override the defaults)
+JOBS_DATABASE = os.environ.get("ALLERPREDICT_JOBS_DB", os.path.join(BASE_FOLDER, "data", "jobs.sqlite3"))
+JOB_WORKERS = int(os.environ.get("ALLERPREDICT_JOB_WORKERS", "2"))
+JOB_TTL_SECONDS = int(os.environ.get("ALLERPREDICT_JOB_TTL_SECONDS", "3600"))
+MAX_QUEUED_JOBS = int(os.environ.get("ALLERPREDICT_MAX_QUEUED_JOBS", "1000"))
+
+# Lane -> priority (lower runs first)
+LANES = {"interactive": 0, "bulk": 1}
+
+# A job that was running when the server stopped is retried this many times
+MAX_ATTEMPTS = 3
+
+# Longest long-poll a client may ask for
+MAX_WAIT_SECONDS = 30
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    lane TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    product_query TEXT NOT NULL,
+    user_context TEXT NOT NULL DEFAULT '',
+    idempotency_key TEXT UNIQUE,
+    stage TEXT,
+    step INTEGER NOT NULL DEFAULT 0,
+    total_steps INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority, created_at);
+CREATE INDEX IF NOT EXISTS jobs_expiry ON jobs (expires_at);
+"""
+
+
+class QueueFull(Exception):
+    """Raised when MAX_QUEUED_JOBS jobs are already waiting"""
+
+
+class JobQueue:
+    """
+    Persistent job queue with a worker pool
+
+    Args:
+        runner: function(product_query, user_context, progress_callback,
+            cancel_event) -> result dict (ProductAnalysisCrew.analyze_product)
+        path: SQLite file (":memory:" works for experiments)
+        workers: Number of worker threads
+        ttl_seconds: How long finished jobs are kept
+        max_queued: Most jobs waiting at once
+    """
+
+    def __init__(self, runner, path=JOBS_DATABASE, workers=JOB_WORKERS,
+                 ttl_seconds=JOB_TTL_SECONDS, max_queued=MAX_QUEUED_JOBS):
+        self.runner = runner
+        self.path = path
+        self.workers = max(1, workers)
+        self.ttl_seconds = ttl_seconds
+        self.max_queued = max_queued
+
+        # One connection, used under the lock (every query is tiny)
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.database = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.database.row_factory = sqlite3.Row
+        self.database.execute("PRAGMA journal_mode=WAL")
+        self.database.executescript(_SCHEMA)
+
+        self.lock = threading.Lock()
+        self.work_ready = threading.Condition(self.lock)    # wakes workers
+        self.job_changed = threading.Condition(self.lock)   # wakes long-polls
+        self.running_bulk = 0
+        self.cancel_events = {}   # job id -> threading.Event for running jobs
+        self.threads = []
+        self.stopping = False
+        self.last_cleanup = 0.0
+
+        self._recover()
+
+    # === Submitting and reading jobs ===
+
+    def submit(self, product_query, user_context="", lane="interactive", idempotency_key=None):
+        """
+        Queue one analysis
+
+        Args:
+            product_query: Product name to analyze
+            user_context: Optional user note
+            lane: "interactive" or "bulk"
+            idempotency_key: Optional client key; submitting the same key
+                again returns the existing job instead of a new one
+
+        Returns:
+            dict: The job (see get)
+        """
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane '{lane}' (use one of: {', '.join(LANES)})")
+
+        with self.lock:
+            if idempotency_key:
+                row = self.database.execute(
+                    "SELECT * FROM jobs WHERE idempotency_key = ?", (idempotency_key,)
+                ).fetchone()
+                if row is not None and not self._expired(row):
+                    return self._job(row)
+                if row is not None:
+                    self.database.execute("DELETE FROM jobs WHERE id = ?", (row["id"],))
+
+            queued = self.database.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= self.max_queued:
+                raise QueueFull(f"{queued} jobs are already waiting, try again later")
+
+            job_id = uuid.uuid4().hex
+            self.database.execute(
+                "INSERT INTO jobs (id, lane, priority, status, product_query, user_context,"
+                " idempotency_key, created_at) VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, lane, LANES[lane], product_query, user_context, idempotency_key, time.time())
+            )
+            self.work_ready.notify()
+            record_job(lane, "queued")
+            return self._job(self._row(job_id))
+
+    def get(self, job_id):
+        """
+        Current state of a job
+
+        Returns:
+            dict: id, lane, status, stage, step, total_steps, queue_position,
+            timestamps, result and error; None if unknown or expired
+        """
+        with self.lock:
+            row = self._row(job_id)
+            if row is None or self._expired(row):
+                return None
+            return self._job(row)
+
+    def wait(self, job_id, timeout):
+        """
+        Block until a job finishes or `timeout` seconds pass (long-poll)
+
+        Returns:
+            dict: The job as in get(), or None if unknown
+        """
+        deadline = time.monotonic() + min(max(timeout, 0), MAX_WAIT_SECONDS)
+        with self.lock:
+            while True:
+                row = self._row(job_id)
+                if row is None or self._expired(row):
+                    return None
+                remaining = deadline - time.monotonic()
+                if row["status"] in FINISHED_STATUSES or remaining <= 0:
+                    return self._job(row)
+                self.job_changed.wait(remaining)
+
+    async def wait_async(self, job_id, timeout, interval=0.25):
+        """
+        Long-poll from async code without holding a thread
+
+        Checks the job every `interval` seconds until it finishes or
+        `timeout` seconds pass.
+        """
+        deadline = time.monotonic() + min(max(timeout, 0), MAX_WAIT_SECONDS)
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in FINISHED_STATUSES or time.monotonic() >= deadline:
+                return job
+            await asyncio.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+
+    def cancel(self, job_id):
+        """
+        Cancel a job
+
+        Queued jobs are cancelled at once; running jobs stop at the next
+        agent step.
+
+        Returns:
+            dict: The job, or None if unknown
+        """
+        with self.lock:
+            row = self._row(job_id)
+            if row is None or self._expired(row):
+                return None
+            if row["status"] == "queued":
+                self._finish(job_id, row["lane"], "cancelled", error="Cancelled before it started")
+            elif row["status"] == "running" and job_id in self.cancel_events:
+                self.cancel_events[job_id].set()
+            return self._job(self._row(job_id))
+
+    def stats(self):
+        """Jobs per status and lane, plus the worker settings"""
+        with self.lock:
+            rows = self.database.execute(
+                "SELECT lane, status, COUNT(*) AS count FROM jobs GROUP BY lane, status"
+            ).fetchall()
+        counts = {}
+        for row in rows:
+            counts.setdefault(row["lane"], {})[row["status"]] = row["count"]
+        return {
+            "workers": self.workers,
+            "running_workers": sum(thread.is_alive() for thread in self.threads),
+            "ttl_seconds": self.ttl_seconds,
+            "jobs": counts,
+        }
+
+    # === Workers ===
+
+    def start(self):
+        """Start the worker threads (safe to call more than once)"""
+        with self.lock:
+            if self.threads:
+                return
+            self.stopping = False
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"allerpredict-job-{number}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+        print(f"✅ Job queue ready ({self.workers} workers)")
+
+    def close(self):
+        """Stop the workers after their current job; queued jobs stay queued"""
+        with self.lock:
+            self.stopping = True
+            for event in self.cancel_events.values():
+                event.set()
+            self.work_ready.notify_all()
+        for thread in self.threads:
+            thread.join(timeout=5)
+        self.threads = []
+
+    def _work(self):
+        while True:
+            with self.lock:
+                row = None
+                while not self.stopping:
+                    row = self._claim()
+                    if row is not None:
+                        break
+                    self.work_ready.wait(timeout=60)
+                    self._cleanup()
+                if row is None:
+                    return
+                cancel_event = threading.Event()
+                self.cancel_events[row["id"]] = cancel_event
+
+            self._run(row, cancel_event)
+
+    def _claim(self):
+        """Mark the next job as running (call with the lock held)"""
+        bulk_allowed = self.workers == 1 or self.running_bulk < self.workers - 1
+        lanes = (0, 1) if bulk_allowed else (0,)
+        row = self.database.execute(
+            f"SELECT * FROM jobs WHERE status = 'queued' AND priority IN ({','.join('?' * len(lanes))})"
+            " ORDER BY priority, created_at LIMIT 1",
+            lanes
+        ).fetchone()
+        if row is None:
+            return None
+
+        self.database.execute(
+            "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 WHERE id = ?",
+            (time.time(), row["id"])
+        )
+        if row["lane"] == "bulk":
+            self.running_bulk += 1
+        record_queue_wait(f"jobs_{row['lane']}", time.time() - row["created_at"])
+        return row
+
+    def _run(self, row, cancel_event):
+        job_id = row["id"]
+
+        def progress(stage_name, step, total):
+            with self.lock:
+                self.database.execute(
+                    "UPDATE jobs SET stage = ?, step = ?, total_steps = ? WHERE id = ?",
+                    (stage_name, step, total, job_id)
+                )
+                self.job_changed.notify_all()
+
+        status, result, error = "failed", None, ""
+        try:
+            result = self.runner(row["product_query"], row["user_context"], progress, cancel_event)
+            status = "succeeded" if result.get("success") else "failed"
+            error = result.get("error", "")
+        except Exception as exception:
+            # AnalysisCancelled when cancel() was called, anything else is a failure
+            status = "cancelled" if cancel_event.is_set() else "failed"
+            error = str(exception)
+
+        with self.lock:
+            self.cancel_events.pop(job_id, None)
+            if row["lane"] == "bulk":
+                self.running_bulk -= 1
+                self.work_ready.notify()  # An idle worker may take bulk work again
+            if self.stopping and status == "cancelled":
+                self._requeue(row, count_attempt=False)  # Interrupted by close(), not the user
+            else:
+                self._finish(job_id, row["lane"], status, result, error)
+
+    # === Storage helpers (call with the lock held) ===
+
+    def _row(self, job_id):
+        return self.database.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def _finish(self, job_id, lane, status, result=None, error=""):
+        now = time.time()
+        self.database.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, expires_at = ? WHERE id = ?",
+            (status, json.dumps(result) if result is not None else None, error,
+             now, now + self.ttl_seconds, job_id)
+        )
+        self.job_changed.notify_all()
+        record_job(lane, status)
+
+    def _requeue(self, row, count_attempt=True):
+        self.database.execute(
+            "UPDATE jobs SET status = 'queued', stage = NULL, attempts = attempts - ? WHERE id = ?",
+            (0 if count_attempt else 1, row["id"])
+        )
+        self.work_ready.notify()
+
+    def _recover(self):
+        """Requeue jobs that were running when the server stopped"""
+        with self.lock:
+            for row in self.database.execute("SELECT * FROM jobs WHERE status = 'running'").fetchall():
+                if row["attempts"] >= MAX_ATTEMPTS:
+                    self._finish(row["id"], row["lane"], "failed", error="Server stopped during the analysis too many times")
+                else:
+                    self._requeue(row)
+            self._cleanup(force=True)
+
+    def _cleanup(self, force=False):
+        """Delete finished jobs past their TTL (at most once a minute)"""
+        now = time.time()
+        if force or now - self.last_cleanup >= 60:
+            self.database.execute("DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+            self.last_cleanup = now
+
+    @staticmethod
+    def _expired(row):
+        return row["expires_at"] is not None and row["expires_at"] < time.time()
+
+    def _job(self, row):
+        """Public view of a job row"""
+        position = None
+        if row["status"] == "queued":
+            position = self.database.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND"
+                " (priority < ? OR (priority = ? AND created_at < ?))",
+                (row["priority"], row["priority"], row["created_at"])
+            ).fetchone()[0]
+
+        return {
+            "job_id": row["id"],
+            "lane": row["lane"],
+            "status": row["status"],
+            "product_query": row["product_query"],
+            "stage": row["stage"],
+            "step": row["step"],
+            "total_steps": row["total_steps"],
+            "queue_position": position,
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "expires_at": row["expires_at"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"] or "",
+        }
@@ -5,27 +5,48 @@ Easy-to-understand web API for product analysis
 import os
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-import json
 import sys
-from fastapi import FastAPI, HTTPException
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
-from fastapi.responses import JSONResponse
+from typing import Any, Dict, List, Optional
+from fastapi.responses import PlainTextResponse
 
 # Setup paths
 BASE_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, os.path.join(BASE_FOLDER, "backend"))
 
 # Import our simplified components
-from rag.rag_engine import ProductAnalysisTool
-from agents.crew import ProductAnalysisCrew
+from engine import get_engine
+from jobs import JobQueue, QueueFull, LANES
+from admission import AdmissionController, Overloaded
+from responses import FastJSONResponse, ResponseCache, model_response
+from agents.crew import AnalysisCancelled
+from agents.schemas import AllergenProfile, ProductReport, ProfileVerdict
+from telemetry import METRICS
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Start the job workers once the event loop runs (their analyses use it)"""
+    global event_loop
+    event_loop = asyncio.get_running_loop()
+    jobs.start()
+    yield
+    # Off the loop: running jobs need it to wind down
+    await asyncio.to_thread(jobs.close)
+
 
 # Create FastAPI app
 app = FastAPI(
     title="AllerPredict AI - Food Safety Analyzer",
     description="Simple and accurate food product safety analysis using AI",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=FastJSONResponse,  # orjson when installed (see responses.py)
+    lifespan=lifespan
 )
 
 # Enable CORS (allows frontend to connect)
@@ -37,18 +58,76 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load product database
-DATA_FILE = os.path.join(BASE_FOLDER, "data", "metadata.json")
-with open(DATA_FILE, "r", encoding="utf-8") as file:
-    ALL_PRODUCTS = json.load(file)
 
-# Initialize the AI system
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Time every request, labelled by route template (not raw path)"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    METRICS.observe(
+        "allerpredict_http_request_seconds",
+        time.perf_counter() - start,
+        method=request.method,
+        path=path,
+        status=str(response.status_code)
+    )
+    return response
+
+# Initialize the AI system (shared with the MCP server)
 print("\n" + "="*60)
 print("🚀 Starting AllerPredict AI System...")
 print("="*60)
 
-analysis_tool = ProductAnalysisTool()
-crew_manager = ProductAnalysisCrew(analysis_tool)
+engine = get_engine()
+analysis_tool = engine.analysis_tool
+crew_manager = engine.crew
+
+# Product database (loaded once by the analyzer; a list, or a
+# ColumnarCatalog that decodes rows on access - see rag/catalog.py)
+ALL_PRODUCTS = engine.products
+
+# Limits crew runs, from /api/analyze and from jobs (the rest get the database answer)
+admission = AdmissionController()
+
+# The server's event loop (set by lifespan); job workers run their analyses on it
+event_loop = None
+
+# Encoded product listings, rebuilt only when the catalog changes
+response_cache = ResponseCache(lambda: engine.catalog_version)
+
+
+
+async def run_admitted_job(product_query, user_context, progress_callback, cancel_event):
+    """
+    One job's analysis, with the same admission slot, circuit breaker and
+    timeout as /api/analyze. A job waits for a free slot instead of
+    being answered from the database.
+    """
+    while True:
+        if cancel_event.is_set():
+            raise AnalysisCancelled(f"Analysis cancelled: {product_query}")
+        try:
+            return await crew_manager.analyze_product_async(
+                product_query, user_context, progress_callback,
+                admission=admission, cancel_event=cancel_event
+            )
+        except Overloaded:
+            await asyncio.sleep(1)
+
+
+def run_job(product_query, user_context, progress_callback, cancel_event):
+    """JobQueue runner: called on a job worker thread, runs on the event loop"""
+    future = asyncio.run_coroutine_threadsafe(
+        run_admitted_job(product_query, user_context, progress_callback, cancel_event), event_loop
+    )
+    return future.result()
+
+
+# Background analysis jobs (see /api/jobs; the workers start with the server)
+jobs = JobQueue(run_job)
 
 print("✅ System ready!")
 print("="*60 + "\n")
@@ -60,6 +139,37 @@ class ProductRequest(BaseModel):
     """What the user sends"""
     product_name: str
     user_context: str = ""  # Optional: e.g., "I have peanut allergy"
+    allergens: List[str] = []  # Optional: allergens to avoid, e.g. ["peanuts", "milk"]
+    profile_id: Optional[str] = None  # Optional: a saved profile (see /api/profiles)
+    avoid_traces: Optional[bool] = None  # Optional: override the profile's trace setting
+
+
+class JobRequest(BaseModel):
+    """One analysis to run in the background"""
+    product_name: str
+    user_context: str = ""
+    lane: str = "interactive"  # "interactive" or "bulk"
+    idempotency_key: Optional[str] = None  # Same key again = same job (safe retries)
+
+
+class BatchJobRequest(BaseModel):
+    """Many analyses to run in the background (bulk lane by default)"""
+    product_names: List[str]
+    user_context: str = ""
+    lane: str = "bulk"
+
+
+class ProductLookupRequest(BaseModel):
+    """Product ids or barcodes to look up"""
+    codes: List[str]
+
+
+class ProfileCheckRequest(BaseModel):
+    """Product plus the allergens to check it against"""
+    product_name: str
+    allergens: List[str] = []
+    profile_id: Optional[str] = None
+    avoid_traces: Optional[bool] = None
 
 
 class AnalysisResponse(BaseModel):
@@ -71,6 +181,13 @@ class AnalysisResponse(BaseModel):
     full_report: str = ""
     agents_used: List[str] = []
     error: str = ""
+    structured: Optional[ProductReport] = None  # Deterministic facts from the database
+    verdict: Optional[ProfileVerdict] = None  # Safe/unsafe for the user's allergen profile
+    degraded: bool = False  # True when answered from the database only (LLM busy or down)
+    degraded_reason: str = ""
+    token_usage: Dict[str, Dict[str, int]] = {}  # LLM tokens per agent stage
+    timings: Dict[str, Any] = {}  # Per-stage times, wall clock vs sequential sum
+    pregenerated: bool = False  # True when served from a report written ahead of time
 
 
 class SimpleResponse(BaseModel):
@@ -81,6 +198,14 @@ class SimpleResponse(BaseModel):
     recommendations: List[str]
 
 
+def resolve_profile(allergens, profile_id, avoid_traces):
+    """The request's allergen profile (404 for an unknown saved profile)"""
+    try:
+        return engine.resolve_profile(allergens, profile_id, avoid_traces)
+    except KeyError as error:
+        raise HTTPException(status_code=404, detail=str(error.args[0]))
+
+
 # === Main API Endpoints ===
 
 @app.post("/api/analyze", response_model=AnalysisResponse)
@@ -94,24 +219,51 @@ async def analyze_product(request: ProductRequest):
         "user_context": "I have dairy allergy"
     }
     """
+    profile = resolve_profile(request.allergens, request.profile_id, request.avoid_traces)
+    
     try:
-        # Combine product name with user context if provided
-        full_query = request.product_name
-        if request.user_context:
-            full_query = f"{request.product_name} (User note: {request.user_context})"
+        # Personal verdict straight from the allergen bitmasks (no LLM).
+        # Lookups encode the query and score every product, so they run
+        # on a worker thread: the event loop stays free for other requests
+        verdict = None
+        if profile:
+            verdict = await asyncio.to_thread(engine.check_profile, request.product_name, profile)
+        
+        # Run the analysis (user context only goes to the agents); the
+        # admission slot is held until the crew thread has finished
+        try:
+            result = await crew_manager.analyze_product_async(
+                request.product_name,
+                request.user_context,
+                admission=admission
+            )
+        except Overloaded as error:
+            # Too many analyses already (a pre-generated report would have
+            # been returned before queueing): answer from the database
+            result = await asyncio.to_thread(
+                crew_manager.fallback_analysis, request.product_name, "overloaded", str(error)
+            )
         
-        # Run the analysis
-        result = await crew_manager.analyze_product_async(full_query)
+        # One request, one view (popular products rank higher in suggestions)
+        engine.record_view(result.get("product_index"))
         
-        return AnalysisResponse(
+        # Serialized once by pydantic-core (not re-validated by FastAPI)
+        return model_response(AnalysisResponse(
             success=result["success"],
             product_query=request.product_name,
             analysis=result.get("analysis", ""),
             recommendations=result.get("recommendations", ""),
             full_report=result.get("full_report", ""),
             agents_used=result.get("agents_used", []),
-            error=result.get("error", "")
-        )
+            error=result.get("error", ""),
+            structured=result.get("structured"),
+            verdict=verdict,
+            degraded=result.get("degraded", False),
+            degraded_reason=result.get("degraded_reason", ""),
+            token_usage=result.get("token_usage", {}),
+            timings=result.get("timings", {}),
+            pregenerated=result.get("pregenerated", False)
+        ))
         
     except Exception as error:
         print(f"❌ Error: {str(error)}")
@@ -128,46 +280,251 @@ async def analyze_product_v2(request: ProductRequest):
     return await analyze_product(request)
 
 
-@app.get("/api/products")
-async def get_all_products():
+# === Background Jobs ===
+
+def submit_job(product_name, user_context, lane, idempotency_key=None):
+    """Queue one analysis (400 for a bad query or lane, 503 when full)"""
+    is_valid, error_message = crew_manager.validate_query(product_name)
+    if not is_valid:
+        raise HTTPException(status_code=400, detail=error_message)
+    if lane not in LANES:
+        raise HTTPException(status_code=400, detail=f"Unknown lane '{lane}' (use one of: {', '.join(LANES)})")
+    
+    try:
+        return jobs.submit(product_name, user_context, lane, idempotency_key)
+    except QueueFull as error:
+        raise HTTPException(status_code=503, detail=str(error), headers={"Retry-After": "30"})
+
+
+@app.post("/api/jobs", status_code=202)
+async def create_job(request: JobRequest):
     """
-    Get list of all products in database
+    Start an analysis in the background and return a job id at once
+    
+    Example request:
+    {
+        "product_name": "Oreo Cookies",
+        "idempotency_key": "my-client-request-123"
+    }
+    
+    Then poll GET /api/jobs/{job_id}?wait=20 until status is
+    "succeeded", "failed" or "cancelled".
+    """
+    job = submit_job(request.product_name, request.user_context, request.lane, request.idempotency_key)
+    return dict(job, poll_url=f"/api/jobs/{job['job_id']}")
+
+
+@app.post("/api/jobs/batch", status_code=202)
+async def create_jobs(request: BatchJobRequest):
+    """Start one background analysis per product (bulk lane by default)"""
+    if not request.product_names or len(request.product_names) > 100:
+        raise HTTPException(status_code=400, detail="Send between 1 and 100 product names")
+    
+    created = [
+        submit_job(name, request.user_context, request.lane)
+        for name in request.product_names
+    ]
+    return {"count": len(created), "jobs": created}
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """
+    Status (and, once finished, the result) of a job
+    
+    wait: seconds to hold the request open until the job finishes
+    (long-poll, at most 30)
     """
-    return JSONResponse(content={
+    job = await jobs.wait_async(job_id, wait) if wait > 0 else jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a job (a running analysis stops at its next agent step)"""
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+
+def all_products_payload():
+    """The whole product list (encoded once per catalog version)"""
+    return {
         "success": True,
         "total_products": len(ALL_PRODUCTS),
-        "products": ALL_PRODUCTS
-    })
+        "products": list(ALL_PRODUCTS)
+    }
+
+
+@app.get("/api/products")
+def get_all_products(
+    q: Optional[str] = None,
+    category: Optional[str] = None,
+    avoid: str = "",
+    offset: Optional[int] = None,
+    limit: Optional[int] = None
+):
+    """
+    Get list of all products in database
+    
+    With any filter or paging parameter, returns one page instead:
+    Example: /api/products?q=choc&category=snacks&avoid=peanuts&limit=10
+    
+    q matches word starts in name, brand and ingredients (best name
+    match first); category matches part of the category; avoid is a
+    comma-separated allergen list.
+    
+    Plain def like the other catalog endpoints: FastAPI runs them on its
+    worker threads, so scans, SQLite reads and cache rebuilds do not
+    block the event loop.
+    """
+    if q or category or avoid or offset is not None or limit is not None:
+        avoid_list = [item.strip() for item in avoid.split(",") if item.strip()]
+        page = engine.browse_products(q, category, avoid_list, offset or 0, limit or 25)
+        return FastJSONResponse(content={
+            "success": True,
+            "total_products": page["total"],
+            "offset": page["offset"],
+            "limit": page["limit"],
+            "next_offset": page["next_offset"],
+            "products": page["products"]
+        })
+    
+    return response_cache.response("products", all_products_payload)
 
 
 @app.get("/api/v2/products")
-async def get_all_products_v2():
+def get_all_products_v2():
     """V2 Products endpoint"""
-    return JSONResponse(content={
-        "success": True,
-        "total_products": len(ALL_PRODUCTS),
-        "products": ALL_PRODUCTS
-    })
+    return response_cache.response("products", all_products_payload)
+
+
+@app.get("/api/suggest")
+async def suggest_products(q: str = "", limit: int = 8):
+    """
+    Typeahead suggestions for what the user has typed so far
+    Example: /api/suggest?q=coca
+    
+    Matches the start of product names (or any word in them), brands
+    and aliases; popular products come first. An empty q returns the
+    most popular products.
+    """
+    limit = max(1, min(limit, 50))
+    return {
+        "query": q,
+        "suggestions": analysis_tool.analyzer.suggestions.suggest(q, limit)
+    }
+
+
+@app.get("/api/search")
+def search_products(q: str, limit: int = 10):
+    """
+    Free-text product search over names, descriptions and ingredients
+    Example: /api/search?q=cookies without soy
+    
+    "without X", "no X", "X-free" and "-X" exclude products whose
+    ingredients or allergen warnings mention X.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    
+    limit = max(1, min(limit, 50))
+    return analysis_tool.analyzer.search(q, limit)
+
+
+@app.get("/api/products/safe")
+def get_safe_products(
+    avoid: str = "",
+    category: str = "",
+    brand: str = "",
+    profile_id: Optional[str] = None,
+    avoid_traces: Optional[bool] = None,
+    offset: int = 0,
+    limit: int = 25
+):
+    """
+    Products free of the given allergens, optionally by category / brand
+    Example: /api/products/safe?avoid=peanuts,milk,sesame&category=Snacks
+    
+    avoid, category and brand take comma-separated lists. A saved
+    profile_id adds its allergens. Filtering uses the precomputed
+    allergen bitmasks, so it stays fast for very large catalogs.
+    """
+    def split(value):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    
+    profile = resolve_profile(split(avoid), profile_id, avoid_traces)
+    return engine.safe_products(
+        profile.avoid if profile else [],
+        profile.avoid_traces if profile else True,
+        split(category) or None,
+        split(brand) or None,
+        offset,
+        limit
+    )
 
 
 @app.get("/api/products/category/{category}")
-async def get_products_by_category(category: str):
+def get_products_by_category(category: str):
     """
     Get products in a specific category
     Example: /api/products/category/Cookies
     """
-    matching = crew_manager.search_products_by_category(category)
+    def payload():
+        matching = crew_manager.search_products_by_category(category)
+        return {
+            "success": True,
+            "category": category,
+            "count": len(matching),
+            "products": matching
+        }
     
-    return JSONResponse(content={
+    return response_cache.response(("category", category), payload)
+
+
+@app.post("/api/products/lookup")
+def lookup_products(request: ProductLookupRequest):
+    """
+    Look up many products by id or barcode at once
+    Example body: {"codes": ["5449000000996", "0", "12345670"]}
+    
+    Exact lookups only (O(1) each); unknown codes come back with
+    found=false, in the same order as sent.
+    """
+    if not request.codes:
+        raise HTTPException(status_code=400, detail="Send at least one code")
+    try:
+        results = engine.get_products(request.codes)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    
+    return {
         "success": True,
-        "category": category,
-        "count": len(matching),
-        "products": matching
-    })
+        "count": len(results),
+        "found": sum(1 for result in results if result["found"]),
+        "results": results
+    }
+
+
+@app.get("/api/products/{id_or_gtin}")
+def get_product(id_or_gtin: str):
+    """
+    One product by id or barcode (GTIN-8, UPC-A, EAN-13 or GTIN-14)
+    Example: /api/products/5449000000996
+    
+    Declared after /api/products/safe so that path is not read as an id.
+    """
+    product = engine.get_product(id_or_gtin)
+    if product is None:
+        raise HTTPException(status_code=404, detail=f"No product with id or barcode '{id_or_gtin}'")
+    return {"success": True, "product": product}
 
 
 @app.post("/api/quick-check")
-async def quick_allergen_check(request: dict):
+def quick_allergen_check(request: dict):
     """
     Quick check if a product contains a specific allergen
     
@@ -176,6 +533,9 @@ async def quick_allergen_check(request: dict):
         "product_name": "Nutella",
         "allergen": "nuts"
     }
+    
+    A plain def, so FastAPI runs it on its thread pool: the lookup
+    encodes the query and scores every product.
     """
     product_name = request.get("product_name")
     allergen = request.get("allergen")
@@ -186,9 +546,59 @@ async def quick_allergen_check(request: dict):
             detail="Missing product_name or allergen"
         )
     
-    result = crew_manager.quick_allergen_check(product_name, allergen)
+    result = engine.check_allergen(product_name, allergen, record_view=True)
     
-    return JSONResponse(content=result)
+    return FastJSONResponse(content=result)
+
+
+@app.post("/api/profile-check", response_model=ProfileVerdict)
+def check_profile(request: ProfileCheckRequest):
+    """
+    Instant safe / caution / unsafe verdict for a user's allergens (no LLM)
+    
+    Example request:
+    {
+        "product_name": "Snickers",
+        "allergens": ["peanuts", "dairy"]
+    }
+    
+    Unsafe products come with safe alternatives from the same category.
+    Runs on FastAPI's thread pool (plain def), like /api/quick-check.
+    """
+    profile = resolve_profile(request.allergens, request.profile_id, request.avoid_traces)
+    if profile is None:
+        raise HTTPException(status_code=400, detail="Send allergens or a profile_id")
+    
+    return engine.check_profile(request.product_name, profile, record_view=True)
+
+
+@app.put("/api/profiles/{profile_id}", response_model=AllergenProfile)
+async def save_profile(profile_id: str, profile: AllergenProfile):
+    """
+    Save an allergen profile so later requests can just send profile_id
+    """
+    try:
+        engine.profiles.save(profile_id, profile.model_dump())
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return profile
+
+
+@app.get("/api/profiles/{profile_id}", response_model=AllergenProfile)
+async def get_profile(profile_id: str):
+    """Read a saved allergen profile"""
+    saved = engine.profiles.get(profile_id)
+    if saved is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile '{profile_id}'")
+    return AllergenProfile(**saved)
+
+
+@app.delete("/api/profiles/{profile_id}")
+async def delete_profile(profile_id: str):
+    """Delete a saved allergen profile"""
+    if not engine.profiles.delete(profile_id):
+        raise HTTPException(status_code=404, detail=f"Unknown profile '{profile_id}'")
+    return {"success": True, "deleted": profile_id}
 
 
 @app.get("/api/health")
@@ -205,84 +615,76 @@ async def health_check():
             "Recommendation Specialist"
         ],
         "database_loaded": len(ALL_PRODUCTS) > 0,
-        "total_products": len(ALL_PRODUCTS)
+        "total_products": len(ALL_PRODUCTS),
+        "query_cache": analysis_tool.analyzer.query_encoder.stats(),
+        "jobs": jobs.stats(),
+        "admission": admission.stats(),
+        "llm_breaker": crew_manager.breaker.stats(),
+        "pregenerated_reports": crew_manager.reports.stats(),
+        "response_cache": response_cache.stats()
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics: per-stage latency, request latency,
+    cache hits, LLM tokens and queue wait
+    """
+    return PlainTextResponse(
+        METRICS.render(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
 # === Legacy Endpoints (for backward compatibility) ===
 
 @app.get("/products")
-async def legacy_get_products():
+def legacy_get_products():
     """Old endpoint - still works"""
-    return JSONResponse(content=ALL_PRODUCTS)
+    return response_cache.response("legacy_products", lambda: list(ALL_PRODUCTS))
 
 
 @app.post("/analyze_product", response_model=SimpleResponse)
-async def legacy_analyze(request: ProductRequest):
+def legacy_analyze(request: ProductRequest):
     """
     Old simple format - still works
-    Parses the full analysis into simple format
+    Reads the structured report directly (no LLM run needed)
     """
     try:
-        # Get full analysis
-        result = await crew_manager.analyze_product_async(request.product_name)
-        
-        if not result["success"]:
+        is_valid, error_message = crew_manager.validate_query(request.product_name)
+        if not is_valid:
             return SimpleResponse(
                 detected_allergens=[],
                 risk_level="error",
                 ethical_score=0,
-                recommendations=[result.get("error", "Analysis failed")]
+                recommendations=[error_message]
             )
         
-        # Parse the analysis text to extract simple data
-        analysis_text = result.get("analysis", "")
-        
-        # Extract allergens
-        allergens = []
-        if "detected allergens:" in analysis_text.lower():
-            allergen_section = analysis_text.lower().split("detected allergens:")[1]
-            allergen_line = allergen_section.split("\n")[0]
-            if "none" not in allergen_line.lower():
-                allergens = [a.strip() for a in allergen_line.split(",") if a.strip()]
-        
-        # Extract risk level
-        risk_level = "medium"
-        if "risk level:" in analysis_text.lower():
-            risk_section = analysis_text.lower().split("risk level:")[1]
-            risk_line = risk_section.split("\n")[0].strip()
-            if "low" in risk_line:
-                risk_level = "low"
-            elif "high" in risk_line:
-                risk_level = "high"
-        
-        # Extract ethical score
-        ethical_score = 50
-        if "ethical score:" in analysis_text.lower():
-            score_section = analysis_text.lower().split("ethical score:")[1]
-            score_text = score_section.split("/")[0].strip()
-            try:
-                ethical_score = int(''.join(filter(str.isdigit, score_text)))
-            except:
-                ethical_score = 50
+        analysis = engine.analyzer.analyze_product(request.product_name)
+        engine.record_view(analysis.get("index"))
+        report = ProductReport.from_analysis(analysis)
         
-        # Extract recommendations
-        rec_text = result.get("recommendations", "")
-        recommendations = []
-        if rec_text:
-            # Try to find product names in recommendations
-            lines = rec_text.split("\n")
-            for line in lines:
-                if any(word in line.lower() for word in ["alternative", "instead", "try", "recommend"]):
-                    recommendations.append(line.strip())
+        if not report.found:
+            suggestions = [
+                f"Did you mean: {similar.name} ({similar.brand})?"
+                for similar in report.similar_products
+            ]
+            return SimpleResponse(
+                detected_allergens=[],
+                risk_level="unknown",
+                ethical_score=0,
+                recommendations=([report.message] + suggestions)[:5]
+            )
         
+        recommendations = report.recommendations
         if not recommendations:
             recommendations = ["See full analysis for detailed recommendations"]
         
         return SimpleResponse(
-            detected_allergens=allergens,
-            risk_level=risk_level,
-            ethical_score=ethical_score,
+            detected_allergens=report.detected_allergens,
+            risk_level=report.risk_level,
+            ethical_score=report.ethical_score,
             recommendations=recommendations[:5]  # Max 5 recommendations
         )
         
@@ -321,6 +723,11 @@ async def api_info():
                 "url": "GET /api/products",
                 "description": "Get all products"
             },
+            "jobs": {
+                "url": "POST /api/jobs, then GET /api/jobs/{job_id}?wait=20",
+                "description": "Run an analysis in the background and poll for the result",
+                "example": {"product_name": "Oreo Cookies", "lane": "interactive"}
+            },
             "quick_check": {
                 "url": "POST /api/quick-check",
                 "description": "Quick allergen check",
@@ -332,6 +739,40 @@ async def api_info():
             "health": {
                 "url": "GET /api/health",
                 "description": "System status"
+            },
+            "profile_check": {
+                "url": "POST /api/profile-check",
+                "description": "Safe/unsafe verdict for your allergens, with safe alternatives",
+                "example": {"product_name": "Snickers", "allergens": ["peanuts", "dairy"]}
+            },
+            "safe_products": {
+                "url": "GET /api/products/safe?avoid=peanuts,milk&category=Snacks",
+                "description": "Products free of your allergens, by category or brand"
+            },
+            "product_by_code": {
+                "url": "GET /api/products/{id_or_gtin}",
+                "description": "One product by id or barcode (GTIN / EAN / UPC)"
+            },
+            "lookup_codes": {
+                "url": "POST /api/products/lookup",
+                "description": "Many products by id or barcode at once",
+                "example": {"codes": ["5449000000996", "0"]}
+            },
+            "profiles": {
+                "url": "PUT/GET/DELETE /api/profiles/{profile_id}",
+                "description": "Saved allergen profiles"
+            },
+            "search": {
+                "url": "GET /api/search?q=cookies without soy",
+                "description": "Keyword + semantic search with ingredient exclusions"
+            },
+            "suggest": {
+                "url": "GET /api/suggest?q=coca",
+                "description": "Typeahead product suggestions"
+            },
+            "metrics": {
+                "url": "GET /metrics",
+                "description": "Prometheus metrics (stage latency, cache hits, LLM tokens)"
             }
         },
         
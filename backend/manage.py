@@ -0,0 +1,199 @@
+"""
+AllerPredict Management Commands
+One-time build steps that prepare files the server loads at startup
+
+Usage:
+    python backend/manage.py export-onnx
+    python backend/manage.py export-onnx --no-quantize --output /tmp/onnx
+    python backend/manage.py check-encoder --backend onnx-int8
+    python backend/manage.py build-catalog
+    python backend/manage.py build-catalog --source data/data.json --output /tmp/catalog.apcat
+    python backend/manage.py build-catalog --output data/catalog.sqlite3
+    python backend/manage.py build-snapshot
+    python backend/manage.py pregenerate-reports --workers 2
+    python backend/manage.py pregenerate-reports --limit 100 --force
+"""
+import os
+os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+import argparse
+import sys
+import time
+
+# Setup paths (same as main.py)
+BASE_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_FOLDER, "backend"))
+
+# Output files with these endings become SQLite catalogs (rag/catalog_db.py)
+SQLITE_EXTENSIONS = (".sqlite3", ".sqlite", ".db")
+
+# ONNX encoders must find the same top product for at least this share of queries
+MIN_TOP1_AGREEMENT = 0.95
+
+
+def check_encoder(backend, folder, min_agreement=MIN_TOP1_AGREEMENT):
+    """
+    Compare an ONNX backend with PyTorch on the real catalog
+
+    Queries are every product name, plus its lowercase form and brand.
+
+    Returns:
+        bool: True when nearest neighbours match well enough
+    """
+    from rag.encoders import OnnxSentenceEncoder, compare_encoders, load_search_model, onnx_paths
+    from rag.rag_engine import AccurateProductAnalyzer
+
+    reference = load_search_model("torch")
+    analyzer = AccurateProductAnalyzer(search_model=reference)
+    candidate = OnnxSentenceEncoder(*onnx_paths(backend, folder))
+
+    queries = []
+    for product in analyzer.all_products:
+        queries.extend([product["name"], product["name"].lower(), product.get("brand", "")])
+    queries = [query for query in queries if query]
+
+    report = compare_encoders(reference, candidate, analyzer.product_search_data, queries)
+    passed = report["top1_agreement"] >= min_agreement
+
+    print(f"\n🔍 {backend} vs torch on {len(analyzer.product_search_data)} products, {report['queries']} queries")
+    print(f"   Top-1 agreement: {report['top1_agreement']:.2%}")
+    print(f"   Top-3 overlap:   {report['topk_overlap']:.2%}")
+    print(f"   Min cosine:      {report['min_cosine']}")
+    print("✅ Neighbours match" if passed else f"❌ Top-1 agreement below {min_agreement:.0%}")
+    return passed
+
+
+def command_export_onnx(args):
+    from rag.encoders import export_onnx
+
+    print(f"📦 Exporting encoder to {args.output}...")
+    for path in export_onnx(args.output, quantize=not args.no_quantize):
+        print(f"   wrote {path}")
+
+    if args.skip_check:
+        return 0
+
+    backends = ["onnx"] if args.no_quantize else ["onnx", "onnx-int8"]
+    results = [check_encoder(backend, args.output) for backend in backends]
+    return 0 if all(results) else 1
+
+
+def command_check_encoder(args):
+    return 0 if check_encoder(args.backend, args.output) else 1
+
+
+def command_build_catalog(args):
+    from rag.catalog import compile_catalog, load_catalog, read_source_products
+    from rag.catalog_db import build_database
+
+    print(f"📦 Compiling {args.source}...")
+    start = time.perf_counter()
+    if args.output.endswith(SQLITE_EXTENSIONS):
+        count = build_database(read_source_products(args.source), args.output)
+        print(f"   wrote SQLite catalog {args.output}: {count} products "
+              f"in {time.perf_counter() - start:.2f}s")
+    else:
+        header = compile_catalog(args.source, args.output)
+        print(f"   wrote {args.output}: {header['count']} products, {len(header['fields'])} fields "
+              f"in {time.perf_counter() - start:.2f}s")
+
+    # Check: every product reads back unchanged
+    catalog = load_catalog(args.output)
+    for index, product in enumerate(read_source_products(args.source)):
+        if {field: catalog[index][field] for field in product} != product:
+            print(f"❌ Product {index} differs after compiling")
+            return 1
+
+    print(f"✅ Catalog ready. Use it with ALLERPREDICT_CATALOG={os.path.abspath(args.output)}")
+    return 0
+
+
+def command_build_snapshot(args):
+    from rag.encoders import search_model_id
+    from rag.rag_engine import CATALOG_FILE, SNAPSHOT_FILE, AccurateProductAnalyzer
+    from rag.snapshot import open_snapshot
+
+    args.catalog = args.catalog or CATALOG_FILE
+    args.output = args.output or SNAPSHOT_FILE
+
+    # Build from the catalog even if the current snapshot is still valid
+    if os.path.exists(args.output):
+        os.remove(args.output)
+
+    start = time.perf_counter()
+    analyzer = AccurateProductAnalyzer(args.catalog, snapshot_path=args.output)
+    if not os.path.exists(args.output):
+        print("❌ No snapshot written (see the messages above)")
+        return 1
+    print(f"   built in {time.perf_counter() - start:.2f}s, "
+          f"{os.path.getsize(args.output) / 2**20:.1f} MiB")
+
+    # Check: the new file opens and passes its own validation
+    start = time.perf_counter()
+    open_snapshot(args.output, args.catalog, search_model_id(analyzer.search_model))
+    print(f"✅ Snapshot ready, opens in {(time.perf_counter() - start) * 1000:.0f} ms. "
+          f"The server uses it when ALLERPREDICT_SNAPSHOT={os.path.abspath(args.output)}")
+    return 0
+
+
+def command_pregenerate_reports(args):
+    from engine import get_engine
+    from reports import pregenerate_reports
+
+    crew = get_engine().crew
+    counts = pregenerate_reports(crew, crew.reports, workers=args.workers, limit=args.limit,
+                                 force=args.force, mode=args.mode)
+    return 1 if counts["failed"] else 0
+
+
+def main():
+    from rag.encoders import ONNX_FOLDER
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export-onnx", help="Export the search model to ONNX (+ int8) and check it")
+    export.add_argument("--output", default=ONNX_FOLDER, help="Output folder")
+    export.add_argument("--no-quantize", action="store_true", help="Skip the int8 model")
+    export.add_argument("--skip-check", action="store_true", help="Do not compare with PyTorch")
+    export.set_defaults(handler=command_export_onnx)
+
+    check = commands.add_parser("check-encoder", help="Compare an exported ONNX model with PyTorch")
+    check.add_argument("--backend", default="onnx-int8", choices=["onnx", "onnx-int8"])
+    check.add_argument("--output", default=ONNX_FOLDER, help="Folder of the exported model")
+    check.set_defaults(handler=command_check_encoder)
+
+    catalog = commands.add_parser(
+        "build-catalog",
+        help="Compile the product JSON into a memory-mapped catalog (or SQLite for .sqlite3 / .db outputs)"
+    )
+    catalog.add_argument("--source", default=os.path.join(BASE_FOLDER, "data", "metadata.json"),
+                         help="metadata.json or data.json")
+    catalog.add_argument("--output", default=os.path.join(BASE_FOLDER, "data", "catalog.apcat"),
+                         help="Compiled catalog file (.apcat) or SQLite database (.sqlite3)")
+    catalog.set_defaults(handler=command_build_catalog)
+
+    snapshot = commands.add_parser(
+        "build-snapshot",
+        help="Prepare the whole search engine (embeddings, indexes) into a memory-mapped snapshot"
+    )
+    snapshot.add_argument("--catalog", help="Catalog file to build from (default: ALLERPREDICT_CATALOG)")
+    snapshot.add_argument("--output", help="Snapshot file (default: ALLERPREDICT_SNAPSHOT)")
+    snapshot.set_defaults(handler=command_build_snapshot)
+
+    pregenerate = commands.add_parser(
+        "pregenerate-reports",
+        help="Run the agents over the whole catalog and store the reports /api/analyze serves"
+    )
+    pregenerate.add_argument("--workers", type=int, default=2, help="Analyses running at once")
+    pregenerate.add_argument("--limit", type=int, help="Most reports to generate in this run")
+    pregenerate.add_argument("--force", action="store_true", help="Regenerate reports that are still fresh")
+    pregenerate.add_argument("--mode", choices=["dag", "sequential"], help="Pipeline (default: ALLERPREDICT_PIPELINE)")
+    pregenerate.set_defaults(handler=command_pregenerate_reports)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
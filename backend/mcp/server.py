@@ -1,180 +1,292 @@
 """
-MCP Server - Exposes the Product Analysis tool via FastMCP
+MCP Server - Exposes the Product Analysis tools via FastMCP
+Runs on the same shared engine as the FastAPI app
 """
+import asyncio
 import os
 import sys
-from typing import Any
-from mcp.server.fastmcp import FastMCP
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+
+# Import the MCP SDK before our backend folder goes on the path:
+# backend/mcp would otherwise shadow the installed `mcp` package.
+from mcp.server.fastmcp import FastMCP, Context
 
 # Add parent directories to path
 current_dir = os.path.dirname(os.path.abspath(__file__))
 backend_dir = os.path.dirname(current_dir)
 sys.path.insert(0, backend_dir)
+sys.path.insert(0, current_dir)
+
+from engine import get_engine
+from tool import create_product_analysis_tool, ProductAnalysisInput
+
+
+@asynccontextmanager
+async def warm_engine(server):
+    """Load the model, products and agents before the first client call"""
+    # The stdio transport already holds the real stdout, so send our
+    # print() logs (and the agents' verbose output) to stderr instead
+    sys.stdout = sys.stderr
+
+    print("🚀 Warming up AllerPredict AI engine...")
+    engine = await asyncio.to_thread(get_engine)
+    print(f"✅ MCP Server ready ({len(engine.products)} products)\n")
+    yield {"engine": engine}
 
-from agents.crew import AllerPredictCrew
-from mcp.tool import create_product_analysis_tool, ProductAnalysisInput
-from rag.rag_engine import RAGTool
 
 # Initialize FastMCP server
-mcp = FastMCP("AllerPredict AI Server")
-
-# Global instances
-_crew_instance = None
-_rag_tool = None
-
-def initialize_system():
-    """Initialize the RAG system and CrewAI workflow"""
-    global _crew_instance, _rag_tool
-    
-    if _crew_instance is None:
-        print("🚀 Initializing AllerPredict AI System...")
-        
-        # Initialize RAG tool
-        _rag_tool = RAGTool()
-        print("✅ RAG System loaded")
-        
-        # Initialize CrewAI workflow
-        _crew_instance = AllerPredictCrew(_rag_tool)
-        print("✅ CrewAI Agents initialized")
-        print("✅ MCP Server ready\n")
-    
-    return _crew_instance
+mcp = FastMCP("AllerPredict AI Server", lifespan=warm_engine)
+
+# One agent tool for the whole server, so its concurrency limit is shared
+_analysis_tool = None
+
+
+def get_analysis_tool():
+    """Get the shared agent workflow tool"""
+    global _analysis_tool
+
+    if _analysis_tool is None:
+        _analysis_tool = create_product_analysis_tool(get_engine().crew)
+    return _analysis_tool
+
+
+# === Fast tools (database only, no LLM) ===
+
+@mcp.tool()
+async def lookup_product(product_name: str) -> dict[str, Any]:
+    """
+    Look up a product's allergens, risk level and ethical score instantly.
+
+    Args:
+        product_name: Name of the product (e.g., "Oreo Cookies")
+
+    Returns:
+        Structured report from the product database (no AI narrative)
+    """
+    engine = get_engine()
+    return await asyncio.to_thread(engine.lookup, product_name)
+
+
+@mcp.tool()
+async def check_allergen(product_name: str, allergen: str) -> dict[str, Any]:
+    """
+    Check whether a product contains a specific allergen.
+
+    Args:
+        product_name: Name of the product (e.g., "Nutella")
+        allergen: Allergen to check for (e.g., "nuts")
+
+    Returns:
+        Whether the allergen is present, with the detected allergen list
+    """
+    engine = get_engine()
+    return await asyncio.to_thread(engine.check_allergen, product_name, allergen)
+
+
+@mcp.tool()
+async def batch_analyze(product_names: list[str]) -> dict[str, Any]:
+    """
+    Look up several products at once (database only, no AI narrative).
+
+    Args:
+        product_names: Up to 50 product names
+
+    Returns:
+        One structured report per product, in the same order
+    """
+    engine = get_engine()
+    try:
+        results = await asyncio.to_thread(engine.batch_lookup, product_names)
+    except ValueError as error:
+        return {"success": False, "error": str(error), "results": []}
+
+    return {"success": True, "count": len(results), "results": results}
+
+
+@mcp.tool()
+async def lookup_barcodes(codes: list[str]) -> dict[str, Any]:
+    """
+    Look up products by barcode (GTIN / EAN / UPC) or product id, exactly.
+
+    Args:
+        codes: Up to 200 barcodes or ids (e.g. ["5449000000996"])
+
+    Returns:
+        One result per code, in the same order: found, and the product
+        with its allergens, risk level and ethical score
+    """
+    engine = get_engine()
+    try:
+        results = await asyncio.to_thread(engine.get_products, codes)
+    except ValueError as error:
+        return {"success": False, "error": str(error), "results": []}
+
+    return {"success": True, "count": len(results), "results": results}
+
+
+@mcp.tool()
+async def get_products(
+    offset: int = 0,
+    limit: int = 25,
+    fields: Optional[list[str]] = None
+) -> dict[str, Any]:
+    """
+    Get one page of products in the database.
+
+    Args:
+        offset: Index of the first product to return
+        limit: Page size (max 200)
+        fields: Product fields to include (default: id, name, brand, category)
+
+    Returns:
+        The page of products plus total count and next_offset
+    """
+    engine = get_engine()
+    page = engine.list_products(offset, limit, fields)
+    return dict(page, success=True)
+
 
 @mcp.tool()
-async def analyze_product(product_query: str, user_context: str = "") -> dict[str, Any]:
+async def find_safe_products(
+    avoid: list[str],
+    avoid_traces: bool = True,
+    categories: Optional[list[str]] = None,
+    brands: Optional[list[str]] = None,
+    offset: int = 0,
+    limit: int = 25
+) -> dict[str, Any]:
     """
-    Analyze a food product for allergens, safety, and ethical concerns.
-    
+    Find products that contain none of the given allergens (fast, no LLM).
+
+    Args:
+        avoid: Allergens to avoid (e.g. ["peanuts", "milk", "sesame"])
+        avoid_traces: Also skip products that "may contain" them
+        categories: Only these categories (optional)
+        brands: Only these brands (optional)
+        offset: Index of the first match to return
+        limit: Page size (max 200)
+
+    Returns:
+        The page of safe products plus total count and next_offset
+    """
+    engine = get_engine()
+    page = engine.safe_products(avoid, avoid_traces, categories, brands, offset, limit)
+    return dict(page, success=True)
+
+
+# === Slow tool (full AI agent workflow) ===
+
+@mcp.tool()
+async def analyze_product(
+    product_query: str,
+    ctx: Context,
+    user_context: str = ""
+) -> dict[str, Any]:
+    """
+    Analyze a food product with the AI agents (slow: runs the LLM).
+
+    Prefer lookup_product or check_allergen when only the facts are needed.
+    Reports progress after retrieval, the safety agent and the
+    recommendation agent, and can be cancelled by the client.
+
     Args:
         product_query: Name of the product or question about a product
         user_context: Optional user-specific context (allergies, preferences)
-    
+
     Returns:
         Complete analysis with recommendations from AI agents
     """
-    # Initialize system if needed
-    crew = initialize_system()
-    
-    # Create tool and execute
-    tool = create_product_analysis_tool(crew)
+    tool = get_analysis_tool()
     input_data = ProductAnalysisInput(
         product_query=product_query,
         user_context=user_context
     )
-    
-    result = await tool.execute(input_data)
-    
-    # Return as dictionary
-    return {
-        "success": result.success,
-        "product_query": result.product_query,
-        "analysis": result.analysis,
-        "recommendations": result.recommendations,
-        "full_report": result.full_report,
-        "agents_used": result.agents_used,
-        "error": result.error
-    }
 
-@mcp.tool()
-async def get_products() -> dict[str, Any]:
-    """
-    Get list of available products in the database.
-    
-    Returns:
-        List of products with basic information
-    """
-    crew = initialize_system()
-    
-    # Access product data from RAG tool
-    if _rag_tool and hasattr(_rag_tool, 'products'):
-        return {
-            "success": True,
-            "products": _rag_tool.products,
-            "count": len(_rag_tool.products)
-        }
-    
-    return {
-        "success": False,
-        "error": "Products not loaded",
-        "products": []
-    }
+    result = await tool.execute(input_data, progress=ctx.report_progress)
+    return result.model_dump()
+
 
 @mcp.resource("allerpredict://system/info")
 async def get_system_info() -> str:
     """
     Get information about the AllerPredict AI system.
-    
+
     Returns:
         System information and capabilities
     """
     return """
     # AllerPredict AI - Agentic Product Analysis System
-    
+
     ## Overview
     AllerPredict AI is an advanced agentic system that analyzes food products for:
     - Allergen detection and safety assessment
     - Ethical and sustainability concerns
     - Alternative product recommendations
-    
+
     ## Architecture
     - **RAG Pipeline**: Retrieval-Augmented Generation for accurate product data
     - **Multi-Agent System**: CrewAI-powered analysis and recommendation workflow
     - **MCP Server**: Model Context Protocol for tool exposure
-    
+
     ## Agents
     1. **Product Safety Analyst**: Analyzes allergens and risks
     2. **Recommendation Specialist**: Suggests safer alternatives
-    
+
     ## Capabilities
     - Real-time product analysis
     - Personalized recommendations
     - Evidence-based risk assessment
     - Ethical scoring (0-100)
-    
+
     ## Usage
-    Use the `analyze_product` tool with a product name or question.
+    Fast (database only): `lookup_product`, `check_allergen`, `batch_analyze`, `get_products`.
+    Slow (AI agents): `analyze_product` with a product name or question.
     """
 
+
 @mcp.prompt()
 async def product_analysis_prompt(product_name: str) -> str:
     """
     Generate a structured prompt for product analysis.
-    
+
     Args:
         product_name: Name of the product to analyze
-    
+
     Returns:
         Formatted prompt for the AI agents
     """
     return f"""
     Please analyze the product: {product_name}
-    
+
     Provide:
     1. Allergen detection
     2. Safety risk assessment
     3. Ethical score and concerns
     4. Recommended alternatives
-    
+
     Format the response in a user-friendly way.
     """
 
+
 # Health check endpoint
 @mcp.tool()
 async def health_check() -> dict[str, Any]:
     """
     Check if the MCP server and all systems are operational.
-    
+
     Returns:
         System health status
     """
     try:
-        crew = initialize_system()
+        engine = get_engine()
         return {
             "status": "healthy",
-            "rag_loaded": _rag_tool is not None,
-            "crew_initialized": _crew_instance is not None,
+            "rag_loaded": engine.analysis_tool is not None,
+            "crew_initialized": engine.crew is not None,
+            "total_products": len(engine.products),
             "server": "FastMCP",
-            "version": "1.0.0"
+            "version": "2.0.0"
         }
     except Exception as e:
         return {
@@ -182,10 +294,10 @@ async def health_check() -> dict[str, Any]:
             "error": str(e)
         }
 
+
 if __name__ == "__main__":
-    # Run the MCP server
-    print("=" * 50)
-    print("AllerPredict AI - MCP Server")
-    print("=" * 50)
-    initialize_system()
-    mcp.run()
\ No newline at end of file
+    # Run the MCP server (stdout is reserved for the MCP protocol)
+    print("=" * 50, file=sys.stderr)
+    print("AllerPredict AI - MCP Server", file=sys.stderr)
+    print("=" * 50, file=sys.stderr)
+    mcp.run()
@@ -1,9 +1,29 @@
 """
 MCP Tool - Wraps the CrewAI workflow as an MCP-compatible tool
 """
-from typing import Dict, Any
+import asyncio
+import os
+import time
+from typing import Dict, Any, Optional, Callable, Awaitable
 from pydantic import BaseModel, Field
 
+from agents.schemas import ProductReport
+from telemetry import record_queue_wait
+
+# How many agent analyses may run at once (others wait their turn)
+MAX_CONCURRENT_ANALYSES = int(os.environ.get("ALLERPREDICT_MCP_MAX_CONCURRENT", "2"))
+
+# Human-readable progress messages for each pipeline stage
+STAGE_MESSAGES = {
+    "retrieval": "Product found in database",
+    "safety_agent": "Safety analysis complete",
+    "recommendation_agent": "Recommendations complete",
+    "allergen_risk": "Allergen and risk analysis complete",
+    "ethics": "Ethical assessment complete",
+    "alternatives": "Alternatives ranked",
+    "merge": "Report ready",
+}
+
 class ProductAnalysisInput(BaseModel):
     """Input schema for the Product Analysis MCP tool"""
     product_query: str = Field(
@@ -26,6 +46,9 @@ class ProductAnalysisOutput(BaseModel):
     full_report: str = Field(default="", description="Complete agent workflow report")
     agents_used: list = Field(default_factory=list, description="List of agents that processed the request")
     error: str = Field(default="", description="Error message if analysis failed")
+    structured: Optional[ProductReport] = Field(default=None, description="Validated allergens, risk level and ethical score from the database")
+    degraded: bool = Field(default=False, description="True when the LLM was skipped and only database facts are returned")
+    degraded_reason: str = Field(default="", description="Why the LLM was skipped (llm_unavailable, llm_error, llm_timeout)")
 
 class ProductAnalysisTool:
     """
@@ -49,32 +72,54 @@ class ProductAnalysisTool:
     - Ingredient analysis
     """
     
-    def __init__(self, crew_instance):
+    def __init__(self, crew_instance, max_concurrent=MAX_CONCURRENT_ANALYSES):
         """
         Initialize the MCP tool with a CrewAI instance
         
         Args:
-            crew_instance: Instance of AllerPredictCrew
+            crew_instance: Instance of ProductAnalysisCrew
+            max_concurrent: Limit on analyses running at the same time
         """
         self.crew = crew_instance
+        self.max_concurrent = max_concurrent
+        self.slots = asyncio.Semaphore(max_concurrent)
     
-    async def execute(self, input_data: ProductAnalysisInput) -> ProductAnalysisOutput:
+    async def execute(
+        self,
+        input_data: ProductAnalysisInput,
+        progress: Optional[Callable[[float, float, str], Awaitable[None]]] = None
+    ) -> ProductAnalysisOutput:
         """
         Execute the product analysis using the agent workflow
         
+        The crew runs off the event loop. Cancelling the awaiting task
+        stops the crew at its next agent step.
+        
         Args:
             input_data: ProductAnalysisInput containing product query and optional context
+            progress: Optional async function(step, total, message), called
+                after each pipeline stage (e.g. Context.report_progress)
             
         Returns:
             ProductAnalysisOutput with complete analysis and recommendations
         """
-        # Enhance query with user context if provided
-        enhanced_query = input_data.product_query
-        if input_data.user_context:
-            enhanced_query = f"{input_data.product_query} (User context: {input_data.user_context})"
+        loop = asyncio.get_running_loop()
+        
+        def on_stage(stage, step, total):
+            # Called from the crew's worker thread
+            if progress is not None:
+                message = STAGE_MESSAGES.get(stage, stage)
+                asyncio.run_coroutine_threadsafe(progress(step, total, message), loop)
         
-        # Execute agent workflow
-        result = await self.crew.analyze_product_async(enhanced_query)
+        # Execute agent workflow (user context only goes to the agents)
+        queued_at = time.perf_counter()
+        async with self.slots:
+            record_queue_wait("mcp_analysis", time.perf_counter() - queued_at)
+            result = await self.crew.analyze_product_async(
+                input_data.product_query,
+                input_data.user_context,
+                progress_callback=on_stage
+            )
         
         # Map to output schema
         return ProductAnalysisOutput(
@@ -84,7 +129,10 @@ class ProductAnalysisTool:
             recommendations=result.get("recommendations", ""),
             full_report=result.get("full_report", ""),
             agents_used=result.get("agents_used", []),
-            error=result.get("error", result.get("message", ""))
+            error=result.get("error", result.get("message", "")),
+            structured=result.get("structured"),
+            degraded=result.get("degraded", False),
+            degraded_reason=result.get("degraded_reason", "")
         )
     
     def get_schema(self) -> Dict[str, Any]:
@@ -107,7 +155,7 @@ def create_product_analysis_tool(crew_instance) -> ProductAnalysisTool:
     Factory function to create a ProductAnalysisTool instance
     
     Args:
-        crew_instance: Instance of AllerPredictCrew
+        crew_instance: Instance of ProductAnalysisCrew
         
     Returns:
         ProductAnalysisTool: Configured MCP tool
@@ -0,0 +1,296 @@
+"""
+Allergen Lexicon
+Maps ingredient words to the major allergens (14 EU + 9 US) and finds
+them in an ingredient list with one compiled regex
+
+Examples:
+- "soy lecithin"  -> soy
+- "whey powder"   -> milk
+- "almond milk"   -> tree nuts (not milk); "oat milk" -> gluten
+- "wheat flour"   -> gluten, wheat ("rice flour" -> nothing)
+- "may contain traces of nuts" -> tree nuts (as a trace, not an ingredient)
+- "nut-free", "non-dairy", "free from egg" -> nothing (they exclude it)
+"""
+import re
+
+# Flours that are wheat flour (a bare "flour" may be rice, corn, almond...)
+WHEAT_FLOURS = [
+    "wheat flour", "plain flour", "all-purpose flour", "self-raising flour",
+    "self-rising flour", "bread flour", "enriched flour", "wholemeal flour",
+]
+
+# Plant milks: the allergen of their source, not milk (the longer phrase
+# matches first, so the "milk" in it is never read on its own)
+PLANT_MILKS = {
+    "soy": ["soy milk", "soya milk", "soy drink", "soya drink"],
+    "tree nuts": ["almond milk", "cashew milk", "hazelnut milk", "walnut milk", "almond drink"],
+    "gluten": ["oat milk", "oat drink"],
+}
+
+# Canonical allergen -> words and derivatives that mean it is present
+ALLERGEN_LEXICON = {
+    "celery": ["celery", "celeriac", "celery salt", "celery seed"],
+    "gluten": [
+        "gluten", "wheat", *WHEAT_FLOURS, "rye", "barley", "oat", "oats", "oatmeal", "oat flour",
+        "oat bran", *PLANT_MILKS["gluten"], "spelt",
+        "kamut", "semolina", "durum", "couscous", "bulgur", "freekeh", "seitan", "malt",
+        "malt extract", "farina", "breadcrumbs", "triticale",
+    ],
+    "wheat": [
+        "wheat", *WHEAT_FLOURS, "semolina", "durum", "couscous", "bulgur",
+        "freekeh", "seitan", "spelt", "kamut", "farina", "breadcrumbs",
+    ],
+    "crustaceans": [
+        "crustacean", "shrimp", "prawn", "crab", "lobster", "crayfish", "langoustine",
+        "krill", "shellfish",
+    ],
+    "eggs": [
+        "egg", "eggs", "egg white", "egg yolk", "albumin", "ovalbumin", "lysozyme",
+        "mayonnaise", "meringue",
+    ],
+    "fish": [
+        "fish", "anchovy", "anchovies", "cod", "salmon", "tuna", "sardine", "mackerel",
+        "tilapia", "haddock", "fish sauce", "fish oil", "surimi",
+    ],
+    "lupin": ["lupin", "lupine", "lupini"],
+    "milk": [
+        "milk", "dairy", "cream", "butter", "buttermilk", "cheese", "whey", "casein",
+        "caseinate", "sodium caseinate", "lactose", "lactalbumin", "ghee", "yogurt",
+        "yoghurt", "curd", "labneh", "labaneh", "milk powder", "milk chocolate",
+        "milk ingredients", "skimmed milk", "milk solids",
+    ],
+    "molluscs": [
+        "mollusc", "mollusk", "mussel", "oyster", "clam", "squid", "octopus", "scallop",
+        "snail", "calamari", "cuttlefish", "oyster sauce",
+    ],
+    "mustard": ["mustard", "mustard seed", "mustard flour"],
+    "tree nuts": [
+        "nut", "nuts", "tree nut", "tree nuts", "almond", "hazelnut", "walnut", "cashew",
+        "pecan", "pistachio", "brazil nut", "macadamia", "pine nut", "praline",
+        "marzipan", "gianduja", "nougat", *PLANT_MILKS["tree nuts"],
+    ],
+    "peanuts": ["peanut", "peanuts", "groundnut", "arachis oil", "peanut butter", "peanut oil"],
+    "sesame": ["sesame", "sesame seed", "sesame oil", "tahini", "tahina", "halva", "halawa", "gomasio"],
+    "soy": [
+        "soy", "soya", "soybean", "soybeans", "soy lecithin", "soya lecithin", "soy protein",
+        "soy sauce", "tofu", "edamame", "miso", "tempeh", "shoyu", "tamari",
+        *PLANT_MILKS["soy"],
+    ],
+    "sulphites": [
+        "sulphite", "sulfite", "sulphites", "sulfites", "sulphur dioxide", "sulfur dioxide",
+        "metabisulphite", "metabisulfite", "e220", "e221", "e222", "e223", "e224",
+        "e225", "e226", "e227", "e228",
+    ],
+}
+
+# Regulatory lists (canonical names above)
+EU_ALLERGENS = (
+    "celery", "gluten", "crustaceans", "eggs", "fish", "lupin", "milk",
+    "molluscs", "mustard", "tree nuts", "peanuts", "sesame", "soy", "sulphites",
+)
+US_ALLERGENS = ("milk", "eggs", "fish", "crustaceans", "tree nuts", "peanuts", "wheat", "soy", "sesame")
+
+# Phrases that look like an allergen but are not one; removed before matching
+NOT_ALLERGENS = [
+    "cocoa butter", "shea butter", "apple butter", "cream of tartar", "coconut milk",
+    "coconut cream", "rice milk", "nutmeg", "butternut", "buckwheat", "water chestnut",
+    "gluten free", "gluten-free",
+]
+
+# "X-free", "non-X", "free from X" (or "free of X, Y and Z"), where X is
+# any lexicon term; {terms} is filled in by AllergenLexicon
+FREE_FROM_PATTERN = (
+    r"(?:{terms})(?:e?s)?[\s-]*free"
+    r"|non[\s-]*(?:{terms})(?:e?s)?"
+    r"|free[\s-]+(?:from|of)\s+(?:{terms})(?:e?s)?(?:\s*(?:,|&|\band\b|\bor\b)\s*(?:{terms})(?:e?s)?)*"
+)
+
+# When one of these is declared, the other is already covered
+EQUIVALENT_ALLERGENS = {"gluten": {"wheat"}, "wheat": {"gluten"}}
+
+_TRACE_MARKERS = re.compile(r"(?:may contain|traces? of|produced in a facility (?:that|which) (?:also )?(?:handles|processes))")
+_SEPARATORS = re.compile(r"[,;()\[\]]|\band\b|\.\s")
+
+
+class AllergenLexicon:
+    """
+    Compiled matcher for ALLERGEN_LEXICON
+
+    All terms go into one regex with word boundaries (and an optional
+    plural "s"/"es"), so "peanuts" matches peanut but "coconut" does not
+    match nut. NOT_ALLERGENS phrases and free-from phrases ("nut-free")
+    are blanked out first.
+    """
+
+    def __init__(self, lexicon=ALLERGEN_LEXICON, not_allergens=NOT_ALLERGENS):
+        self.allergens_of = {}
+        for allergen, terms in lexicon.items():
+            for term in terms:
+                self.allergens_of.setdefault(term, set()).add(allergen)
+
+        terms = "|".join(re.escape(term) for term in sorted(self.allergens_of, key=len, reverse=True))
+        self.pattern = re.compile(r"\b(" + terms + r")(?:e?s)?\b")
+
+        phrases = "|".join(re.escape(phrase) for phrase in sorted(not_allergens, key=len, reverse=True))
+        free_from = FREE_FROM_PATTERN.format(terms=terms)
+        self.ignore = re.compile(r"\b(?:" + free_from + "|" + phrases + r")\b")
+
+    def matches(self, text):
+        """
+        Allergen words in a text
+
+        Returns:
+            dict: canonical allergen -> list of matched words
+        """
+        if not text:
+            return {}
+        text = self.ignore.sub(" ", str(text).lower())
+
+        found = {}
+        for match in self.pattern.finditer(text):
+            term = match.group(1)
+            for allergen in self.allergens_of[term]:
+                words = found.setdefault(allergen, [])
+                if match.group(0) not in words:
+                    words.append(match.group(0))
+        return found
+
+    def canonical(self, text):
+        """
+        Canonical allergens mentioned in a text ("hazelnuts" -> {"tree nuts"})
+
+        Returns:
+            set: Canonical allergen names
+        """
+        return set(self.matches(text))
+
+    def analyze(self, ingredients, declared=()):
+        """
+        Infer allergens from an ingredient list
+
+        Args:
+            ingredients: Ingredient text ("wheat flour, sugar, soy lecithin")
+            declared: Allergens the label already lists
+
+        Returns:
+            dict: inferred (sorted canonical names present as ingredients),
+            traces ("may contain ..." allergens not already inferred),
+            new (inferred allergens that the declared list does not cover),
+            sources (allergen -> ingredient words that triggered it)
+        """
+        contains, traces = parse_ingredients(ingredients)
+
+        sources = {}
+        for ingredient in contains:
+            for allergen, words in self.matches(ingredient).items():
+                sources.setdefault(allergen, []).extend(
+                    word for word in words if word not in sources.get(allergen, [])
+                )
+
+        trace_allergens = set()
+        for ingredient in traces:
+            trace_allergens.update(self.canonical(ingredient))
+
+        covered = set()
+        for item in declared:
+            for allergen in self.canonical(item) or {str(item).lower().strip()}:
+                covered.add(allergen)
+                covered.update(EQUIVALENT_ALLERGENS.get(allergen, ()))
+
+        inferred = sorted(sources)
+        new = []
+        for allergen in inferred:
+            if allergen not in covered:
+                new.append(allergen)
+                covered.update(EQUIVALENT_ALLERGENS.get(allergen, ()))  # wheat adds nothing after gluten
+
+        return {
+            "inferred": inferred,
+            "traces": sorted(trace_allergens - set(inferred)),
+            "new": new,
+            "sources": sources,
+        }
+
+
+def parse_ingredients(ingredients):
+    """
+    Split an ingredient list into ingredients and "may contain" items
+
+    Parentheses are flattened: "chocolate (sugar, milk)" gives
+    "chocolate", "sugar" and "milk".
+
+    Returns:
+        tuple: (list of ingredients, list of trace items)
+    """
+    contains, traces = [], []
+    if not ingredients:
+        return contains, traces
+
+    text = str(ingredients).lower()
+    marker = _TRACE_MARKERS.search(text)
+    trace_text = ""
+    if marker:
+        text, trace_text = text[:marker.start()], text[marker.end():]
+
+    contains = [part.strip(" .:") for part in _SEPARATORS.split(text) if part.strip(" .:")]
+    traces = [part.strip(" .:") for part in _SEPARATORS.split(trace_text) if part.strip(" .:")]
+    return contains, traces
+
+
+# Shared compiled lexicon
+LEXICON = AllergenLexicon()
+
+
+class AllergenBits:
+    """
+    Bit position for every allergen, so a product's allergens fit in
+    one 64-bit integer
+
+    The canonical allergens always get the first bits, in lexicon
+    order. Other labels seen in the catalog ("citrus") get the next
+    free bits when the catalog is built.
+    """
+
+    MAX_BITS = 64
+
+    def __init__(self):
+        self.names = list(ALLERGEN_LEXICON)
+        self.bit_of = {name: position for position, name in enumerate(self.names)}
+
+    @staticmethod
+    def canonical_or_raw(name):
+        """Canonical allergens for a name, or the cleaned name itself"""
+        cleaned = str(name).lower().strip()
+        return LEXICON.canonical(cleaned) or ({cleaned} if cleaned else set())
+
+    def mask(self, names, create=False):
+        """
+        Bitmask for a list of allergen names
+
+        Args:
+            names: Allergen names ("whey" and "dairy" both give the milk bit)
+            create: Give unknown labels a new bit (catalog build only)
+
+        Returns:
+            tuple: (int mask, list of names that have no bit)
+        """
+        mask = 0
+        unknown = []
+        for name in names:
+            keys = self.canonical_or_raw(name)
+            matched = False
+            for key in keys:
+                if key not in self.bit_of and create and len(self.names) < self.MAX_BITS:
+                    self.bit_of[key] = len(self.names)
+                    self.names.append(key)
+                if key in self.bit_of:
+                    mask |= 1 << self.bit_of[key]
+                    matched = True
+            if not matched and keys:
+                unknown.append(str(name).strip())
+        return mask, unknown
+
+    def names_in(self, mask):
+        """Allergen names whose bits are set"""
+        mask = int(mask)
+        return [name for position, name in enumerate(self.names) if mask >> position & 1]
@@ -0,0 +1,135 @@
+"""
+Micro-Batching Inference Scheduler
+Collects single-query encode requests for a few milliseconds and runs
+them through the model as one batch on a dedicated thread
+
+A batch is sent when either:
+- max_batch requests are waiting, or
+- max_wait_ms has passed since the first request of the batch arrived
+
+When traffic is light (the previous batch held a single request) the
+window is skipped, so a lone query is not delayed for nothing.
+
+Each caller gets a Future that resolves to its own embedding.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from telemetry import record_encode_batch, record_queue_wait
+
+# Most queries encoded in one forward pass
+MAX_ENCODE_BATCH = int(os.environ.get("ALLERPREDICT_MAX_ENCODE_BATCH", "32"))
+
+# How long the first request of a batch waits for company (0 = only take what is queued)
+ENCODE_WAIT_MS = float(os.environ.get("ALLERPREDICT_ENCODE_WAIT_MS", "2"))
+
+_STOP = object()
+
+
+class MicroBatchEncoder:
+    """
+    Batches concurrent encode() calls into shared forward passes
+
+    Args:
+        model: Anything with SentenceTransformer's encode(list, batch_size=...)
+        max_batch: Most texts per forward pass
+        max_wait_ms: Longest a request waits for the batch to fill
+    """
+
+    def __init__(self, model, max_batch=MAX_ENCODE_BATCH, max_wait_ms=ENCODE_WAIT_MS):
+        self.model = model
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.encoded = 0
+        self.last_batch_size = 0
+        self.stopped = False
+
+        self.worker = threading.Thread(target=self._run, name="query-encoder", daemon=True)
+        self.worker.start()
+
+    def submit(self, text):
+        """
+        Queue one text for encoding
+
+        Returns:
+            Future: Resolves to a read-only float32 vector
+        """
+        if self.stopped:
+            raise RuntimeError("Encoder has been closed")
+        future = Future()
+        self.requests.put((text, future, time.perf_counter()))
+        return future
+
+    def encode(self, text):
+        """Encode one text and wait for the result"""
+        return self.submit(text).result()
+
+    def close(self):
+        """Stop the worker thread after the queued requests are done"""
+        if not self.stopped:
+            self.stopped = True
+            self.requests.put(_STOP)
+            self.worker.join()
+
+    def _collect(self):
+        """
+        Wait for the next batch of requests
+
+        Returns:
+            list: (text, future, queued_at) tuples, or None when closing
+        """
+        first = self.requests.get()
+        if first is _STOP:
+            return None
+
+        batch = [first]
+        wait = self.max_wait if self.last_batch_size > 1 else 0.0
+        deadline = time.perf_counter() + wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self.requests.put(_STOP)  # Finish this batch, stop on the next loop
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            started = time.perf_counter()
+            for _, _, queued_at in batch:
+                record_queue_wait("query_encoding", started - queued_at)
+
+            try:
+                vectors = np.asarray(
+                    self.model.encode([text for text, _, _ in batch], batch_size=len(batch)),
+                    dtype=np.float32
+                )
+            except Exception as exc:  # Every caller in the batch sees the error
+                for _, future, _ in batch:
+                    future.set_exception(exc)
+                continue
+
+            vectors.setflags(write=False)
+            for position, (_, future, _) in enumerate(batch):
+                future.set_result(vectors[position])
+
+            self.batches += 1
+            self.encoded += len(batch)
+            self.last_batch_size = len(batch)
+            record_encode_batch(len(batch))
@@ -0,0 +1,220 @@
+"""
+BM25 Keyword Index
+Sparse retrieval over every product text field, using precomputed
+posting lists, plus parsing of negated ingredients ("without soy")
+
+- Each term maps to the products that contain it and a precomputed
+  BM25 impact per product, so a query only touches the postings of its
+  own terms, not the whole catalog.
+- A second set of postings covers just ingredients, allergen warnings
+  and inferred allergens; it answers "which products contain X" for
+  negated filters.
+"""
+import math
+import re
+import threading
+
+import numpy as np
+
+# Term weight per field (name matters most)
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "brand": 2.0,
+    "category": 1.5,
+    "description": 1.0,
+    "ingredients": 1.0,
+    "allergen_warnings": 1.0,
+}
+
+# Fields checked by negated filters ("without soy")
+CONTENT_FIELDS = ("ingredients", "allergen_warnings")
+
+# Standard BM25 parameters
+K1 = 1.2
+B = 0.75
+
+STOP_WORDS = {"a", "an", "the", "of", "and", "or", "but", "with", "for", "in", "to", "by", "some"}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# "cookies without soy", "cola with no caramel color", "free of nuts"
+_NEGATION = re.compile(
+    r"\b(?:without|with no|with out|free of|free from|excluding|except|"
+    r"does not contain|doesn't contain|not containing|no)\s+(.+?)(?=\s+(?:but|with)\b|$)"
+)
+# "gluten-free", "nut free"
+_FREE_SUFFIX = re.compile(r"\b([a-z0-9]+)[- ]free\b")
+# "-soy"
+_MINUS_TERM = re.compile(r"(?:^|\s)-([a-z0-9]+)")
+_LIST_SEPARATOR = re.compile(r"\s*(?:,|\band\b|\bor\b|\bnor\b)\s*")
+
+
+def stem(word):
+    """Very light plural stripping: cookies -> cookie, nuts -> nut"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-1]
+    if len(word) > 4 and word.endswith("es") and word[:-2].endswith(("s", "x", "ch", "sh")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Lowercase word stems without stop words"""
+    return [stem(word) for word in _WORD.findall(str(text).lower()) if word not in STOP_WORDS]
+
+
+def parse_query(query):
+    """
+    Split a query into what to look for and what to exclude
+
+    Example:
+        "cookies without soy or milk" -> ("cookies", ["soy", "milk"])
+
+    Returns:
+        tuple: (positive text, list of negated phrases)
+    """
+    text = " ".join(str(query).lower().split())
+    negated = []
+
+    def take_list(match):
+        for phrase in _LIST_SEPARATOR.split(match.group(1)):
+            if tokenize(phrase):
+                negated.append(phrase.strip())
+        return " "
+
+    text = _NEGATION.sub(take_list, text)
+    text = _FREE_SUFFIX.sub(take_list, text)
+    text = _MINUS_TERM.sub(take_list, text)
+
+    return " ".join(text.split()), negated
+
+
+class BM25Index:
+    """
+    Posting lists for BM25 scoring and ingredient filters
+
+    Upserts mark the index stale; it is rebuilt on the next query.
+
+    Args:
+        products: Product list (shared with the analyzer)
+        facts: Optional ProductFactsTable; its inferred allergens count
+            as content, so "without milk" also drops whey or cheese
+    """
+
+    def __init__(self, products, facts=None):
+        self.products = products
+        self.facts = facts
+        self.lock = threading.Lock()
+        self.stale = False
+        self._build()
+
+    @classmethod
+    def from_state(cls, products, facts, postings, contents):
+        """
+        An index over postings built earlier (e.g. read from an engine
+        snapshot, rag/snapshot.py), without building anything
+
+        Args:
+            postings: term -> (product indices, impacts), anything with get()
+            contents: term -> sorted product indices, anything with get()
+        """
+        index = cls.__new__(cls)
+        index.products = products
+        index.facts = facts
+        index.lock = threading.Lock()
+        index.state = (postings, contents, len(products))
+        index.stale = False
+        return index
+
+    def _build(self):
+        count = len(self.products)
+        term_frequencies = {}   # term -> {product index: weighted tf}
+        contents = {}           # term -> set of product indices
+        lengths = np.zeros(count, dtype=np.float32)
+
+        for index, product in enumerate(self.products):
+            for field, weight in FIELD_WEIGHTS.items():
+                tokens = tokenize(product.get(field, ""))
+                lengths[index] += weight * len(tokens)
+                for token in tokens:
+                    postings = term_frequencies.setdefault(token, {})
+                    postings[index] = postings.get(index, 0.0) + weight
+                if field in CONTENT_FIELDS:
+                    for token in tokens:
+                        contents.setdefault(token, set()).add(index)
+
+            if self.facts is not None and index < len(self.facts):
+                for allergen in self.facts.inferred_allergens[index]:
+                    for token in tokenize(allergen):
+                        contents.setdefault(token, set()).add(index)
+
+        average_length = float(lengths.mean()) if count and lengths.mean() > 0 else 1.0
+
+        # Precompute idf * tf part once per (term, product)
+        postings_by_term = {}
+        for term, postings in term_frequencies.items():
+            documents = np.fromiter(postings.keys(), dtype=np.int32, count=len(postings))
+            tf = np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+            idf = math.log(1.0 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            norm = K1 * (1.0 - B + B * lengths[documents] / average_length)
+            postings_by_term[term] = (documents, (idf * tf * (K1 + 1.0) / (tf + norm)).astype(np.float32))
+
+        contents = {
+            term: np.fromiter(sorted(indices), dtype=np.int32, count=len(indices))
+            for term, indices in contents.items()
+        }
+
+        # Swapped in one assignment so queries never see a half-built index
+        self.state = (postings_by_term, contents, count)
+        self.stale = False
+
+    def _refresh(self):
+        """
+        Rebuild if products changed
+
+        Returns:
+            tuple: (postings, contents, product count) to query
+        """
+        with self.lock:
+            if self.stale or self.state[2] != len(self.products):
+                self._build()
+            return self.state
+
+    def mark_stale(self):
+        """Call after a product was added or changed"""
+        self.stale = True
+
+    def scores(self, text):
+        """
+        BM25 score of every product for a text (0 where no term matches)
+
+        Returns:
+            np.ndarray: float32 scores, one per product
+        """
+        postings, _, size = self._refresh()
+        result = np.zeros(size, dtype=np.float32)
+        for term in tokenize(text):
+            posting = postings.get(term)
+            if posting is not None:
+                documents, impacts = posting
+                result[documents] += impacts
+        return result
+
+    def containing(self, phrase):
+        """
+        Products whose ingredients or allergen warnings contain every
+        word of a phrase ("caramel color")
+
+        Returns:
+            np.ndarray: Sorted product indices
+        """
+        _, contents, _ = self._refresh()
+        matches = None
+        for term in tokenize(phrase):
+            documents = contents.get(term)
+            if documents is None:
+                return np.zeros(0, dtype=np.int32)
+            matches = documents if matches is None else np.intersect1d(matches, documents, assume_unique=True)
+        return matches if matches is not None else np.zeros(0, dtype=np.int32)
@@ -0,0 +1,453 @@
+"""
+Compiled Product Catalog
+A columnar, memory-mapped copy of data/metadata.json that opens without parsing
+
+json.load turns every product into a Python dict at startup, which is
+slow and memory-hungry at millions of rows. `manage.py build-catalog`
+writes the catalog once into one binary file instead:
+
+    magic (8 bytes) | header length (8 bytes) | JSON header | sections
+
+- Every product field is a string column: an offsets array (uint64,
+  one more entry than rows) plus the UTF-8 bytes of all values
+  (list fields such as aliases are joined with LIST_SEPARATOR).
+- The derived facts (rag/derived.py) are stored too: risk codes,
+  ethical scores, allergen / trace bitmasks, category and brand codes
+  as NumPy arrays, and the allergen / alternative lists as string
+  columns.
+
+Opening the file maps it into memory (copy-on-write) and reads only the
+header. A product is decoded when it is asked for, so a page of 25
+products decodes 25 rows, whatever the catalog size.
+
+Rebuild the file after changing the data or the scoring rules.
+"""
+import hashlib
+import json
+import os
+import zlib
+
+import numpy as np
+
+from rag.catalog_db import SQLiteCatalog, is_sqlite_catalog
+from rag.derived import ProductFactsTable
+
+MAGIC = b"APCAT001"
+FORMAT_VERSION = 1
+
+# Sections start on a multiple of this many bytes (NumPy needs aligned arrays)
+ALIGNMENT = 64
+
+# Joins the items of a list column (allergens, alternatives)
+LIST_SEPARATOR = "\x1f"
+
+# Derived number arrays: attribute of ProductFactsTable -> dtype
+FACT_ARRAYS = {
+    "risk_codes": "int8",
+    "ethical_scores": "uint8",
+    "allergen_masks": "uint64",
+    "trace_masks": "uint64",
+    "category_codes": "int32",
+    "brand_codes": "int32",
+}
+
+# Product fields that stay lists (stored like the derived list columns)
+LIST_FIELDS = ("aliases",)
+
+# Derived list columns (tuples of strings per product)
+FACT_LISTS = ("allergens", "inferred_allergens", "trace_allergens", "recommendations")
+
+
+class MappedStrings:
+    """
+    A string column read straight from the mapped file
+
+    Behaves like a list: len(), [index], slices, iteration, append and
+    assignment. Changed and added values are kept in memory; the file
+    is never written.
+    """
+
+    def __init__(self, offsets, data):
+        # memoryviews: indexing them is much cheaper than NumPy indexing
+        self.offsets = memoryview(offsets)
+        self.data = memoryview(data)
+        self.stored = len(offsets) - 1
+        self.changed = {}   # index -> new value
+        self.added = []     # values appended after the stored rows
+
+    def decode(self, text):
+        return text
+
+    def __len__(self):
+        return self.stored + len(self.added)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index >= self.stored:
+            return self.added[index - self.stored]
+        if index in self.changed:
+            return self.changed[index]
+        return self.decode(str(self.data[self.offsets[index]:self.offsets[index + 1]], "utf-8"))
+
+    def __setitem__(self, index, value):
+        if index < 0:
+            index += len(self)
+        if index >= self.stored:
+            self.added[index - self.stored] = value
+        else:
+            self.changed[index] = value
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, value):
+        self.added.append(value)
+
+
+class MappedTuples(MappedStrings):
+    """A list column: every value is a tuple of strings"""
+
+    def decode(self, text):
+        return tuple(text.split(LIST_SEPARATOR)) if text else ()
+
+
+class ColumnarCatalog:
+    """
+    The product list, backed by a compiled catalog file
+
+    Drop-in for the list of product dicts: len(), [index] (a dict),
+    slices (a list of dicts), iteration, append and assignment (kept in
+    memory, like MappedStrings).
+
+    Args:
+        path: File written by compile_catalog
+        magic: Expected first bytes (engine snapshots use their own, see
+            rag/snapshot.py)
+    """
+
+    def __init__(self, path, magic=MAGIC):
+        self.path = path
+        self.buffer = np.memmap(path, dtype=np.uint8, mode="c")
+        if bytes(self.buffer[:len(magic)]) != magic:
+            raise ValueError(f"{path} is not a compiled catalog")
+
+        header_length = int(self.buffer[8:16].view(np.uint64)[0])
+        self.header = json.loads(bytes(self.buffer[16:16 + header_length]).decode("utf-8"))
+        if self.header.get("version") != FORMAT_VERSION:
+            raise ValueError(
+                f"{path} has catalog format {self.header.get('version')}, "
+                f"expected {FORMAT_VERSION}; run manage.py build-catalog again"
+            )
+
+        self.fields = self.header["fields"]
+        self.list_fields = set(self.header.get("list_fields", []))
+        self.columns = {
+            field: (MappedTuples if field in self.list_fields else MappedStrings)(
+                self.section(f"{field}.offsets"), self.section(f"{field}.data")
+            )
+            for field in self.fields
+        }
+        self.stored = self.header["count"]
+        self.changed = {}   # index -> replaced product dict
+        self.added = []     # products appended after the stored rows
+
+    def section(self, name):
+        """NumPy view of one section of the file (no copy)"""
+        info = self.header["sections"][name]
+        start = info["offset"]
+        end = start + info["length"] * np.dtype(info["dtype"]).itemsize
+        view = self.buffer[start:end].view(info["dtype"])
+        return view.reshape(info["shape"]) if "shape" in info else view
+
+    def damaged_sections(self):
+        """
+        Sections whose bytes no longer match the CRC-32 in the header
+
+        Reads the whole file, so it is only called when a checksum is
+        wanted (engine snapshots check it at startup).
+
+        Returns:
+            list: Section names (empty when the file is intact)
+        """
+        damaged = []
+        for name, info in self.header["sections"].items():
+            if "crc32" not in info:
+                continue
+            start = info["offset"]
+            end = start + info["length"] * np.dtype(info["dtype"]).itemsize
+            if zlib.crc32(memoryview(self.buffer[start:end])) != info["crc32"]:
+                damaged.append(name)
+        return damaged
+
+    def facts(self):
+        """
+        The precomputed ProductFactsTable, without recomputing any row
+
+        Number arrays are views of the file; writes (upserts) stay in
+        memory because the file is mapped copy-on-write.
+        """
+        table = ProductFactsTable()
+        for name in FACT_ARRAYS:
+            setattr(table, name, self.section(f"facts.{name}"))
+        for name in FACT_LISTS:
+            setattr(table, name, MappedTuples(
+                self.section(f"facts.{name}.offsets"), self.section(f"facts.{name}.data")
+            ))
+
+        table.bits.names = list(self.header["allergen_bits"])
+        table.bits.bit_of = {name: position for position, name in enumerate(table.bits.names)}
+        table.categories = list(self.header["categories"])
+        table.category_of = {str(name).lower().strip(): code for code, name in enumerate(table.categories)}
+        table.brands = list(self.header["brands"])
+        table.brand_of = {str(name).lower().strip(): code for code, name in enumerate(table.brands)}
+        return table
+
+    def names_and_brands(self):
+        """
+        Every product's name and brand, read from their two columns
+        (the other fields are not decoded)
+
+        Returns:
+            tuple: (names, brands), two lists in catalog order
+        """
+        names = self.column_values("name")
+        brands = self.column_values("brand")
+        return names, brands
+
+    def column_values(self, field):
+        """One field of every product as a list ("" where a product has none)"""
+        if field in self.columns:
+            values = self.columns[field][:self.stored]
+        else:
+            values = [""] * self.stored
+        for index, product in self.changed.items():
+            values[index] = product.get(field, "")
+        values.extend(product.get(field, "") for product in self.added)
+        return values
+
+    def __len__(self):
+        return self.stored + len(self.added)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index >= self.stored:
+            return self.added[index - self.stored]
+        if index in self.changed:
+            return self.changed[index]
+        row = {field: self.columns[field][index] for field in self.fields}
+        for field in self.list_fields:
+            row[field] = list(row[field])
+        return row
+
+    def __setitem__(self, index, product):
+        if index < 0:
+            index += len(self)
+        if index >= self.stored:
+            self.added[index - self.stored] = product
+        else:
+            self.changed[index] = product
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, product):
+        self.added.append(product)
+
+
+def is_compiled_catalog(path):
+    """True when the file starts with the compiled catalog magic"""
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def load_catalog(path):
+    """
+    Open a product catalog file
+
+    Args:
+        path: data/metadata.json (a JSON list), a compiled catalog or a
+            SQLite catalog (rag/catalog_db.py)
+
+    Returns:
+        list of product dicts, ColumnarCatalog or SQLiteCatalog
+    """
+    if is_compiled_catalog(path):
+        return ColumnarCatalog(path)
+    if is_sqlite_catalog(path):
+        return SQLiteCatalog(path)
+
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def read_source_products(path):
+    """
+    Products from metadata.json or data.json, with every value a string
+    (LIST_FIELDS, such as aliases, stay lists of strings)
+
+    data.json keeps ingredients, allergens and alternatives as lists and
+    has no ids; they are joined with ", " (as in metadata.json) and the
+    id becomes the row number.
+
+    Returns:
+        list: Product dicts
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    if isinstance(data, dict):
+        data = data.get("products", [])
+    return normalize_products(data)
+
+
+def normalize_products(data):
+    """The products of read_source_products, from an already loaded list"""
+    products = []
+    for index, product in enumerate(data):
+        row = {"id": str(index)}
+        for key, value in product.items():
+            if key in LIST_FIELDS:
+                value = [value] if isinstance(value, str) else (value or [])
+                row[key] = [str(item) for item in value]
+                continue
+            if isinstance(value, list):
+                value = ", ".join(str(item) for item in value)
+            row[key] = "" if value is None else str(value)
+        products.append(row)
+    return products
+
+
+def string_section(values):
+    """(offsets, data) arrays for a list of strings"""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def file_sha256(path):
+    """SHA-256 of a file's bytes (hex)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def compile_catalog(source_path, output_path):
+    """
+    Write the compiled catalog for a JSON catalog
+
+    Args:
+        source_path: data/metadata.json or data/data.json
+        output_path: Where to write the compiled file
+
+    Returns:
+        dict: The file's header (count, fields, sections...)
+    """
+    products = read_source_products(source_path)
+    header, arrays = catalog_sections(products, ProductFactsTable.build(products))
+    header["source"] = {"file": os.path.basename(source_path), "sha256": file_sha256(source_path)}
+    return write_sections(output_path, MAGIC, header, arrays)
+
+
+def catalog_sections(products, facts):
+    """
+    Header and arrays of a compiled catalog
+
+    Args:
+        products: Product dicts with string values (normalize_products)
+        facts: Their ProductFactsTable
+
+    Returns:
+        tuple: (header dict, {section name: NumPy array})
+    """
+    # Every field seen, in first-seen order (missing values become "" or [])
+    fields = []
+    for product in products:
+        for key in product:
+            if key not in fields:
+                fields.append(key)
+    list_fields = [field for field in fields if field in LIST_FIELDS]
+
+    arrays = {}
+    for field in fields:
+        if field in list_fields:
+            values = [LIST_SEPARATOR.join(product.get(field, [])) for product in products]
+        else:
+            values = [product.get(field, "") for product in products]
+        offsets, data = string_section(values)
+        arrays[f"{field}.offsets"] = offsets
+        arrays[f"{field}.data"] = data
+    for name, dtype in FACT_ARRAYS.items():
+        arrays[f"facts.{name}"] = np.asarray(getattr(facts, name), dtype=dtype)
+    for name in FACT_LISTS:
+        offsets, data = string_section([LIST_SEPARATOR.join(values) for values in getattr(facts, name)])
+        arrays[f"facts.{name}.offsets"] = offsets
+        arrays[f"facts.{name}.data"] = data
+
+    header = {
+        "version": FORMAT_VERSION,
+        "count": len(products),
+        "fields": fields,
+        "list_fields": list_fields,
+        "allergen_bits": facts.bits.names,
+        "categories": facts.categories,
+        "brands": facts.brands,
+    }
+    return header, arrays
+
+
+def write_sections(output_path, magic, header, arrays):
+    """
+    Write magic, header and aligned sections (atomically, via a .tmp file)
+
+    Every section's offset, dtype, length, shape and CRC-32 are added
+    to header["sections"].
+
+    Returns:
+        dict: The header as written
+    """
+    header["sections"] = {}
+    checksums = {name: zlib.crc32(np.ascontiguousarray(array).data) for name, array in arrays.items()}
+
+    # Section offsets depend on the header size, which depends on the
+    # offsets: lay out with a size guess until it stops changing
+    header_length = 0
+    while True:
+        position = _align(16 + header_length)
+        for name, array in arrays.items():
+            header["sections"][name] = {
+                "offset": position, "dtype": array.dtype.str, "length": int(array.size),
+                "crc32": checksums[name],
+            }
+            if array.ndim > 1:
+                header["sections"][name]["shape"] = list(array.shape)
+            position = _align(position + array.nbytes)
+        encoded = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        if len(encoded) <= header_length:
+            break
+        header_length = len(encoded) + 256
+
+    # Per-process name: several server workers may rebuild at once
+    temporary_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(magic)
+        file.write(np.uint64(header_length).tobytes())
+        file.write(encoded.ljust(header_length, b" "))
+        for name, array in arrays.items():
+            file.seek(header["sections"][name]["offset"])
+            file.write(np.ascontiguousarray(array).tobytes())
+    os.replace(temporary_path, output_path)
+    return header
+
+
+def _align(position):
+    return (position + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
@@ -0,0 +1,306 @@
+"""
+SQLite Product Catalog
+Optional storage backend: the catalog in an embedded SQLite database
+
+Instead of one JSON array held in RAM, every product is a row:
+
+- products: one row per catalog index, the product as JSON plus
+  indexed category and brand keys
+- products_fts: FTS5 full-text index over name, brand and ingredients
+- product_allergens: one row per (allergen, product), indexed, using
+  the same canonical names as the allergen bitmasks
+
+Changes are single-row transactions, so an upsert no longer rewrites
+the whole catalog. Reads go through a small connection pool; the
+database runs in WAL mode, so readers never wait for a writer.
+
+Build one with `python backend/manage.py build-catalog --output
+data/catalog.sqlite3` and select it with ALLERPREDICT_CATALOG.
+"""
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from rag.allergens import AllergenBits
+from rag.derived import ProductFactsTable
+
+SQLITE_MAGIC = b"SQLite format 3\x00"
+
+# Reader connections kept open
+POOL_SIZE = int(os.environ.get("ALLERPREDICT_CATALOG_DB_CONNECTIONS", "4"))
+
+# Rows fetched per query when walking the whole catalog
+ITERATION_BATCH = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    idx INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    category_key TEXT NOT NULL,
+    brand_key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS products_category ON products (category_key);
+CREATE INDEX IF NOT EXISTS products_brand ON products (brand_key);
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5 (name, brand, ingredients);
+CREATE TABLE IF NOT EXISTS product_allergens (
+    allergen TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    PRIMARY KEY (allergen, idx)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS product_allergens_idx ON product_allergens (idx);
+"""
+
+_WORD = re.compile(r"\w+")
+
+
+def search_terms(text):
+    """Lowercase words of a search text (each one is matched as a prefix)"""
+    return _WORD.findall(str(text).lower())
+
+
+def allergen_keys(allergens):
+    """Canonical allergen names, as stored in product_allergens"""
+    keys = set()
+    for name in allergens:
+        keys |= AllergenBits.canonical_or_raw(name)
+    return keys
+
+
+class ConnectionPool:
+    """
+    A fixed set of SQLite connections shared by threads
+
+    Usage:
+        with pool.connection() as connection:
+            connection.execute(...)
+    """
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.idle = queue.LifoQueue()
+        for _ in range(max(1, size)):
+            self.idle.put(self._connect())
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextmanager
+    def connection(self):
+        connection = self.idle.get()
+        try:
+            yield connection
+        finally:
+            self.idle.put(connection)
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get_nowait().close()
+
+
+class SQLiteCatalog:
+    """
+    The product list, backed by a SQLite database
+
+    Drop-in for the list of product dicts: len(), [index] (a dict),
+    slices (a list of dicts), iteration, append and assignment (written
+    to the database straight away).
+
+    Args:
+        path: Database written by build_database
+        pool_size: Reader connections
+    """
+
+    def __init__(self, path, pool_size=POOL_SIZE):
+        self.path = path
+        self.pool = ConnectionPool(path, pool_size)
+        self.write_lock = threading.Lock()
+        with self.pool.connection() as connection:
+            self.count = connection.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            rows = self._rows(start, max(0, stop - start))
+            return rows[::step]
+        index = int(index)  # NumPy integers do not bind as SQLite integers
+        if index < 0:
+            index += len(self)
+        with self.pool.connection() as connection:
+            row = connection.execute("SELECT data FROM products WHERE idx = ?", (index,)).fetchone()
+        if row is None:
+            raise IndexError(f"Product index {index} out of range")
+        return json.loads(row[0])
+
+    def __setitem__(self, index, product):
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Product index {index} out of range")
+        with self.write_lock:
+            self._write(index, product)
+
+    def __iter__(self):
+        for start in range(0, len(self), ITERATION_BATCH):
+            yield from self._rows(start, ITERATION_BATCH)
+
+    def append(self, product):
+        with self.write_lock:
+            self._write(self.count, product)
+            self.count += 1
+
+    def _rows(self, start, count):
+        with self.pool.connection() as connection:
+            rows = connection.execute(
+                "SELECT data FROM products WHERE idx >= ? ORDER BY idx LIMIT ?", (start, count)
+            ).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def _write(self, index, product):
+        facts = ProductFactsTable.build([product])
+        allergens = facts.allergens[0] + facts.inferred_allergens[0]
+        with self.pool.connection() as connection, connection:
+            write_product(connection, index, product, allergens)
+
+    def names_and_brands(self):
+        """
+        Every product's name and brand, read from the full-text table
+        (no product JSON is parsed)
+
+        Returns:
+            tuple: (names, brands), two lists in catalog order
+        """
+        with self.pool.connection() as connection:
+            rows = connection.execute("SELECT name, brand FROM products_fts ORDER BY rowid").fetchall()
+        return [name for name, _ in rows], [brand for _, brand in rows]
+
+    def search_text(self, text, limit=None):
+        """
+        Products whose name, brand or ingredients contain every word
+        (as a word prefix), best FTS5 rank first
+
+        Returns:
+            list: Catalog indices
+        """
+        terms = search_terms(text)
+        if not terms:
+            return []
+        match = " ".join(f'"{term}"*' for term in terms)
+        sql = "SELECT rowid FROM products_fts WHERE products_fts MATCH ? ORDER BY rank"
+        parameters = [match]
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        with self.pool.connection() as connection:
+            return [index for index, in connection.execute(sql, parameters)]
+
+    def in_category(self, category):
+        """
+        Products whose category contains the text (case-insensitive)
+
+        The distinct categories are read from the category index, then
+        the matching ones are looked up through it.
+
+        Returns:
+            list: Catalog indices, in catalog order
+        """
+        wanted = str(category).lower().strip()
+        with self.pool.connection() as connection:
+            keys = [key for key, in connection.execute("SELECT DISTINCT category_key FROM products")]
+            keys = [key for key in keys if wanted in key]
+            if not keys:
+                return []
+            marks = ",".join("?" * len(keys))
+            return [index for index, in connection.execute(
+                f"SELECT idx FROM products WHERE category_key IN ({marks}) ORDER BY idx", keys
+            )]
+
+    def containing_allergens(self, allergens):
+        """
+        Products that contain any of the allergens (declared or found in
+        the ingredients)
+
+        Returns:
+            set: Catalog indices
+        """
+        keys = sorted(allergen_keys(allergens))
+        if not keys:
+            return set()
+        marks = ",".join("?" * len(keys))
+        with self.pool.connection() as connection:
+            return {index for index, in connection.execute(
+                f"SELECT idx FROM product_allergens WHERE allergen IN ({marks})", keys
+            )}
+
+
+def write_product(connection, index, product, allergens):
+    """Insert or replace one product in every table (caller commits)"""
+    connection.execute(
+        "INSERT OR REPLACE INTO products (idx, data, category_key, brand_key) VALUES (?, ?, ?, ?)",
+        (
+            index,
+            json.dumps(product, ensure_ascii=False),
+            str(product.get("category", "")).lower().strip(),
+            str(product.get("brand", "")).lower().strip(),
+        )
+    )
+    connection.execute("DELETE FROM products_fts WHERE rowid = ?", (index,))
+    connection.execute(
+        "INSERT INTO products_fts (rowid, name, brand, ingredients) VALUES (?, ?, ?, ?)",
+        (index, str(product.get("name", "")), str(product.get("brand", "")), str(product.get("ingredients", "")))
+    )
+    connection.execute("DELETE FROM product_allergens WHERE idx = ?", (index,))
+    connection.executemany(
+        "INSERT INTO product_allergens (allergen, idx) VALUES (?, ?)",
+        [(key, index) for key in allergen_keys(allergens)]
+    )
+
+
+def build_database(products, output_path):
+    """
+    Write a SQLite catalog for a product list
+
+    Args:
+        products: List of product dicts
+        output_path: Database file (replaced if it exists)
+
+    Returns:
+        int: Number of products written
+    """
+    facts = ProductFactsTable.build(products)
+
+    temporary_path = output_path + ".tmp"
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+
+    connection = sqlite3.connect(temporary_path)
+    try:
+        connection.executescript(SCHEMA)
+        with connection:
+            for index, product in enumerate(products):
+                write_product(connection, index, product, facts.allergens[index] + facts.inferred_allergens[index])
+        connection.execute("PRAGMA optimize")
+    finally:
+        connection.close()
+
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(output_path + suffix):
+            os.remove(output_path + suffix)
+    os.replace(temporary_path, output_path)
+    return len(products)
+
+
+def is_sqlite_catalog(path):
+    """True when the file is a SQLite database"""
+    with open(path, "rb") as file:
+        return file.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
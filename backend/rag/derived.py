@@ -0,0 +1,340 @@
+"""
+Precomputed Product Facts
+Allergens, risk level, ethical score and alternatives worked out once per product
+"""
+import re
+import numpy as np
+
+from rag.allergens import LEXICON, AllergenBits
+
+
+# Keyword lists used by the scoring rules
+EMPTY_ALLERGEN_VALUES = {'none', 'n/a', 'no allergens', 'nil'}
+HIGH_RISK_ALLERGENS = ['peanut', 'tree nut', 'shellfish', 'fish', 'sesame']
+CROSS_CONTAMINATION = ['may contain', 'traces of']
+
+SERIOUS_ISSUES = ['child labor', 'forced labor', 'slavery', 'exploitation']
+MAJOR_CONCERNS = ['lawsuit', 'accused', 'investigation', 'violation']
+MODERATE_ISSUES = ['criticism', 'controversy', 'concern', 'disputed']
+POSITIVE_FACTORS = ['fair trade', 'organic', 'sustainable', 'certified', 'ethical']
+
+# Points for each ethical keyword group
+ETHICAL_POINTS = {
+    'serious': -30,
+    'major': -20,
+    'moderate': -15,
+    'positive': 10,
+}
+
+RISK_LEVELS = ("low", "medium", "high")
+
+
+class KeywordMatcher:
+    """
+    One compiled regex for a whole set of keywords
+
+    Behaves like running `keyword in text` for every keyword, but scans
+    the text only once. A lookahead is used so overlapping keywords
+    (e.g. "fish" inside "shellfish") are all found.
+    """
+
+    def __init__(self, keyword_groups):
+        """
+        Args:
+            keyword_groups: dict of group name -> list of lowercase keywords
+        """
+        self.group_of = {}
+        for group, keywords in keyword_groups.items():
+            for keyword in keywords:
+                self.group_of[keyword] = group
+
+        # Longest first, so a longer keyword wins at the same position
+        keywords = sorted(self.group_of, key=len, reverse=True)
+        self.pattern = re.compile(
+            "(?=(" + "|".join(re.escape(keyword) for keyword in keywords) + "))"
+        )
+
+        # Shorter keywords hidden by a longer one starting at the same place
+        self.prefixes = {
+            keyword: [other for other in keywords if other != keyword and keyword.startswith(other)]
+            for keyword in keywords
+        }
+
+    def find(self, text):
+        """
+        Find every keyword contained in the text
+
+        Returns:
+            set: Matched keywords
+        """
+        if not text:
+            return set()
+
+        found = set()
+        for match in self.pattern.finditer(text.lower()):
+            keyword = match.group(1)
+            found.add(keyword)
+            found.update(self.prefixes[keyword])
+        return found
+
+    def find_groups(self, text):
+        """
+        Count distinct matched keywords per group
+
+        Returns:
+            dict: group name -> number of distinct keywords found
+        """
+        counts = {}
+        for keyword in self.find(text):
+            group = self.group_of[keyword]
+            counts[group] = counts.get(group, 0) + 1
+        return counts
+
+
+HIGH_RISK_MATCHER = KeywordMatcher({'high_risk': HIGH_RISK_ALLERGENS})
+CROSS_CONTAMINATION_MATCHER = KeywordMatcher({'cross_contamination': CROSS_CONTAMINATION})
+ETHICAL_MATCHER = KeywordMatcher({
+    'serious': SERIOUS_ISSUES,
+    'major': MAJOR_CONCERNS,
+    'moderate': MODERATE_ISSUES,
+    'positive': POSITIVE_FACTORS,
+})
+
+
+def extract_allergens(allergen_text):
+    """
+    Extract and clean allergen list
+    """
+    if not allergen_text or allergen_text.strip() == "":
+        return []
+
+    allergen_list = [item.strip() for item in allergen_text.split(',')]
+
+    # Remove empty and "none" values
+    return [
+        item for item in allergen_list
+        if item and item.lower() not in EMPTY_ALLERGEN_VALUES
+    ]
+
+
+def calculate_risk_level(allergens, ingredients):
+    """
+    Multi-factor risk assessment
+    """
+    # Factor 1: Number of allergens
+    num_allergens = len(allergens)
+    if num_allergens == 0:
+        risk_score = 0
+    elif num_allergens <= 2:
+        risk_score = 30
+    elif num_allergens <= 4:
+        risk_score = 60
+    else:
+        risk_score = 90
+
+    # Factor 2: High-risk allergens (counted once)
+    if HIGH_RISK_MATCHER.find(' '.join(allergens)):
+        risk_score += 20
+
+    # Factor 3: Cross-contamination warnings
+    if CROSS_CONTAMINATION_MATCHER.find(ingredients):
+        risk_score += 15
+
+    # Convert to level
+    if risk_score <= 20:
+        return "low"
+    elif risk_score <= 50:
+        return "medium"
+    else:
+        return "high"
+
+
+def calculate_ethical_score(ethical_notes):
+    """
+    Keyword-based ethical scoring
+    """
+    if not ethical_notes:
+        return 75
+
+    score = 100
+    for group, count in ETHICAL_MATCHER.find_groups(ethical_notes).items():
+        score += ETHICAL_POINTS[group] * count
+
+    return max(0, min(100, score))
+
+
+def extract_recommendations(recommendation_text):
+    """
+    Extract product recommendations
+    """
+    if not recommendation_text or recommendation_text.strip() == "":
+        return []
+
+    rec_list = [item.strip() for item in recommendation_text.split(',')]
+    return [item for item in rec_list if item and len(item) > 2]
+
+
+class ProductFactsTable:
+    """
+    Derived fields for every product, one row per catalog index
+
+    Numbers live in NumPy arrays; allergen and alternative lists are
+    stored as tuples so a row can be handed out without copying.
+
+    Allergens are the label's allergen_warnings plus any allergen the
+    ingredient list shows that the label does not cover (see
+    rag/allergens.py); inferred_allergens keeps what the ingredients
+    alone show.
+
+    allergen_masks / trace_masks hold the same allergens as one bit
+    each (see AllergenBits), so "is this safe for me" is a single AND.
+    """
+
+    def __init__(self):
+        self.risk_codes = np.zeros(0, dtype=np.int8)
+        self.ethical_scores = np.zeros(0, dtype=np.uint8)
+        self.allergen_masks = np.zeros(0, dtype=np.uint64)
+        self.trace_masks = np.zeros(0, dtype=np.uint64)
+        self.category_codes = np.zeros(0, dtype=np.int32)
+        self.brand_codes = np.zeros(0, dtype=np.int32)
+        self.allergens = []
+        self.inferred_allergens = []
+        self.trace_allergens = []
+        self.recommendations = []
+        self.bits = AllergenBits()
+        self.categories = []       # category code -> name
+        self.category_of = {}      # lowercase name -> category code
+        self.brands = []           # brand code -> name
+        self.brand_of = {}         # lowercase name -> brand code
+
+    @classmethod
+    def build(cls, products):
+        """
+        Compute the table for a whole catalog
+
+        Args:
+            products: List of product dicts
+
+        Returns:
+            ProductFactsTable: One row per product, in the same order
+        """
+        table = cls()
+        rows = [cls._compute_row(product) for product in products]
+
+        table.risk_codes = np.array([row[0] for row in rows], dtype=np.int8)
+        table.ethical_scores = np.array([row[1] for row in rows], dtype=np.uint8)
+        table.allergens = [row[2] for row in rows]
+        table.recommendations = [row[3] for row in rows]
+        table.inferred_allergens = [row[4] for row in rows]
+        table.trace_allergens = [row[5] for row in rows]
+
+        masks = [table._masks(row) for row in rows]
+        table.allergen_masks = np.array([mask for mask, _ in masks], dtype=np.uint64)
+        table.trace_masks = np.array([trace for _, trace in masks], dtype=np.uint64)
+        table.category_codes = np.array(
+            [table._category_code(product.get('category', '')) for product in products],
+            dtype=np.int32
+        )
+        table.brand_codes = np.array(
+            [table._brand_code(product.get('brand', '')) for product in products],
+            dtype=np.int32
+        )
+        return table
+
+    def _masks(self, row):
+        """(allergen bitmask, trace bitmask) for a computed row"""
+        allergen_mask, _ = self.bits.mask(row[2] + row[4], create=True)
+        trace_mask, _ = self.bits.mask(row[5], create=True)
+        return allergen_mask, trace_mask
+
+    def _category_code(self, category):
+        """Small integer for a category name (case-insensitive)"""
+        return self._code(category, self.categories, self.category_of)
+
+    def _brand_code(self, brand):
+        """Small integer for a brand name (case-insensitive)"""
+        return self._code(brand, self.brands, self.brand_of)
+
+    @staticmethod
+    def _code(name, names, code_of):
+        key = str(name).lower().strip()
+        if key not in code_of:
+            code_of[key] = len(names)
+            names.append(name)
+        return code_of[key]
+
+    @staticmethod
+    def _compute_row(product):
+        """
+        Work out (risk code, ethical score, allergens, alternatives,
+        inferred allergens, trace allergens) for one product
+        """
+        declared = extract_allergens(product.get('allergen_warnings', ''))
+        ingredients = product.get('ingredients', '')
+        inference = LEXICON.analyze(ingredients, declared)
+
+        allergens = tuple(declared + inference['new'])
+        risk_level = calculate_risk_level(allergens, ingredients)
+        ethical_score = calculate_ethical_score(product.get('ethical_notes', ''))
+        recommendations = tuple(extract_recommendations(product.get('recommendations', '')))
+        return (
+            RISK_LEVELS.index(risk_level), ethical_score, allergens, recommendations,
+            tuple(inference['inferred']), tuple(inference['traces'])
+        )
+
+    def upsert(self, index, product):
+        """
+        Recompute one row (appends when index == len(self))
+
+        Args:
+            index: Catalog index of the product
+            product: The new product dict
+        """
+        row = self._compute_row(product)
+        risk_code, ethical_score, allergens, recommendations, inferred, traces = row
+        allergen_mask, trace_mask = self._masks(row)
+        category_code = self._category_code(product.get('category', ''))
+        brand_code = self._brand_code(product.get('brand', ''))
+
+        if index == len(self):
+            self.risk_codes = np.append(self.risk_codes, np.int8(risk_code))
+            self.ethical_scores = np.append(self.ethical_scores, np.uint8(ethical_score))
+            self.allergen_masks = np.append(self.allergen_masks, np.uint64(allergen_mask))
+            self.trace_masks = np.append(self.trace_masks, np.uint64(trace_mask))
+            self.category_codes = np.append(self.category_codes, np.int32(category_code))
+            self.brand_codes = np.append(self.brand_codes, np.int32(brand_code))
+            self.allergens.append(allergens)
+            self.recommendations.append(recommendations)
+            self.inferred_allergens.append(inferred)
+            self.trace_allergens.append(traces)
+        else:
+            self.risk_codes[index] = risk_code
+            self.ethical_scores[index] = ethical_score
+            self.allergen_masks[index] = allergen_mask
+            self.trace_masks[index] = trace_mask
+            self.category_codes[index] = category_code
+            self.brand_codes[index] = brand_code
+            self.allergens[index] = allergens
+            self.recommendations[index] = recommendations
+            self.inferred_allergens[index] = inferred
+            self.trace_allergens[index] = traces
+
+    def row(self, index):
+        """
+        Read the derived fields for one product
+
+        Returns:
+            dict: detected_allergens, inferred_allergens, trace_allergens,
+            risk_level, ethical_score, recommendations
+        """
+        return {
+            "detected_allergens": list(self.allergens[index]),
+            "inferred_allergens": list(self.inferred_allergens[index]),
+            "trace_allergens": list(self.trace_allergens[index]),
+            "risk_level": RISK_LEVELS[self.risk_codes[index]],
+            "ethical_score": int(self.ethical_scores[index]),
+            "recommendations": list(self.recommendations[index]),
+        }
+
+    def __len__(self):
+        return len(self.allergens)
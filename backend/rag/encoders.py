@@ -0,0 +1,246 @@
+"""
+Search Model Backends
+Loads the sentence encoder used for product and query embeddings
+
+Backends (ALLERPREDICT_ENCODER_BACKEND):
+- torch:     SentenceTransformer('all-MiniLM-L6-v2') on PyTorch (default)
+- onnx:      the same model exported to ONNX, run by ONNX Runtime with
+             full graph optimization
+- onnx-int8: the ONNX model with dynamic int8 weight quantization
+
+The ONNX backends need a one-time export:
+    python backend/manage.py export-onnx
+They only import onnxruntime and tokenizers, not torch, so startup is faster.
+"""
+import os
+
+import numpy as np
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+BASE_FOLDER = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENCODER_BACKEND = os.environ.get("ALLERPREDICT_ENCODER_BACKEND", "torch")
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# Where export-onnx writes the model and tokenizer
+ONNX_FOLDER = os.environ.get(
+    "ALLERPREDICT_ONNX_DIR",
+    os.path.join(BASE_FOLDER, "data", ".cache", "onnx", MODEL_NAME)
+)
+
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model.int8.onnx"}
+
+# all-MiniLM-L6-v2 truncates inputs to 256 word pieces
+MAX_SEQUENCE_LENGTH = 256
+
+
+class OnnxSentenceEncoder:
+    """
+    ONNX Runtime version of SentenceTransformer('all-MiniLM-L6-v2')
+
+    Same pipeline as the original: BERT -> mean pooling over real
+    tokens -> L2 normalization. encode() accepts the same arguments
+    that the analyzer uses.
+    """
+
+    def __init__(self, model_path, tokenizer_path):
+        import onnxruntime
+
+        # Recorded with anything built from its embeddings (see search_model_id)
+        self.model_id = f"{MODEL_NAME}/onnx:{os.path.basename(model_path)}"
+        from tokenizers import Tokenizer
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {item.name for item in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=MAX_SEQUENCE_LENGTH)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """
+        Embed one string or a list of strings
+
+        Returns:
+            np.ndarray: (384,) for a string, (n, 384) for a list
+        """
+        if isinstance(sentences, str):
+            return self._encode_batch([sentences])[0]
+        if len(sentences) == 0:
+            return np.zeros((0, 384), dtype=np.float32)
+
+        parts = [
+            self._encode_batch(sentences[start:start + batch_size])
+            for start in range(0, len(sentences), batch_size)
+        ]
+        return np.concatenate(parts)
+
+    def _encode_batch(self, sentences):
+        encodings = self.tokenizer.encode_batch(list(sentences))
+        input_ids = np.array([item.ids for item in encodings], dtype=np.int64)
+        attention_mask = np.array([item.attention_mask for item in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": np.zeros_like(input_ids),
+        }
+        feeds = {name: value for name, value in feeds.items() if name in self.input_names}
+
+        token_vectors = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real (non-padding) tokens
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_vectors * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+
+def onnx_paths(backend, folder=ONNX_FOLDER):
+    """Model and tokenizer file paths of an ONNX backend"""
+    return os.path.join(folder, ONNX_FILES[backend]), os.path.join(folder, "tokenizer.json")
+
+
+def load_search_model(backend=None):
+    """
+    Create the sentence encoder for a backend
+
+    Falls back to PyTorch when the ONNX export is missing.
+
+    Args:
+        backend: "torch", "onnx" or "onnx-int8" (default: ENCODER_BACKEND)
+
+    Returns:
+        Object with SentenceTransformer's encode()
+    """
+    backend = backend or ENCODER_BACKEND
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}', expected one of {ENCODER_BACKENDS}")
+
+    if backend != "torch":
+        model_path, tokenizer_path = onnx_paths(backend)
+        if os.path.exists(model_path) and os.path.exists(tokenizer_path):
+            print(f"⚡ Using ONNX Runtime encoder ({backend})")
+            return OnnxSentenceEncoder(model_path, tokenizer_path)
+        print(f"⚠️ {model_path} not found, run 'python backend/manage.py export-onnx'. Using PyTorch.")
+
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(MODEL_NAME)
+
+
+def search_model_id(model):
+    """
+    Name of the model behind an encoder, e.g. "all-MiniLM-L6-v2/torch"
+
+    Stored with saved embeddings (rag/snapshot.py) so they are not
+    mixed with a different model's.
+    """
+    model_id = getattr(model, "model_id", None)
+    if model_id:
+        return model_id
+    if type(model).__name__ == "SentenceTransformer":
+        return f"{MODEL_NAME}/torch"
+    return f"{type(model).__module__}.{type(model).__name__}"
+
+
+def export_onnx(folder=ONNX_FOLDER, quantize=True):
+    """
+    Export all-MiniLM-L6-v2 to ONNX (and an int8 copy)
+
+    Needs torch, sentence-transformers and onnxruntime.
+
+    Args:
+        folder: Output folder for model.onnx, model.int8.onnx and tokenizer.json
+        quantize: Also write the dynamically quantized int8 model
+
+    Returns:
+        list: Paths of the written files
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(folder, exist_ok=True)
+    model_path, tokenizer_path = onnx_paths("onnx", folder)
+
+    reference = SentenceTransformer(MODEL_NAME, device="cpu")
+    transformer = reference[0].auto_model
+    transformer.config.return_dict = False
+    transformer.eval()
+
+    sample = reference.tokenizer(["oreo cookies"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state", "pooler_output"],
+            dynamic_axes={
+                **{name: {0: "batch", 1: "sequence"} for name in input_names},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+                "pooler_output": {0: "batch"},
+            },
+            opset_version=14,
+        )
+
+    # The fast tokenizer saves everything OnnxSentenceEncoder needs in tokenizer.json
+    reference.tokenizer.save_pretrained(folder)
+    written = [model_path, tokenizer_path]
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        int8_path = onnx_paths("onnx-int8", folder)[0]
+        quantize_dynamic(model_path, int8_path, weight_type=QuantType.QInt8)
+        written.append(int8_path)
+
+    return written
+
+
+def compare_encoders(reference, candidate, texts, queries, k=3):
+    """
+    Check that a candidate encoder finds the same nearest products
+
+    Args:
+        reference: Trusted encoder (PyTorch)
+        candidate: Encoder under test (ONNX)
+        texts: Searchable product texts (the catalog)
+        queries: Query strings
+        k: Neighbours compared per query
+
+    Returns:
+        dict: top1_agreement, topk_overlap, min_cosine (reference vs
+        candidate embedding of the same text)
+    """
+    reference_catalog = np.asarray(reference.encode(texts, batch_size=64), dtype=np.float32)
+    candidate_catalog = np.asarray(candidate.encode(texts, batch_size=64), dtype=np.float32)
+    reference_queries = np.asarray(reference.encode(queries, batch_size=64), dtype=np.float32)
+    candidate_queries = np.asarray(candidate.encode(queries, batch_size=64), dtype=np.float32)
+
+    def unit(vectors):
+        return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+    reference_top = np.argsort(-(unit(reference_queries) @ unit(reference_catalog).T), axis=1)[:, :k]
+    candidate_top = np.argsort(-(unit(candidate_queries) @ unit(candidate_catalog).T), axis=1)[:, :k]
+
+    cosines = np.concatenate([
+        (unit(reference_catalog) * unit(candidate_catalog)).sum(axis=1),
+        (unit(reference_queries) * unit(candidate_queries)).sum(axis=1),
+    ])
+
+    overlap = [
+        len(set(reference_row) & set(candidate_row)) / k
+        for reference_row, candidate_row in zip(reference_top, candidate_top)
+    ]
+    return {
+        "queries": len(queries),
+        "top1_agreement": round(float(np.mean(reference_top[:, 0] == candidate_top[:, 0])), 4),
+        "topk_overlap": round(float(np.mean(overlap)), 4),
+        "min_cosine": round(float(cosines.min()), 4),
+    }
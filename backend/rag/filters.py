@@ -0,0 +1,63 @@
+"""
+Catalog Filters
+Whole-catalog allergen, category and brand filters as NumPy bitwise
+operations over the precomputed ProductFactsTable columns
+
+"Safe for someone avoiding peanuts, milk and sesame, in Snacks" becomes:
+
+    (allergen_masks & avoid) == 0  &  isin(category_codes, [snacks])
+
+One pass over a few fixed-width arrays, so the cost per product is the
+same for 20 products or a few million (8 bytes of mask per product).
+"""
+import numpy as np
+
+
+def lookup_codes(names, code_of):
+    """
+    Codes for a list of names (case-insensitive)
+
+    Args:
+        names: Category or brand names, or None for "no filter"
+        code_of: Lowercase name -> code (from ProductFactsTable)
+
+    Returns:
+        tuple: (np.ndarray of codes or None, list of unknown names)
+    """
+    if not names:
+        return None, []
+
+    codes, unknown = [], []
+    for name in names:
+        code = code_of.get(str(name).lower().strip())
+        if code is None:
+            unknown.append(name)
+        else:
+            codes.append(code)
+    return np.array(codes, dtype=np.int32), unknown
+
+
+def filter_mask(facts, avoid_mask=0, trace_mask=0, category_codes=None, brand_codes=None):
+    """
+    Which products pass every filter
+
+    Args:
+        facts: ProductFactsTable
+        avoid_mask: Allergen bits the product must not contain
+        trace_mask: Allergen bits the product must not list as "may contain"
+        category_codes: Allowed category codes (None = any category)
+        brand_codes: Allowed brand codes (None = any brand)
+
+    Returns:
+        np.ndarray: One bool per product
+    """
+    keep = np.ones(len(facts.allergen_masks), dtype=bool)
+    if avoid_mask:
+        keep &= (facts.allergen_masks & np.uint64(avoid_mask)) == 0
+    if trace_mask:
+        keep &= (facts.trace_masks & np.uint64(trace_mask)) == 0
+    if category_codes is not None:
+        keep &= np.isin(facts.category_codes, category_codes)
+    if brand_codes is not None:
+        keep &= np.isin(facts.brand_codes, brand_codes)
+    return keep
@@ -0,0 +1,191 @@
+"""
+Exact Product Identity Index
+Hash lookups by product id, GTIN (barcode) and exact name or alias
+
+A scanned barcode or a name picked from the suggestions already says
+which product is meant, so it should not pay for a query embedding
+and a full fuzzy scoring pass. This index answers those in O(1):
+
+- gtin: optional product field; EAN-8, UPC-A (12), EAN-13 and GTIN-14
+  are all stored as 14 digits, so the same product scans the same way
+  with any of them
+- aliases: optional list of other names ("Coke" for "Coca-Cola")
+- the product's own name (spelling variants as in rag/suggest.py)
+
+A name or alias shared by several products is ambiguous; it is left
+out, and those queries go through the fuzzy search as before.
+"""
+import re
+import threading
+
+from rag.suggest import spelling_variants
+
+_NOT_DIGITS = re.compile(r"[\s-]")
+GTIN_LENGTHS = (8, 12, 13, 14)
+
+
+def normalize_gtin(code):
+    """
+    GTIN as 14 digits, or None when it is not a valid GTIN
+
+    Spaces and hyphens are ignored; the check digit must be right.
+
+    Examples:
+        "5449000000996"  -> "05449000000996"
+        "5449000000997"  -> None (wrong check digit)
+    """
+    digits = _NOT_DIGITS.sub("", str(code or ""))
+    if not digits.isdigit() or len(digits) not in GTIN_LENGTHS:
+        return None
+    digits = digits.zfill(14)
+
+    # Weights 3, 1, 3, 1... from the digit left of the check digit
+    total = sum(int(digit) * (3 if position % 2 == 0 else 1)
+                for position, digit in enumerate(reversed(digits[:-1])))
+    if (10 - total % 10) % 10 != int(digits[-1]):
+        return None
+    return digits
+
+
+def product_aliases(product):
+    """A product's aliases as a list (a single string counts as one)"""
+    aliases = product.get("aliases") or []
+    if isinstance(aliases, str):
+        aliases = [aliases]
+    return list(aliases)
+
+
+def name_keys(product):
+    """Normalized names and aliases a product is known by exactly"""
+    keys = set()
+    for text in [product.get("name", "")] + product_aliases(product):
+        keys |= spelling_variants(text)
+    return keys
+
+
+class IdentityIndex:
+    """
+    id / GTIN / exact name -> catalog index (thread-safe for upserts)
+
+    Args:
+        products: Product list (shared with the analyzer)
+    """
+
+    def __init__(self, products):
+        self.lock = threading.Lock()
+        self.by_id = {}
+        self.by_gtin = {}
+        self.by_name = {}       # normalized name or alias -> set of indices
+        self.invalid_gtins = 0
+
+        for index, product in enumerate(products):
+            self._add(index, product)
+
+    @classmethod
+    def from_tables(cls, by_id, by_gtin, by_name, invalid_gtins=0):
+        """
+        An index over lookup tables built earlier (e.g. read from an
+        engine snapshot, rag/snapshot.py). They only need get(), items()
+        and len(); by_name values may be any collection of indices.
+        They become dicts on the first upsert.
+        """
+        index = cls([])
+        index.by_id = by_id
+        index.by_gtin = by_gtin
+        index.by_name = by_name
+        index.invalid_gtins = invalid_gtins
+        return index
+
+    def _make_writable(self):
+        if isinstance(self.by_id, dict):
+            return
+        self.by_id = {key: int(value) for key, value in self.by_id.items()}
+        self.by_gtin = {key: int(value) for key, value in self.by_gtin.items()}
+        self.by_name = {key: {int(index) for index in indices} for key, indices in self.by_name.items()}
+
+    def _add(self, index, product):
+        product_id = product.get("id")
+        if product_id not in (None, ""):
+            self.by_id[str(product_id)] = index
+
+        if product.get("gtin"):
+            gtin = normalize_gtin(product["gtin"])
+            if gtin is None:
+                self.invalid_gtins += 1
+            else:
+                self.by_gtin[gtin] = index
+
+        for key in name_keys(product):
+            self.by_name.setdefault(key, set()).add(index)
+
+    def _remove(self, index, product):
+        if self.by_id.get(str(product.get("id"))) == index:
+            del self.by_id[str(product.get("id"))]
+
+        gtin = normalize_gtin(product.get("gtin"))
+        if gtin is not None and self.by_gtin.get(gtin) == index:
+            del self.by_gtin[gtin]
+
+        for key in name_keys(product):
+            indices = self.by_name.get(key)
+            if indices is not None:
+                indices.discard(index)
+                if not indices:
+                    del self.by_name[key]
+
+    def upsert(self, index, old_product, product):
+        """Re-index one product (old_product is None for a new one)"""
+        with self.lock:
+            self._make_writable()
+            if old_product is not None:
+                self._remove(index, old_product)
+            self._add(index, product)
+
+    def id_index(self, product_id):
+        """Catalog index of the product with this id, or None"""
+        index = self.by_id.get(str(product_id))
+        return None if index is None else int(index)
+
+    def by_key(self, key):
+        """
+        Exact lookup by product id, then by GTIN
+
+        Returns:
+            tuple: (catalog index, "id" or "gtin"), or None
+        """
+        key = str(key).strip()
+        index = self.by_id.get(key)
+        if index is not None:
+            return int(index), "id"
+        gtin = normalize_gtin(key)
+        index = self.by_gtin.get(gtin) if gtin is not None else None
+        if index is not None:
+            return int(index), "gtin"
+        return None
+
+    def match(self, query):
+        """
+        Exact match for a search query: a GTIN, or a name / alias only
+        one product has (ids are not matched: "1" is not a product name)
+
+        Returns:
+            tuple: (catalog index, "gtin" or "name"), or None
+        """
+        gtin = normalize_gtin(query)
+        index = self.by_gtin.get(gtin) if gtin is not None else None
+        if index is not None:
+            return int(index), "gtin"
+
+        for key in spelling_variants(query):
+            indices = self.by_name.get(key)
+            if indices is not None and len(indices) == 1:
+                return int(next(iter(indices))), "name"
+        return None
+
+    def stats(self):
+        return {
+            "ids": len(self.by_id),
+            "gtins": len(self.by_gtin),
+            "names": len(self.by_name),
+            "invalid_gtins": self.invalid_gtins,
+        }
@@ -0,0 +1,147 @@
+"""
+User Allergen Profiles
+Deterministic safe / caution / unsafe verdicts from the precomputed
+allergen bitmasks, plus safe alternatives, with no LLM involved
+
+A profile is a list of allergens to avoid (any name the lexicon knows:
+"peanuts", "dairy", "whey"...) and whether "may contain" traces count.
+Profiles can be sent with each request or saved under an id.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+
+import numpy as np
+
+from rag.filters import filter_mask
+
+BASE_FOLDER = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Saved profiles (one JSON file; user data, not committed)
+PROFILES_FILE = os.environ.get(
+    "ALLERPREDICT_PROFILES_FILE",
+    os.path.join(BASE_FOLDER, "data", "profiles.json")
+)
+
+PROFILE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+def profile_masks(bits, avoid, avoid_traces=True):
+    """
+    Bitmasks for a profile
+
+    Args:
+        bits: AllergenBits of the catalog
+        avoid: Allergen names to avoid
+        avoid_traces: Whether "may contain" also counts
+
+    Returns:
+        tuple: (avoid mask, trace mask, names the catalog does not know)
+    """
+    avoid_mask, unknown = bits.mask(avoid)
+    return avoid_mask, avoid_mask if avoid_traces else 0, unknown
+
+
+def evaluate(facts, index, avoid_mask, trace_mask):
+    """
+    Verdict for one product
+
+    Returns:
+        dict: verdict ("safe", "caution" or "unsafe"), conflicts, traces
+    """
+    conflicts = int(facts.allergen_masks[index]) & avoid_mask
+    traces = int(facts.trace_masks[index]) & trace_mask & ~conflicts
+
+    if conflicts:
+        verdict = "unsafe"
+    elif traces:
+        verdict = "caution"
+    else:
+        verdict = "safe"
+
+    return {
+        "verdict": verdict,
+        "conflicts": facts.bits.names_in(conflicts),
+        "traces": facts.bits.names_in(traces),
+    }
+
+
+def safe_alternatives(facts, products, index, avoid_mask, trace_mask, limit=5):
+    """
+    Safe products from the same category, best ethical score first
+
+    Whole-catalog check with NumPy (see rag/filters.py).
+
+    Returns:
+        list: dicts with id, name, brand, category, ethical_score
+    """
+    safe = filter_mask(facts, avoid_mask, trace_mask, category_codes=facts.category_codes[index:index + 1])
+    safe[index] = False
+    candidates = np.flatnonzero(safe)
+
+    # Highest ethical score, then lowest risk
+    order = np.lexsort((facts.risk_codes[candidates], -facts.ethical_scores[candidates].astype(np.int16)))
+    return [
+        {
+            "id": products[position].get("id"),
+            "name": products[position].get("name"),
+            "brand": products[position].get("brand"),
+            "category": products[position].get("category"),
+            "ethical_score": int(facts.ethical_scores[position]),
+        }
+        for position in candidates[order[:limit]]
+    ]
+
+
+class ProfileStore:
+    """
+    Saved profiles in a small JSON file
+
+    Writes go to a temporary file first and then replace the old one,
+    so a crash never leaves half a file.
+    """
+
+    def __init__(self, path=PROFILES_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.profiles = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                self.profiles = json.load(file)
+
+    def get(self, profile_id):
+        with self.lock:
+            profile = self.profiles.get(profile_id)
+            return dict(profile) if profile is not None else None
+
+    def save(self, profile_id, profile):
+        """
+        Create or replace a profile
+
+        Args:
+            profile_id: Letters, digits, "_", "-" or "." (max 64)
+            profile: dict with avoid (list) and avoid_traces (bool)
+        """
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            raise ValueError("Profile id may only use letters, digits, '_', '-' and '.' (max 64)")
+        with self.lock:
+            self.profiles[profile_id] = dict(profile)
+            self._write()
+
+    def delete(self, profile_id):
+        """Remove a profile; returns False if it did not exist"""
+        with self.lock:
+            if self.profiles.pop(profile_id, None) is None:
+                return False
+            self._write()
+            return True
+
+    def _write(self):
+        folder = os.path.dirname(self.path) or "."
+        os.makedirs(folder, exist_ok=True)
+        handle, temporary = tempfile.mkstemp(prefix=".profiles-", suffix=".json", dir=folder)
+        with os.fdopen(handle, "w", encoding="utf-8") as file:
+            json.dump(self.profiles, file, indent=2)
+        os.replace(temporary, self.path)
@@ -0,0 +1,293 @@
+"""
+Quantized Embedding Storage
+Stores product embeddings as float32, int8 or product-quantized (PQ) codes
+and scores a query directly against the stored form
+
+Memory per 384-dim product:
+- float32: 1536 bytes
+- int8:     388 bytes (codes + one scale per row)
+- pq:        48 bytes (48 subspaces x 1 byte, default)
+"""
+import os
+import tempfile
+import weakref
+import numpy as np
+
+STORAGE_MODES = ("float32", "int8", "pq")
+
+# Rows scored per block, so the temporary float matrix stays small (and in cache)
+SCORING_BLOCK_ROWS = 1024
+
+
+def normalize_rows(vectors):
+    """Scale each row to unit length (zero rows stay zero)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def normalize_vector(vector):
+    """Unit-length copy of a single query vector"""
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class Float32Store:
+    """Plain normalized float32 matrix (exact cosine scores)"""
+
+    mode = "float32"
+
+    def __init__(self, vectors):
+        self.vectors = normalize_rows(vectors)
+
+    @classmethod
+    def from_normalized(cls, vectors):
+        """Use already unit-length vectors as they are (no copy, e.g. a memory map)"""
+        store = cls.__new__(cls)
+        store.vectors = vectors
+        return store
+
+    def scores(self, query):
+        """Cosine similarity of the query with every product"""
+        return self.vectors @ normalize_vector(query)
+
+    def vectors_for(self, indices):
+        """Float vectors for some rows (used by re-ranking)"""
+        return self.vectors[indices]
+
+    def upsert(self, index, vector):
+        vector = normalize_rows(vector)
+        if index == len(self):
+            self.vectors = np.vstack([self.vectors, vector])
+        else:
+            self.vectors[index] = vector[0]
+
+    @property
+    def nbytes(self):
+        return self.vectors.nbytes
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+
+class Int8Store:
+    """
+    Symmetric int8 codes with one float scale per row
+
+    score(row) = scale[row] * (codes[row] . query)
+    """
+
+    mode = "int8"
+
+    def __init__(self, vectors):
+        self.codes, self.scales = self._quantize(normalize_rows(vectors))
+
+    @staticmethod
+    def _quantize(vectors):
+        peaks = np.abs(vectors).max(axis=1)
+        peaks[peaks == 0] = 1.0
+        scales = (peaks / 127.0).astype(np.float32)
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales
+
+    def scores(self, query):
+        query = normalize_vector(query)
+        result = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), SCORING_BLOCK_ROWS):
+            block = self.codes[start:start + SCORING_BLOCK_ROWS].astype(np.float32)
+            result[start:start + len(block)] = block @ query
+        return result * self.scales
+
+    def vectors_for(self, indices):
+        return self.codes[indices].astype(np.float32) * self.scales[indices, None]
+
+    def upsert(self, index, vector):
+        codes, scales = self._quantize(normalize_rows(vector))
+        if index == len(self):
+            self.codes = np.vstack([self.codes, codes])
+            self.scales = np.concatenate([self.scales, scales])
+        else:
+            self.codes[index] = codes[0]
+            self.scales[index] = scales[0]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.scales.nbytes
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+
+class ProductQuantizedStore:
+    """
+    Product quantization: each vector is split into `subspaces` chunks and
+    every chunk is replaced by the id of its nearest of 256 centroids.
+
+    Scoring uses asymmetric distance: the query is kept in float, a
+    (subspaces x 256) table of partial dot products is built once per
+    query, and each product's score is the sum of its table entries.
+    Codes are stored subspace-major (subspaces x products) so each
+    table lookup reads one contiguous row.
+    """
+
+    mode = "pq"
+
+    def __init__(self, vectors, subspaces=48, centroids=256, iterations=12,
+                 training_sample=50000, seed=0):
+        vectors = normalize_rows(vectors)
+        dimension = vectors.shape[1]
+        if dimension % subspaces != 0:
+            raise ValueError(f"Embedding size {dimension} is not divisible by {subspaces} subspaces")
+
+        self.subspaces = subspaces
+        self.sub_dimension = dimension // subspaces
+        centroids = min(centroids, 256, max(1, vectors.shape[0]))
+
+        rng = np.random.default_rng(seed)
+        sample = vectors
+        if vectors.shape[0] > training_sample:
+            sample = vectors[rng.choice(vectors.shape[0], training_sample, replace=False)]
+
+        # codebooks[s] holds the centroids of subspace s
+        self.codebooks = np.stack([
+            self._kmeans(self._sub(sample, s), centroids, iterations, rng)
+            for s in range(subspaces)
+        ]).astype(np.float32)
+
+        self.codes = self._encode(vectors)
+
+    def _sub(self, vectors, subspace):
+        start = subspace * self.sub_dimension
+        return vectors[:, start:start + self.sub_dimension]
+
+    @staticmethod
+    def _kmeans(points, count, iterations, rng):
+        """Plain Lloyd's k-means, seeded from random points"""
+        centers = points[rng.choice(points.shape[0], count, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = ProductQuantizedStore._nearest(points, centers)
+            sizes = np.bincount(assignment, minlength=count)
+            sums = np.stack([
+                np.bincount(assignment, weights=points[:, dim], minlength=count)
+                for dim in range(points.shape[1])
+            ], axis=1).astype(np.float32)
+            filled = sizes > 0  # Empty clusters keep their old center
+            centers[filled] = sums[filled] / sizes[filled, None]
+        return centers
+
+    @staticmethod
+    def _nearest(points, centers):
+        # argmin ||p - c||^2 == argmin (||c||^2 - 2 p.c)
+        distances = (centers ** 2).sum(axis=1)[None, :] - 2.0 * points @ centers.T
+        return distances.argmin(axis=1)
+
+    def _encode(self, vectors):
+        """Codes for some vectors, shape (subspaces x len(vectors))"""
+        codes = np.empty((self.subspaces, vectors.shape[0]), dtype=np.uint8)
+        for s in range(self.subspaces):
+            for start in range(0, vectors.shape[0], SCORING_BLOCK_ROWS):
+                block = self._sub(vectors[start:start + SCORING_BLOCK_ROWS], s)
+                codes[s, start:start + len(block)] = self._nearest(block, self.codebooks[s])
+        return codes
+
+    def scores(self, query):
+        query = normalize_vector(query)
+        # table[s, c] = centroid c of subspace s . query chunk s
+        table = np.einsum(
+            "scd,sd->sc",
+            self.codebooks,
+            query.reshape(self.subspaces, self.sub_dimension)
+        )
+        result = np.zeros(len(self), dtype=np.float32)
+        for s in range(self.subspaces):
+            result += table[s].take(self.codes[s])
+        return result
+
+    def vectors_for(self, indices):
+        codes = self.codes[:, indices]
+        return np.concatenate(
+            [self.codebooks[s][codes[s]] for s in range(self.subspaces)],
+            axis=1
+        )
+
+    def upsert(self, index, vector):
+        codes = self._encode(normalize_rows(vector))
+        if index == len(self):
+            self.codes = np.hstack([self.codes, codes])
+        else:
+            self.codes[:, index] = codes[:, 0]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.codebooks.nbytes
+
+    def __len__(self):
+        return self.codes.shape[1]
+
+
+class FloatRerankVectors:
+    """
+    Exact float32 vectors kept on disk for re-ranking top candidates
+
+    The file is memory-mapped, so only the rows actually re-ranked are
+    read into RAM. It is a private temporary file, deleted when this
+    object is garbage-collected or the process exits.
+    """
+
+    def __init__(self, vectors, folder):
+        os.makedirs(folder, exist_ok=True)
+        handle, self.path = tempfile.mkstemp(prefix="rerank-", suffix=".npy", dir=folder)
+        os.close(handle)
+        weakref.finalize(self, _remove_file, self.path)
+
+        np.save(self.path, normalize_rows(vectors))
+        self.vectors = np.load(self.path, mmap_mode="r")
+
+    def scores(self, query, indices):
+        """Exact cosine similarity for the given rows"""
+        return np.asarray(self.vectors[indices]) @ normalize_vector(query)
+
+    def upsert(self, index, vector):
+        # Re-write the file with the changed row (upserts are rare)
+        vectors = np.array(self.vectors)
+        vector = normalize_rows(vector)
+        if index == vectors.shape[0]:
+            vectors = np.vstack([vectors, vector])
+        else:
+            vectors[index] = vector[0]
+        del self.vectors
+        np.save(self.path, vectors)
+        self.vectors = np.load(self.path, mmap_mode="r")
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def build_embedding_store(vectors, mode="float32", normalized=False):
+    """
+    Create the embedding store for a storage mode
+
+    Args:
+        vectors: (products x dimension) float embeddings
+        mode: "float32", "int8" or "pq"
+        normalized: The rows are already unit length; float32 then
+            keeps the array itself instead of a normalized copy
+
+    Returns:
+        Float32Store, Int8Store or ProductQuantizedStore
+    """
+    if mode == "float32":
+        return Float32Store.from_normalized(vectors) if normalized else Float32Store(vectors)
+    if mode == "int8":
+        return Int8Store(vectors)
+    if mode == "pq":
+        return ProductQuantizedStore(vectors)
+    raise ValueError(f"Unknown embedding storage '{mode}', expected one of {STORAGE_MODES}")
@@ -0,0 +1,134 @@
+"""
+Cached Query Encoder
+Remembers recent query embeddings and sends cache misses to the
+micro-batching scheduler
+
+- Queries are normalized (lowercase, single spaces) before lookup, so
+  "Oreo  Cookies" and "oreo cookies" share one entry. all-MiniLM-L6-v2
+  is uncased, so this does not change the embedding.
+- Concurrent misses for the same text share one scheduled encode.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from rag.batching import MicroBatchEncoder, MAX_ENCODE_BATCH, ENCODE_WAIT_MS
+from telemetry import record_cache
+
+# How many query embeddings to remember (384 floats = 1.5 KB each)
+QUERY_CACHE_SIZE = int(os.environ.get("ALLERPREDICT_QUERY_CACHE_SIZE", "4096"))
+
+
+def normalize_query(query):
+    """Cache key for a query: lowercase with single spaces"""
+    return " ".join(str(query).lower().split())
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded least-recently-used cache of query embeddings
+
+    Not thread-safe on its own; CachedQueryEncoder holds the lock.
+    """
+
+    def __init__(self, max_size=QUERY_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        vector = self.entries.get(key)
+        if vector is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return vector
+
+    def put(self, key, vector):
+        if self.max_size <= 0:
+            return
+        self.entries[key] = vector
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)  # Drop the oldest
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class CachedQueryEncoder:
+    """
+    Drop-in encode() for single queries with an LRU cache in front of
+    a MicroBatchEncoder
+
+    Args:
+        model: Anything with SentenceTransformer's encode(list, batch_size=...)
+        cache_size: Embeddings to keep (0 turns caching off)
+        max_batch: Most queries per forward pass
+        max_wait_ms: Batching window of the scheduler
+    """
+
+    def __init__(self, model, cache_size=QUERY_CACHE_SIZE, max_batch=MAX_ENCODE_BATCH,
+                 max_wait_ms=ENCODE_WAIT_MS):
+        self.cache = QueryEmbeddingCache(cache_size)
+        self.batcher = MicroBatchEncoder(model, max_batch=max_batch, max_wait_ms=max_wait_ms)
+        self.lock = threading.Lock()
+        self.pending = {}  # key -> Future of an encode already scheduled
+
+    def encode(self, query):
+        """
+        Embedding of one query string
+
+        Returns:
+            np.ndarray: Read-only float32 vector (shared with the cache)
+        """
+        key = normalize_query(query)
+
+        with self.lock:
+            vector = self.cache.get(key)
+            record_cache("query_embedding", vector is not None)
+            if vector is not None:
+                return vector
+
+            # Join an identical query that is already scheduled, or schedule it
+            future = self.pending.get(key)
+            owner = future is None
+            if owner:
+                future = self.batcher.submit(key)
+                self.pending[key] = future
+
+        try:
+            vector = future.result()
+        finally:
+            if owner:
+                with self.lock:
+                    self.pending.pop(key, None)
+                    if future.exception() is None:
+                        self.cache.put(key, future.result())
+        return vector
+
+    def close(self):
+        """Stop the scheduler thread"""
+        self.batcher.close()
+
+    def stats(self):
+        """
+        Cache and batching counters
+
+        Returns:
+            dict: size, max_size, hits, misses, hit_rate, batches, average_batch
+        """
+        with self.lock:
+            lookups = self.cache.hits + self.cache.misses
+            batches = self.batcher.batches
+            return {
+                "size": len(self.cache),
+                "max_size": self.cache.max_size,
+                "hits": self.cache.hits,
+                "misses": self.cache.misses,
+                "hit_rate": round(self.cache.hits / lookups, 4) if lookups else 0.0,
+                "batches": batches,
+                "average_batch": round(self.batcher.encoded / batches, 2) if batches else 0.0,
+            }
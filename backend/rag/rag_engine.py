@@ -2,50 +2,199 @@
 FIXED: Accurate Product Analysis Engine
 Solves the wrong product matching problem
 """
-import json
 import os
-from sentence_transformers import SentenceTransformer
 import numpy as np
 from crewai_tools import BaseTool
 from difflib import SequenceMatcher
 
+from rag import derived
+from rag.bm25 import BM25Index, parse_query
+from rag.catalog import ColumnarCatalog, load_catalog
+from rag.catalog_db import is_sqlite_catalog, search_terms
+from rag.allergens import LEXICON
+from rag.derived import ProductFactsTable
+from rag.filters import filter_mask, lookup_codes
+from rag.identity import IdentityIndex
+from rag.profiles import evaluate, profile_masks, safe_alternatives
+from rag.encoders import load_search_model, search_model_id
+from rag.report_format import TOOL_OUTPUT_FORMAT, estimate_tokens, format_report
+from rag.quantization import build_embedding_store, FloatRerankVectors
+from rag.query_encoder import CachedQueryEncoder
+from rag.snapshot import StaleSnapshot, open_snapshot, write_snapshot
+from rag.suggest import SuggestionIndex
+from telemetry import record_tool_output, stage
+
+BASE_FOLDER = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# How product embeddings are kept in memory: "float32", "int8" or "pq"
+EMBEDDING_STORAGE = os.environ.get("ALLERPREDICT_EMBEDDING_STORAGE", "float32")
+
+# Re-score this many top candidates with exact float vectors (0 = off)
+RERANK_CANDIDATES = int(os.environ.get("ALLERPREDICT_RERANK_CANDIDATES", "0"))
+
+# Hybrid search: share of the score from BM25 (the rest is semantic)
+BM25_WEIGHT = 0.5
+
+# Products with no keyword match need at least this semantic similarity
+MIN_SEMANTIC_SCORE = 0.35
+
+# Fields searched by browse_products (the SQLite backend's FTS5 columns)
+TEXT_SEARCH_FIELDS = ('name', 'brand', 'ingredients')
+
+# Product catalog: a JSON list, a compiled catalog or a SQLite database
+# (both built by manage.py build-catalog)
+CATALOG_FILE = os.environ.get("ALLERPREDICT_CATALOG", os.path.join(BASE_FOLDER, "data", "metadata.json"))
+
+# Where on-disk helper files (e.g. re-rank vectors) are written
+CACHE_FOLDER = os.environ.get("ALLERPREDICT_CACHE_DIR", os.path.join(BASE_FOLDER, "data", ".cache"))
+
+# Engine snapshot loaded at startup and rewritten when stale ("" = off)
+SNAPSHOT_FILE = os.environ.get("ALLERPREDICT_SNAPSHOT", os.path.join(CACHE_FOLDER, "engine.apsnap"))
+
+# Check the CRC-32 of every snapshot section at startup ("0" = trust the file)
+SNAPSHOT_VERIFY = os.environ.get("ALLERPREDICT_SNAPSHOT_VERIFY", "1") != "0"
+
+
 class AccurateProductAnalyzer:
     """
     Improved analyzer with accurate product matching
     """
     
-    def __init__(self, data_file_path=None):
-        """Load the AI model and product data"""
+    def __init__(self, data_file_path=None, products=None, search_model=None,
+                 embedding_storage=None, rerank_candidates=None, snapshot_path=None):
+        """
+        Load the AI model and product data
+        
+        Args:
+            data_file_path: Product file, JSON or compiled (defaults to CATALOG_FILE)
+            products: Optional list of product dicts to use instead of a file
+            search_model: Optional encoder with SentenceTransformer's encode();
+                benchmarks pass a fast stand-in here
+            embedding_storage: "float32", "int8" or "pq" (default: EMBEDDING_STORAGE)
+            rerank_candidates: Top candidates re-scored with exact float
+                vectors; 0 turns re-ranking off (default: RERANK_CANDIDATES)
+            snapshot_path: Engine snapshot to start from and to refresh
+                (rag/snapshot.py); "" turns snapshots off. Defaults to
+                SNAPSHOT_FILE when both the catalog file and the search
+                model are the defaults.
+        """
         print("Loading AI model...")
         
-        # Load the search model
-        self.search_model = SentenceTransformer('all-MiniLM-L6-v2')
-        
-        # Load product database
-        if data_file_path is None:
-            base_folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            data_file_path = os.path.join(base_folder, "data", "metadata.json")
-        
-        with open(data_file_path, 'r', encoding='utf-8') as file:
-            self.all_products = json.load(file)
+        if snapshot_path is None:
+            snapshot_path = SNAPSHOT_FILE if products is None and search_model is None else ""
         
-        # Prepare products for searching
-        self.product_search_data = []
-        self.product_embeddings = []
+        # Load the search model (PyTorch or ONNX, see rag/encoders.py)
+        if search_model is None:
+            search_model = load_search_model()
+        self.search_model = search_model
         
-        for product in self.all_products:
+        if data_file_path is None:
+            data_file_path = CATALOG_FILE
+        
+        # SQLite catalogs are written in place, so a snapshot of one would go stale
+        if products is not None or is_sqlite_catalog(data_file_path):
+            snapshot_path = ""
+        snapshot = self._open_snapshot(snapshot_path, data_file_path)
+        
+        if snapshot is not None:
+            # Everything below comes ready-made from the memory-mapped file
+            self.all_products = snapshot.catalog
+            self.product_search_data = snapshot.search_texts()
+            embeddings = snapshot.embeddings()
+        else:
+            # Load product database
+            if products is not None:
+                self.all_products = products
+            else:
+                # Compiled catalogs open without parsing (see rag/catalog.py)
+                self.all_products = load_catalog(data_file_path)
+            
+            # Prepare products for searching
             # Create searchable text (NAME IS MOST IMPORTANT)
-            search_text = self._make_searchable_text(product)
-            self.product_search_data.append(search_text)
+            self.product_search_data = [
+                self._make_searchable_text(product) for product in self.all_products
+            ]
+            
+            # Convert text to numbers (embeddings), in batches
+            embeddings = np.asarray(
+                self.search_model.encode(self.product_search_data, batch_size=64),
+                dtype=np.float32
+            )
+        
+        # Keep them in the configured (possibly quantized) form
+        self.embedding_storage = embedding_storage or EMBEDDING_STORAGE
+        self.rerank_candidates = RERANK_CANDIDATES if rerank_candidates is None else rerank_candidates
+        self.product_embeddings = build_embedding_store(
+            embeddings, self.embedding_storage, normalized=snapshot is not None
+        )
+        
+        self.rerank_vectors = None
+        if self.rerank_candidates > 0:
+            self.rerank_vectors = FloatRerankVectors(embeddings, CACHE_FOLDER)
+        
+        # Query embeddings: cached, and concurrent misses share one batch
+        self.query_encoder = CachedQueryEncoder(self.search_model)
+        
+        if snapshot is not None:
+            self.product_facts = self.all_products.facts()
+            self.suggestions = snapshot.suggestion_index(self.all_products)
+            self.identity = snapshot.identity_index()
+            self.keyword_index = snapshot.keyword_index(self.all_products, self.product_facts)
+        else:
+            # Work out allergens, risk and ethics once per product
+            # (a compiled catalog already has them)
+            if isinstance(self.all_products, ColumnarCatalog):
+                self.product_facts = self.all_products.facts()
+            else:
+                self.product_facts = ProductFactsTable.build(self.all_products)
+            
+            # Prefix index for typeahead suggestions
+            self.suggestions = SuggestionIndex(self.all_products)
             
-            # Convert text to numbers (embedding)
-            embedding = self.search_model.encode(search_text)
-            self.product_embeddings.append(embedding)
+            # Exact id / barcode / name lookups (skip the fuzzy search)
+            self.identity = IdentityIndex(self.all_products)
+            
+            # Keyword index over all text fields (descriptions, ingredients...)
+            self.keyword_index = BM25Index(self.all_products, self.product_facts)
+            
+            if snapshot_path:
+                self._save_snapshot(snapshot_path, data_file_path, embeddings)
+        del embeddings
         
-        self.product_embeddings = np.array(self.product_embeddings)
+        # Goes up with every upsert (cached API listings check it)
+        self.catalog_version = 0
         
         print(f"✅ Loaded {len(self.all_products)} products successfully")
     
+    def _open_snapshot(self, snapshot_path, data_file_path):
+        """
+        The engine snapshot, or None when there is none or it is stale
+        (the engine is then built from the catalog and the snapshot
+        rewritten)
+        """
+        if not snapshot_path:
+            return None
+        try:
+            snapshot = open_snapshot(snapshot_path, data_file_path, search_model_id(self.search_model),
+                                     verify_checksums=SNAPSHOT_VERIFY)
+        except FileNotFoundError:
+            print(f"📸 No engine snapshot at {snapshot_path} yet, building from {data_file_path}")
+            return None
+        except StaleSnapshot as error:
+            print(f"♻️ Engine snapshot is stale ({error}), rebuilding")
+            return None
+        
+        print(f"📸 Starting from engine snapshot {snapshot_path}")
+        return snapshot
+    
+    def _save_snapshot(self, snapshot_path, data_file_path, embeddings):
+        """Write the snapshot; a failure only costs the next start its speed"""
+        try:
+            write_snapshot(snapshot_path, self, embeddings, data_file_path, search_model_id(self.search_model))
+            print(f"📸 Saved engine snapshot {snapshot_path}")
+        except OSError as error:
+            print(f"⚠️ Could not save engine snapshot: {error}")
+    
     def _make_searchable_text(self, product):
         """
         Create searchable text with NAME having highest priority
@@ -58,6 +207,45 @@ class AccurateProductAnalyzer:
         combined_text = f"{name} {name} {name} {brand} {brand} {category}"
         return combined_text.strip()
     
+    def upsert_product(self, product):
+        """
+        Add a new product or replace an existing one (matched by id)
+        
+        Re-embeds and re-scores only this product.
+        
+        Returns:
+            int: Catalog index of the product
+        """
+        # Existing product with the same id: O(1) through the identity index
+        index = None
+        if product.get('id') not in (None, ""):
+            index = self.identity.id_index(product['id'])
+        if index is None:
+            index = len(self.all_products)
+        
+        search_text = self._make_searchable_text(product)
+        embedding = self.search_model.encode(search_text)
+        
+        self.product_embeddings.upsert(index, embedding)
+        if self.rerank_vectors is not None:
+            self.rerank_vectors.upsert(index, embedding)
+        
+        old_product = self.all_products[index] if index < len(self.all_products) else None
+        
+        if index == len(self.all_products):
+            self.all_products.append(product)
+            self.product_search_data.append(search_text)
+        else:
+            self.all_products[index] = product
+            self.product_search_data[index] = search_text
+        
+        self.product_facts.upsert(index, product)
+        self.suggestions.upsert(index, old_product, product)
+        self.identity.upsert(index, old_product, product)
+        self.keyword_index.mark_stale()
+        self.catalog_version += 1
+        return index
+    
     def _calculate_name_similarity(self, search_query, product_name):
         """
         Calculate exact name similarity using string matching
@@ -87,53 +275,94 @@ class AccurateProductAnalyzer:
         char_similarity = SequenceMatcher(None, search_lower, product_lower).ratio()
         return char_similarity * 0.6
     
-    def find_product(self, search_query):
+    def _name_score(self, search_query, name, brand):
+        """
+        How well a query matches a product's name or brand (0 to 1)
+        """
+        # Check both product name and brand
+        name_sim = self._calculate_name_similarity(search_query, name)
+        brand_sim = self._calculate_name_similarity(search_query, brand)
+        
+        # Take the higher score
+        return max(name_sim, brand_sim * 0.8)
+    
+    def _names_and_brands(self):
+        """
+        Every product's name and brand, in catalog order
+        
+        Compiled and SQLite catalogs read just those two columns, so a
+        search does not decode every whole product.
+        """
+        if hasattr(self.all_products, "names_and_brands"):
+            return self.all_products.names_and_brands()
+        names = [product.get('name', '') for product in self.all_products]
+        brands = [product.get('brand', '') for product in self.all_products]
+        return names, brands
+    
+    def find_product(self, search_query, exact=True):
         """
         IMPROVED: Find product with accurate name matching
+        
+        A barcode, or a name / alias only one product has, is answered
+        from the identity index without any scoring (exact=False skips
+        that, e.g. to measure the fuzzy search itself).
         """
+        if exact:
+            with stage("identity_lookup"):
+                hit = self.identity.match(search_query)
+            if hit is not None:
+                index, matched_by = hit
+                return [{
+                    'index': index,
+                    'product': self.all_products[index],
+                    'match_score': 1.0,
+                    'name_match': 1.0,
+                    'semantic_match': 1.0,
+                    'matched_by': matched_by
+                }]
+        
         # Step 1: Calculate semantic similarity (AI-based)
-        query_embedding = self.search_model.encode(search_query)
+        with stage("query_encoding"):
+            query_embedding = self.query_encoder.encode(search_query)
         
-        semantic_scores = []
-        for product_embedding in self.product_embeddings:
-            dot_product = np.dot(product_embedding, query_embedding)
-            product_length = np.linalg.norm(product_embedding)
-            query_length = np.linalg.norm(query_embedding)
-            similarity = dot_product / (product_length * query_length)
-            semantic_scores.append(similarity)
+        # Cosine similarity with every product, on the stored (maybe quantized) form
+        with stage("semantic_scoring"):
+            semantic_scores = self.product_embeddings.scores(query_embedding)
         
         # Step 2: Calculate name similarity (exact matching)
-        name_scores = []
-        for product in self.all_products:
-            product_name = product.get('name', '')
-            brand_name = product.get('brand', '')
-            
-            # Check both product name and brand
-            name_sim = self._calculate_name_similarity(search_query, product_name)
-            brand_sim = self._calculate_name_similarity(search_query, brand_name)
-            
-            # Take the higher score
-            final_score = max(name_sim, brand_sim * 0.8)
-            name_scores.append(final_score)
+        # (only the winners below are decoded as whole products)
+        with stage("name_scoring"):
+            names, brands = self._names_and_brands()
+            name_scores = [
+                self._name_score(search_query, name, brand) for name, brand in zip(names, brands)
+            ]
         
         # Step 3: Combine both scores (name is MORE important)
-        combined_scores = []
-        for i in range(len(self.all_products)):
-            # 70% name matching, 30% semantic similarity
-            combined = (name_scores[i] * 0.7) + (semantic_scores[i] * 0.3)
-            combined_scores.append(combined)
+        # 70% name matching, 30% semantic similarity
+        name_scores = np.asarray(name_scores, dtype=np.float32)
+        combined_scores = (name_scores * 0.7) + (semantic_scores * 0.3)
         
         # Step 4: Get top 3 matches
-        combined_scores = np.array(combined_scores)
-        top_3_indices = np.argsort(combined_scores)[-3:][::-1]
+        candidates = np.arange(len(combined_scores))
+        if self.rerank_vectors is not None and len(combined_scores) > self.rerank_candidates:
+            # Re-score the best approximate candidates with exact float vectors
+            with stage("float_rerank"):
+                candidates = np.argpartition(-combined_scores, self.rerank_candidates)[:self.rerank_candidates]
+                semantic_scores = semantic_scores.copy()
+                semantic_scores[candidates] = self.rerank_vectors.scores(query_embedding, candidates)
+                combined_scores[candidates] = (name_scores[candidates] * 0.7) + (semantic_scores[candidates] * 0.3)
+        
+        top_3_indices = candidates[np.argsort(combined_scores[candidates])[-3:][::-1]]
         
         results = []
         for index in top_3_indices:
             results.append({
+                'index': int(index),
                 'product': self.all_products[index],
                 'match_score': float(combined_scores[index]),
                 'name_match': float(name_scores[index]),
-                'semantic_match': float(semantic_scores[index])
+                'semantic_match': float(semantic_scores[index]),
+                'matched_by': 'search'
             })
         
         return results
@@ -142,107 +371,101 @@ class AccurateProductAnalyzer:
         """
         Extract and clean allergen list
         """
-        if not allergen_text or allergen_text.strip() == "":
-            return []
-        
-        # Clean and split
-        allergen_list = [item.strip() for item in allergen_text.split(',')]
-        
-        # Remove empty and "none" values
-        allergen_list = [
-            item for item in allergen_list 
-            if item and item.lower() not in ['none', 'n/a', 'no allergens', 'nil']
-        ]
-        
-        return allergen_list
+        return derived.extract_allergens(allergen_text)
     
     def calculate_risk_level(self, allergens, ingredients):
         """
         Multi-factor risk assessment
         """
-        risk_score = 0
-        
-        # Factor 1: Number of allergens
-        num_allergens = len(allergens)
-        if num_allergens == 0:
-            risk_score += 0
-        elif num_allergens <= 2:
-            risk_score += 30
-        elif num_allergens <= 4:
-            risk_score += 60
-        else:
-            risk_score += 90
-        
-        # Factor 2: High-risk allergens
-        allergen_text_lower = ' '.join(allergens).lower()
-        high_risk = ['peanut', 'tree nut', 'shellfish', 'fish', 'sesame']
-        
-        for risk_item in high_risk:
-            if risk_item in allergen_text_lower:
-                risk_score += 20
-                break
-        
-        # Factor 3: Cross-contamination warnings
-        if ingredients:
-            ingredients_lower = ingredients.lower()
-            if 'may contain' in ingredients_lower or 'traces of' in ingredients_lower:
-                risk_score += 15
-        
-        # Convert to level
-        if risk_score <= 20:
-            return "low"
-        elif risk_score <= 50:
-            return "medium"
-        else:
-            return "high"
+        return derived.calculate_risk_level(allergens, ingredients)
     
     def calculate_ethical_score(self, ethical_notes):
         """
         Keyword-based ethical scoring
         """
-        if not ethical_notes:
-            return 75
-        
-        ethical_text = ethical_notes.lower()
-        score = 100
-        
-        # Serious violations
-        serious = ['child labor', 'forced labor', 'slavery', 'exploitation']
-        for issue in serious:
-            if issue in ethical_text:
-                score -= 30
-        
-        # Major concerns
-        major = ['lawsuit', 'accused', 'investigation', 'violation']
-        for concern in major:
-            if concern in ethical_text:
-                score -= 20
-        
-        # Moderate issues
-        moderate = ['criticism', 'controversy', 'concern', 'disputed']
-        for issue in moderate:
-            if issue in ethical_text:
-                score -= 15
-        
-        # Positive factors
-        positive = ['fair trade', 'organic', 'sustainable', 'certified', 'ethical']
-        for factor in positive:
-            if factor in ethical_text:
-                score += 10
-        
-        return max(0, min(100, score))
+        return derived.calculate_ethical_score(ethical_notes)
     
     def extract_recommendations(self, recommendation_text):
         """
         Extract product recommendations
         """
-        if not recommendation_text or recommendation_text.strip() == "":
-            return []
+        return derived.extract_recommendations(recommendation_text)
+    
+    def search(self, query, limit=10):
+        """
+        Hybrid search over all product text, with negated ingredients
+        
+        "cookies without soy" looks for cookies (BM25 over every field
+        plus semantic similarity) and drops products whose ingredients
+        or allergen warnings mention soy.
+        
+        Args:
+            query: Free text
+            limit: Most results to return
+        
+        Returns:
+            dict: query, looking_for, excluding, excluded_count, results
+        """
+        positive_text, negated = parse_query(query)
+        count = len(self.all_products)
+        
+        # Products ruled out by "without X"
+        allowed = np.ones(count, dtype=bool)
+        with stage("negation_filter"):
+            for phrase in negated:
+                allowed[self.keyword_index.containing(phrase)] = False
+                # "without dairy" also drops products with inferred milk
+                for allergen in LEXICON.canonical(phrase):
+                    allowed[self.keyword_index.containing(allergen)] = False
+        excluded_count = int(count - allowed.sum())
+        
+        if positive_text:
+            with stage("bm25_scoring"):
+                keyword_scores = self.keyword_index.scores(positive_text)
+                if keyword_scores.max() > 0:
+                    keyword_scores = keyword_scores / keyword_scores.max()
+            
+            with stage("query_encoding"):
+                query_embedding = self.query_encoder.encode(positive_text)
+            with stage("semantic_scoring"):
+                semantic_scores = self.product_embeddings.scores(query_embedding)
+            
+            combined_scores = (keyword_scores * BM25_WEIGHT) + (semantic_scores * (1 - BM25_WEIGHT))
+            
+            # Keep only products that actually relate to the query
+            allowed &= (keyword_scores > 0) | (semantic_scores >= MIN_SEMANTIC_SCORE)
+        else:
+            # Only exclusions given: keep catalog order
+            keyword_scores = np.zeros(count, dtype=np.float32)
+            semantic_scores = np.zeros(count, dtype=np.float32)
+            combined_scores = -np.arange(count, dtype=np.float32)
         
-        rec_list = [item.strip() for item in recommendation_text.split(',')]
-        rec_list = [item for item in rec_list if item and len(item) > 2]
+        candidates = np.flatnonzero(allowed)
+        if len(candidates) > limit:
+            best = np.argpartition(-combined_scores[candidates], limit - 1)[:limit]
+            candidates = candidates[best]
+        candidates = candidates[np.argsort(-combined_scores[candidates], kind="stable")]
+        
+        results = []
+        for index in candidates:
+            product = self.all_products[index]
+            results.append({
+                "id": product.get('id'),
+                "name": product.get('name'),
+                "brand": product.get('brand'),
+                "category": product.get('category'),
+                "score": round(float(combined_scores[index]), 4) if positive_text else None,
+                "keyword_score": round(float(keyword_scores[index]), 4),
+                "semantic_score": round(float(semantic_scores[index]), 4)
+            })
         
-        return rec_list
+        return {
+            "query": query,
+            "looking_for": positive_text,
+            "excluding": negated,
+            "excluded_count": excluded_count,
+            "results": results
+        }
     
     def analyze_product(self, product_query):
         """
@@ -284,21 +507,23 @@ class AccurateProductAnalyzer:
         category = product.get('category', 'Unknown')
         description = product.get('description', '')
         ingredients = product.get('ingredients', '')
-        allergen_warnings = product.get('allergen_warnings', '')
         ethical_notes = product.get('ethical_notes', '')
-        recommendation_text = product.get('recommendations', '')
         
-        # Analyze
-        allergens = self.extract_allergens(allergen_warnings)
-        risk_level = self.calculate_risk_level(allergens, ingredients)
-        ethical_score = self.calculate_ethical_score(ethical_notes)
-        recommendations = self.extract_recommendations(recommendation_text)
+        # Analyze (precomputed when the catalog was loaded)
+        facts = self.product_facts.row(best_match['index'])
+        allergens = facts['detected_allergens']
+        inferred_allergens = facts['inferred_allergens']
+        trace_allergens = facts['trace_allergens']
+        risk_level = facts['risk_level']
+        ethical_score = facts['ethical_score']
+        recommendations = facts['recommendations']
         
         # VALIDATION: Check if this is really the right product
         confidence = "high" if name_match > 0.8 else "medium" if name_match > 0.5 else "low"
         
         return {
             "found": True,
+            "index": int(best_match['index']),
             "product_name": product_name,
             "brand": brand,
             "category": category,
@@ -306,6 +531,8 @@ class AccurateProductAnalyzer:
             "ingredients": ingredients,
             "detected_allergens": allergens,
             "allergen_count": len(allergens),
+            "inferred_allergens": inferred_allergens,
+            "trace_allergens": trace_allergens,
             "risk_level": risk_level,
             "ethical_score": ethical_score,
             "ethical_notes": ethical_notes,
@@ -313,8 +540,232 @@ class AccurateProductAnalyzer:
             "match_score": round(combined_match * 100, 1),
             "name_match_score": round(name_match * 100, 1),
             "confidence": confidence,
+            "matched_by": best_match['matched_by'],
             "warning": "Low confidence match - please verify product name" if confidence == "low" else None
         }
+    
+    def record_view(self, index):
+        """
+        Count one user request for a product (popular products rank
+        higher in suggestions)
+        
+        The API calls this once per request. analyze_product does not,
+        because one request runs it several times (verdict, retrieval,
+        stored or fallback report).
+        
+        Args:
+            index: Catalog index of the product (None = not found, ignored)
+        """
+        if index is not None:
+            self.suggestions.record_hit(index)
+    
+    def lookup_key(self, key):
+        """
+        A product by its id or barcode (GTIN), no fuzzy matching
+        
+        Args:
+            key: Product id, or a GTIN-8/12/13/14 barcode
+        
+        Returns:
+            dict: The product with its derived facts (allergens, risk,
+            ethical score, alternatives as a list) and matched_by
+            ("id" or "gtin"), or None when nothing has that key
+        """
+        hit = self.identity.by_key(key)
+        if hit is None:
+            return None
+        index, matched_by = hit
+        return dict(self.all_products[index], **self.product_facts.row(index), matched_by=matched_by)
+    
+    def check_profile(self, product_query, avoid, avoid_traces=True, alternatives_limit=5):
+        """
+        Is this product safe for someone avoiding these allergens?
+        
+        Uses the precomputed allergen bitmasks (no LLM).
+        
+        Args:
+            product_query: Product name to look up
+            avoid: Allergen names to avoid ("peanuts", "dairy"...)
+            avoid_traces: Treat "may contain" as a problem too
+            alternatives_limit: Most safe alternatives to return
+        
+        Returns:
+            dict: product_name, found, verdict, conflicts, traces,
+            avoiding, unrecognized, safe_alternatives, message and
+            product_index (catalog index, None when not found)
+        """
+        avoid_mask, trace_mask, unknown = profile_masks(self.product_facts.bits, avoid, avoid_traces)
+        result = {
+            "product_name": product_query,
+            "found": False,
+            "verdict": "unknown",
+            "conflicts": [],
+            "traces": [],
+            "avoiding": self.product_facts.bits.names_in(avoid_mask),
+            "unrecognized": unknown,
+            "safe_alternatives": [],
+            "message": "",
+            "product_index": None
+        }
+        
+        analysis = self.analyze_product(product_query)
+        if not analysis['found']:
+            result["message"] = analysis['message']
+            return result
+        
+        index = analysis['index']
+        result.update(evaluate(self.product_facts, index, avoid_mask, trace_mask))
+        result.update(found=True, product_name=analysis['product_name'], product_index=index)
+        
+        if result["verdict"] != "safe":
+            result["safe_alternatives"] = safe_alternatives(
+                self.product_facts, self.all_products, index, avoid_mask, trace_mask, alternatives_limit
+            )
+        if unknown:
+            result["message"] = f"Not a known allergen, not checked: {', '.join(unknown)}"
+        return result
+    
+    def filter_products(self, avoid=(), avoid_traces=True, categories=None, brands=None, offset=0, limit=25):
+        """
+        Products without any of the given allergens, optionally only in
+        some categories / brands
+        
+        One vectorized pass over the allergen bitmasks (rag/filters.py),
+        then only the requested page is turned into dicts.
+        
+        Args:
+            avoid: Allergen names to avoid ("peanuts", "dairy"...)
+            avoid_traces: Also drop products that "may contain" them
+            categories: Category names to keep (None = all)
+            brands: Brand names to keep (None = all)
+            offset: Index of the first match to return
+            limit: Page size
+        
+        Returns:
+            dict: total, offset, limit, next_offset, avoiding,
+            unrecognized, products
+        """
+        facts = self.product_facts
+        avoid_mask, trace_mask, unknown = profile_masks(facts.bits, avoid, avoid_traces)
+        category_codes, unknown_categories = lookup_codes(categories, facts.category_of)
+        brand_codes, unknown_brands = lookup_codes(brands, facts.brand_of)
+        
+        matches = np.flatnonzero(filter_mask(facts, avoid_mask, trace_mask, category_codes, brand_codes))
+        page = matches[offset:offset + limit]
+        next_offset = offset + len(page)
+        
+        return {
+            "total": int(len(matches)),
+            "offset": offset,
+            "limit": limit,
+            "next_offset": next_offset if next_offset < len(matches) else None,
+            "avoiding": facts.bits.names_in(avoid_mask),
+            "unrecognized": unknown + unknown_categories + unknown_brands,
+            "products": [
+                {
+                    "id": self.all_products[index].get("id"),
+                    "name": self.all_products[index].get("name"),
+                    "brand": self.all_products[index].get("brand"),
+                    "category": self.all_products[index].get("category"),
+                    "detected_allergens": list(facts.allergens[index]),
+                    "risk_level": derived.RISK_LEVELS[facts.risk_codes[index]],
+                    "ethical_score": int(facts.ethical_scores[index]),
+                }
+                for index in page
+            ]
+        }
+    
+    def _has_words(self, product, terms):
+        """
+        Does every term start a word of the name, brand or ingredients?
+        (The same rule as the SQLite backend's FTS5 prefix query)
+        """
+        words = search_terms(" ".join(str(product.get(field, '')) for field in TEXT_SEARCH_FIELDS))
+        return all(any(word.startswith(term) for word in words) for term in terms)
+    
+    def browse_products(self, text=None, category=None, avoid=(), offset=0, limit=25):
+        """
+        Page through products matching a text, category and allergen filter
+        
+        With the SQLite backend the filters run as FTS5 / index lookups
+        (rag/catalog_db.py); otherwise the same rules are checked product
+        by product. Text matches are ranked by the same name/brand
+        similarity as find_product.
+        
+        Args:
+            text: Every word must start a word of the name, brand or
+                ingredients (None = no text filter)
+            category: Text the category must contain (None = all)
+            avoid: Drop products containing any of these allergens
+            offset: Index of the first match to return
+            limit: Page size
+        
+        Returns:
+            dict: total, offset, limit, next_offset, products (each with
+            name_match when a text was given)
+        """
+        catalog = self.all_products
+        matches = None  # None = every product
+        
+        def narrow(indices):
+            return set(indices) if matches is None else matches & set(indices)
+        
+        if text:
+            if hasattr(catalog, "search_text"):
+                matches = narrow(catalog.search_text(text))
+            else:
+                terms = search_terms(text)
+                matches = narrow(
+                    index for index, product in enumerate(catalog)
+                    if terms and self._has_words(product, terms)
+                )
+        
+        if category:
+            if hasattr(catalog, "in_category"):
+                matches = narrow(catalog.in_category(category))
+            else:
+                wanted = category.lower().strip()
+                matches = narrow(
+                    index for index, product in enumerate(catalog)
+                    if wanted in str(product.get('category', '')).lower()
+                )
+        
+        if matches is None:
+            matches = set(range(len(catalog)))
+        
+        if avoid:
+            if hasattr(catalog, "containing_allergens"):
+                matches -= catalog.containing_allergens(avoid)
+            else:
+                avoid_mask, _ = self.product_facts.bits.mask(avoid)
+                contains = (self.product_facts.allergen_masks & np.uint64(avoid_mask)) != 0
+                matches -= set(np.flatnonzero(contains).tolist())
+        
+        ordered = sorted(matches)
+        scores = {}
+        if text:
+            scores = {}
+            for index in ordered:
+                product = catalog[index]
+                scores[index] = self._name_score(text, product.get('name', ''), product.get('brand', ''))
+            ordered.sort(key=lambda index: -scores[index])
+        
+        page = ordered[offset:offset + limit]
+        products = []
+        for index in page:
+            product = dict(catalog[index])
+            if text:
+                product["name_match"] = round(scores[index] * 100, 1)
+            products.append(product)
+        
+        next_offset = offset + len(page)
+        return {
+            "total": len(ordered),
+            "offset": offset,
+            "limit": limit,
+            "next_offset": next_offset if next_offset < len(ordered) else None,
+            "products": products
+        }
 
 
 class ProductAnalysisTool(BaseTool):
@@ -341,64 +792,22 @@ class ProductAnalysisTool(BaseTool):
     
     def _run(self, product_name: str) -> str:
         """
-        Run analysis with validation
+        Run analysis with validation (in the TOOL_OUTPUT_FORMAT style)
         """
-        result = self.analyzer.analyze_product(product_name)
+        return self.report(product_name)
+    
+    def report(self, product_name, style=TOOL_OUTPUT_FORMAT):
+        """
+        Analysis text for a product
         
-        if not result['found']:
-            similar_text = '\n'.join([
-                f"- {p['name']} ({p['brand']}) - Name match: {p['name_match']}%"
-                for p in result['similar_products']
-            ])
+        Args:
+            product_name: Product to look up
+            style: "compact" (for the agents), "json" or "full" (for people)
             
-            return f"""
-❌ PRODUCT NOT FOUND
-
-Search query: {product_name}
-Message: {result['message']}
-
-Did you mean one of these?
-{similar_text}
-
-Please search with the exact product name.
-"""
-        
-        # Format successful analysis
-        allergen_text = ', '.join(result['detected_allergens']) if result['detected_allergens'] else '✅ None detected'
-        rec_text = '\n'.join([f"- {rec}" for rec in result['recommendations']]) if result['recommendations'] else 'No specific alternatives listed'
-        
-        # Add warning if low confidence
-        warning_text = f"\n\n⚠️ WARNING: {result['warning']}" if result.get('warning') else ""
-        
-        return f"""
-📊 PRODUCT ANALYSIS REPORT
-
-🏷️ Product: {result['product_name']}
-🏢 Brand: {result['brand']}
-📁 Category: {result['category']}
-🎯 Name Match: {result['name_match_score']}%
-🎯 Overall Match: {result['match_score']}%
-✅ Confidence: {result['confidence'].upper()}{warning_text}
-
-📝 DESCRIPTION:
-{result['description']}
-
-🧪 INGREDIENTS:
-{result['ingredients']}
-
-⚠️ ALLERGEN ANALYSIS:
-Detected Allergens: {allergen_text}
-Total Count: {result['allergen_count']}
-Risk Level: {result['risk_level'].upper()}
-
-🌍 ETHICAL ASSESSMENT:
-Ethical Score: {result['ethical_score']}/100
-Details: {result['ethical_notes']}
-
-💡 RECOMMENDED ALTERNATIVES:
-{rec_text}
-
----
-Analysis completed with {result['confidence']} confidence.
-Match scores: Name={result['name_match_score']}%, Overall={result['match_score']}%
-"""
\ No newline at end of file
+        Returns:
+            str: The formatted report (see rag/report_format.py)
+        """
+        result = self.analyzer.analyze_product(product_name)
+        text = format_report(result, product_name, style)
+        record_tool_output(style, estimate_tokens(text))
+        return text
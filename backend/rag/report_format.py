@@ -0,0 +1,180 @@
+"""
+Tool Report Formats
+Turns an analyze_product() result into the text the Safety Analyst agent reads
+
+Every character the tool returns becomes prompt tokens, twice: the
+safety agent reads it, and its answer (built from it) is handed to the
+recommendation agent. Prompt tokens are most of our Ollama time, so the
+default "compact" format gives every field once, as "key: value" lines,
+without decoration.
+
+Formats (ALLERPREDICT_TOOL_FORMAT):
+- compact: key: value lines (default)
+- json: the same fields as one JSON object
+- full: the original emoji report, for people (degraded answers)
+"""
+import json
+import os
+
+TOOL_FORMATS = ("compact", "json", "full")
+TOOL_OUTPUT_FORMAT = os.environ.get("ALLERPREDICT_TOOL_FORMAT", "compact")
+if TOOL_OUTPUT_FORMAT not in TOOL_FORMATS:
+    TOOL_OUTPUT_FORMAT = "compact"
+
+
+def estimate_tokens(text):
+    """
+    Rough LLM token count (about 4 bytes of UTF-8 per token)
+
+    Good enough to compare formats; emojis count as the several
+    tokens they usually cost.
+    """
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+def report_fields(result, product_name):
+    """
+    Every field of a result, in reading order, without repeats
+
+    Returns:
+        dict: Field name -> value (strings, numbers or lists)
+    """
+    if not result['found']:
+        return {
+            "found": False,
+            "query": product_name,
+            "message": result['message'],
+            "did_you_mean": [
+                f"{p['name']} ({p['brand']}) {p['name_match']}%"
+                for p in result['similar_products']
+            ],
+        }
+
+    fields = {
+        "found": True,
+        "product": result['product_name'],
+        "brand": result['brand'],
+        "category": result['category'],
+        "name_match": result['name_match_score'],
+        "match": result['match_score'],
+        "confidence": result['confidence'],
+    }
+    if result.get('warning'):
+        fields["warning"] = result['warning']
+    fields.update({
+        "allergens": result['detected_allergens'],
+        "in_ingredients": result['inferred_allergens'],
+        "may_contain": result['trace_allergens'],
+        "allergen_count": result['allergen_count'],
+        "risk": result['risk_level'],
+        "ethical_score": result['ethical_score'],
+        "ethical_notes": result['ethical_notes'],
+        "alternatives": result['recommendations'],
+        "ingredients": result['ingredients'],
+        "description": result['description'],
+    })
+    return fields
+
+
+def format_compact(result, product_name):
+    """One "key: value" line per field; lists are comma-separated"""
+    lines = []
+    for key, value in report_fields(result, product_name).items():
+        if isinstance(value, bool):
+            value = "yes" if value else "no"
+        elif isinstance(value, list):
+            value = ("; " if key == "did_you_mean" else ", ").join(value) or "none"
+        elif key in ("name_match", "match"):
+            value = f"{value}%"
+        elif key == "ethical_score":
+            value = f"{value}/100"
+        lines.append(f"{key}: {value if value != '' else 'n/a'}")
+    return "\n".join(lines)
+
+
+def format_json(result, product_name):
+    """The same fields as one JSON object, without spaces"""
+    return json.dumps(report_fields(result, product_name), ensure_ascii=False, separators=(",", ":"))
+
+
+def format_full(result, product_name):
+    """The original decorated report"""
+    if not result['found']:
+        similar_text = '\n'.join([
+            f"- {p['name']} ({p['brand']}) - Name match: {p['name_match']}%"
+            for p in result['similar_products']
+        ])
+
+        return f"""
+❌ PRODUCT NOT FOUND
+
+Search query: {product_name}
+Message: {result['message']}
+
+Did you mean one of these?
+{similar_text}
+
+Please search with the exact product name.
+"""
+
+    # Format successful analysis
+    allergen_text = ', '.join(result['detected_allergens']) if result['detected_allergens'] else '✅ None detected'
+    inferred_text = ', '.join(result['inferred_allergens']) if result['inferred_allergens'] else 'None'
+    trace_text = ', '.join(result['trace_allergens']) if result['trace_allergens'] else 'None'
+    rec_text = '\n'.join([f"- {rec}" for rec in result['recommendations']]) if result['recommendations'] else 'No specific alternatives listed'
+
+    # Add warning if low confidence
+    warning_text = f"\n\n⚠️ WARNING: {result['warning']}" if result.get('warning') else ""
+
+    return f"""
+📊 PRODUCT ANALYSIS REPORT
+
+🏷️ Product: {result['product_name']}
+🏢 Brand: {result['brand']}
+📁 Category: {result['category']}
+🎯 Name Match: {result['name_match_score']}%
+🎯 Overall Match: {result['match_score']}%
+✅ Confidence: {result['confidence'].upper()}{warning_text}
+
+📝 DESCRIPTION:
+{result['description']}
+
+🧪 INGREDIENTS:
+{result['ingredients']}
+
+⚠️ ALLERGEN ANALYSIS:
+Detected Allergens: {allergen_text}
+Found in Ingredients: {inferred_text}
+May Contain (traces): {trace_text}
+Total Count: {result['allergen_count']}
+Risk Level: {result['risk_level'].upper()}
+
+🌍 ETHICAL ASSESSMENT:
+Ethical Score: {result['ethical_score']}/100
+Details: {result['ethical_notes']}
+
+💡 RECOMMENDED ALTERNATIVES:
+{rec_text}
+
+---
+Analysis completed with {result['confidence']} confidence.
+Match scores: Name={result['name_match_score']}%, Overall={result['match_score']}%
+"""
+
+
+FORMATTERS = {"compact": format_compact, "json": format_json, "full": format_full}
+
+
+def format_report(result, product_name, style=TOOL_OUTPUT_FORMAT):
+    """
+    Text for an analyze_product() result
+
+    Args:
+        result: AccurateProductAnalyzer.analyze_product output
+        product_name: What was searched for
+        style: "compact", "json" or "full"
+
+    Returns:
+        str: The report
+    """
+    return FORMATTERS[style](result, product_name)
@@ -0,0 +1,328 @@
+"""
+Engine Snapshot
+Everything the analyzer prepares at startup, in one memory-mapped file
+
+Starting the engine from data/metadata.json means parsing the catalog,
+embedding every product with the transformer and building the facts,
+keyword, suggestion and identity indexes. A snapshot stores the result:
+
+- catalog columns and derived facts: risk, ethics scores and allergen
+  bitmasks (the compiled catalog layout, rag/catalog.py)
+- normalized float32 product embeddings and the searchable texts
+- BM25 postings and ingredient postings (rag/bm25.py)
+- typeahead keys (rag/suggest.py) and the exact id / GTIN / name
+  lookups (rag/identity.py)
+
+Lookup tables are sorted key columns searched with bisect, so opening a
+snapshot decodes nothing; pages are read when a query touches them.
+
+The file holds only arrays, strings and a JSON header. It is not a
+pickle, so loading a snapshot never runs code from it. Before using
+one, the analyzer checks:
+
+- the format version
+- the search model that made the embeddings
+- the source catalog (size and time; SHA-256 when those changed)
+- the code that computed everything else (SHA-256 of CODE_FILES)
+- a CRC-32 of every section
+
+On any mismatch it rebuilds from the source and writes a new snapshot.
+Build one ahead of time with `python backend/manage.py build-snapshot`.
+"""
+import bisect
+import hashlib
+import os
+
+import numpy as np
+
+from rag.catalog import (
+    ColumnarCatalog, MappedStrings, catalog_sections, file_sha256,
+    normalize_products, string_section, write_sections,
+)
+from rag.bm25 import BM25Index
+from rag.identity import IdentityIndex
+from rag.quantization import normalize_rows
+from rag.suggest import KIND_WEIGHTS, SuggestionIndex
+
+SNAPSHOT_MAGIC = b"APSNAP01"
+SNAPSHOT_VERSION = 1
+
+RAG_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+# Modules whose results are stored; changing any of them makes old snapshots stale
+CODE_FILES = (
+    "allergens.py", "bm25.py", "catalog.py", "derived.py", "identity.py",
+    "rag_engine.py", "snapshot.py", "suggest.py",
+)
+
+# Suggestion kinds, stored as one byte (their position here)
+KINDS = tuple(KIND_WEIGHTS)
+
+
+class StaleSnapshot(ValueError):
+    """The snapshot is damaged or does not match the catalog, model or code"""
+
+
+def code_fingerprint():
+    """SHA-256 over the source of CODE_FILES"""
+    digest = hashlib.sha256()
+    for name in CODE_FILES:
+        with open(os.path.join(RAG_FOLDER, name), "rb") as file:
+            digest.update(name.encode("utf-8") + b"\0" + file.read())
+    return digest.hexdigest()
+
+
+def source_fingerprint(path):
+    """Path, size, modification time and SHA-256 of the source catalog"""
+    status = os.stat(path)
+    return {
+        "path": os.path.abspath(path),
+        "size": status.st_size,
+        "mtime_ns": status.st_mtime_ns,
+        "sha256": file_sha256(path),
+    }
+
+
+class MappedLookup:
+    """
+    A read-only dict over sorted keys (a MappedStrings column)
+
+    Without starts, key i owns row i of every value column and get()
+    returns that value. With starts, key i owns rows starts[i] to
+    starts[i + 1] and get() returns those slices. Several value columns
+    come back as a tuple.
+    """
+
+    def __init__(self, keys, columns, starts=None):
+        self.keys = keys
+        self.columns = columns
+        self.starts = starts
+
+    def _position(self, key):
+        position = bisect.bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            return position
+        return None
+
+    def _values(self, position):
+        if self.starts is None:
+            values = [column[position] for column in self.columns]
+        else:
+            start, end = int(self.starts[position]), int(self.starts[position + 1])
+            values = [column[start:end] for column in self.columns]
+        return values[0] if len(values) == 1 else tuple(values)
+
+    def get(self, key, default=None):
+        position = self._position(key)
+        return default if position is None else self._values(position)
+
+    def __contains__(self, key):
+        return self._position(key) is not None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def items(self):
+        for position, key in enumerate(self.keys):
+            yield key, self._values(position)
+
+
+class MappedEntries:
+    """Suggestion entries as (product index, kind) pairs, read from two columns"""
+
+    def __init__(self, indices, kinds):
+        self.indices = indices
+        self.kinds = kinds
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, position):
+        return int(self.indices[position]), KINDS[self.kinds[position]]
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+
+def _strings(arrays, name, values):
+    arrays[f"{name}.offsets"], arrays[f"{name}.data"] = string_section(values)
+
+
+def _lookup_sections(arrays, prefix, table, dtypes, grouped):
+    """
+    Add the sections of one lookup table (read back by MappedLookup)
+
+    Args:
+        table: dict; a value is one item per dtype (grouped: one
+            sequence per dtype)
+        dtypes: Value column dtypes
+        grouped: Keys own several rows (stored with a starts column)
+    """
+    keys = sorted(table)
+    _strings(arrays, f"{prefix}.keys", keys)
+    rows = [table[key] for key in keys]
+
+    if not grouped:
+        arrays[f"{prefix}.values0"] = np.asarray(rows, dtype=dtypes[0])
+        return
+
+    starts = np.zeros(len(keys) + 1, dtype=np.uint64)
+    np.cumsum([len(row[0]) for row in rows], out=starts[1:])
+    arrays[f"{prefix}.starts"] = starts
+    for column, dtype in enumerate(dtypes):
+        parts = [np.asarray(row[column], dtype=dtype) for row in rows]
+        arrays[f"{prefix}.values{column}"] = np.concatenate(parts) if parts else np.zeros(0, dtype=dtype)
+
+
+def write_snapshot(output_path, analyzer, embeddings, source_path, model_id):
+    """
+    Save a freshly built analyzer's state
+
+    Args:
+        output_path: Snapshot file (replaced atomically)
+        analyzer: AccurateProductAnalyzer built from source_path
+        embeddings: Its float32 product embeddings (before quantization)
+        source_path: The catalog file it was built from
+        model_id: rag.encoders.search_model_id() of its search model
+
+    Returns:
+        dict: The snapshot header
+    """
+    products = normalize_products(analyzer.all_products)
+    header, arrays = catalog_sections(products, analyzer.product_facts)
+
+    arrays["embeddings"] = normalize_rows(embeddings)
+    _strings(arrays, "search_text", list(analyzer.product_search_data))
+
+    postings, contents, _ = analyzer.keyword_index.state
+    _lookup_sections(arrays, "bm25.postings", postings, ("int32", "float32"), grouped=True)
+    _lookup_sections(arrays, "bm25.contents", {term: (documents,) for term, documents in contents.items()},
+                     ("int32",), grouped=True)
+
+    suggestions = analyzer.suggestions
+    _strings(arrays, "suggest.keys", list(suggestions.keys))
+    arrays["suggest.indices"] = np.asarray([index for index, _ in suggestions.entries], dtype=np.int32)
+    arrays["suggest.kinds"] = np.asarray([KINDS.index(kind) for _, kind in suggestions.entries], dtype=np.uint8)
+
+    identity = analyzer.identity
+    _lookup_sections(arrays, "identity.ids", dict(identity.by_id), ("int32",), grouped=False)
+    _lookup_sections(arrays, "identity.gtins", dict(identity.by_gtin), ("int32",), grouped=False)
+    _lookup_sections(arrays, "identity.names", {key: (sorted(indices),) for key, indices in identity.by_name.items()},
+                     ("int32",), grouped=True)
+
+    header["snapshot"] = {
+        "version": SNAPSHOT_VERSION,
+        "model": model_id,
+        "dimension": int(arrays["embeddings"].shape[1]),
+        "source": source_fingerprint(source_path),
+        "code": code_fingerprint(),
+        "invalid_gtins": identity.invalid_gtins,
+    }
+
+    folder = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(folder, exist_ok=True)
+    return write_sections(output_path, SNAPSHOT_MAGIC, header, arrays)
+
+
+class EngineSnapshot:
+    """
+    An opened snapshot file; the parts come back as the analyzer's own
+    types (ColumnarCatalog, BM25Index, SuggestionIndex, IdentityIndex)
+
+    Args:
+        path: File written by write_snapshot
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            self.catalog = ColumnarCatalog(path, magic=SNAPSHOT_MAGIC)
+        except (ValueError, KeyError) as error:
+            raise StaleSnapshot(f"unreadable ({error})")
+        self.info = self.catalog.header.get("snapshot", {})
+
+    def check(self, source_path, model_id, verify_checksums=True):
+        """
+        Raise StaleSnapshot when the snapshot may not be used
+
+        Args:
+            source_path: The catalog file the analyzer would load
+            model_id: rag.encoders.search_model_id() of its search model
+            verify_checksums: Also compare every section's CRC-32
+                (reads the whole file once)
+        """
+        if self.info.get("version") != SNAPSHOT_VERSION:
+            raise StaleSnapshot(f"format {self.info.get('version')}, expected {SNAPSHOT_VERSION}")
+        if self.info.get("model") != model_id:
+            raise StaleSnapshot(f"built with model {self.info.get('model')}, running {model_id}")
+        if self.info.get("code") != code_fingerprint():
+            raise StaleSnapshot("the indexing code changed")
+
+        saved = self.info.get("source", {})
+        status = os.stat(source_path)
+        unchanged = (saved.get("path") == os.path.abspath(source_path)
+                     and saved.get("size") == status.st_size
+                     and saved.get("mtime_ns") == status.st_mtime_ns)
+        if not unchanged and saved.get("sha256") != file_sha256(source_path):
+            raise StaleSnapshot(f"{os.path.basename(source_path)} changed")
+
+        if verify_checksums:
+            damaged = self.catalog.damaged_sections()
+            if damaged:
+                raise StaleSnapshot(f"checksum mismatch in {', '.join(damaged[:3])}")
+
+    def _strings(self, name):
+        return MappedStrings(self.catalog.section(f"{name}.offsets"), self.catalog.section(f"{name}.data"))
+
+    def _lookup(self, prefix, columns, grouped):
+        return MappedLookup(
+            self._strings(f"{prefix}.keys"),
+            [self.catalog.section(f"{prefix}.values{column}") for column in range(columns)],
+            self.catalog.section(f"{prefix}.starts") if grouped else None,
+        )
+
+    def embeddings(self):
+        """Unit-length float32 embeddings, (products x dimension), mapped"""
+        return self.catalog.section("embeddings")
+
+    def search_texts(self):
+        """The searchable text of every product (list-like)"""
+        return self._strings("search_text")
+
+    def keyword_index(self, products, facts):
+        return BM25Index.from_state(
+            products, facts,
+            self._lookup("bm25.postings", 2, grouped=True),
+            self._lookup("bm25.contents", 1, grouped=True),
+        )
+
+    def suggestion_index(self, products):
+        entries = MappedEntries(self.catalog.section("suggest.indices"), self.catalog.section("suggest.kinds"))
+        return SuggestionIndex.from_sorted(products, self._strings("suggest.keys"), entries)
+
+    def identity_index(self):
+        return IdentityIndex.from_tables(
+            self._lookup("identity.ids", 1, grouped=False),
+            self._lookup("identity.gtins", 1, grouped=False),
+            self._lookup("identity.names", 1, grouped=True),
+            self.info.get("invalid_gtins", 0),
+        )
+
+
+def open_snapshot(path, source_path, model_id, verify_checksums=True):
+    """
+    Open a snapshot and check it is current
+
+    Returns:
+        EngineSnapshot
+
+    Raises:
+        FileNotFoundError: No snapshot yet
+        StaleSnapshot: It must be rebuilt (the message says why)
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    snapshot = EngineSnapshot(path)
+    snapshot.check(source_path, model_id, verify_checksums)
+    return snapshot
@@ -0,0 +1,183 @@
+"""
+Typeahead Suggestion Index
+Sorted-array prefix index over product names, brands and aliases
+
+Every product adds a few keys:
+- its full name, and the name from each later word ("nacho cheese" for
+  "Doritos Nacho Cheese"), so typing any word of the name finds it
+- its brand
+- spelling variants (hyphens as spaces, no punctuation) and any
+  "aliases" listed on the product
+
+All keys sit in one sorted list, so a prefix is two bisects away. Matches
+are ranked by how well they match, then by popularity (how many API requests
+asked for the product).
+"""
+import bisect
+import heapq
+import math
+import re
+import threading
+
+# Stop looking after this many keys for very short prefixes (keeps it sub-millisecond)
+MAX_SCAN = 1000
+
+# Match quality, best first
+KIND_WEIGHTS = {"name": 3.0, "alias": 2.5, "word": 2.0, "brand": 1.5}
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_text(text):
+    """Lowercase with single spaces"""
+    return " ".join(str(text).lower().split())
+
+
+def spelling_variants(text):
+    """'Coca-Cola' -> {'coca-cola', 'coca cola', 'cocacola'}"""
+    text = normalize_text(text)
+    variants = {text, normalize_text(text.replace("-", " ")), normalize_text(_PUNCTUATION.sub("", text))}
+    return {variant for variant in variants if variant}
+
+
+def product_keys(product):
+    """
+    Every (key, kind) a product can be found by
+
+    Returns:
+        set: (normalized key, kind) pairs
+    """
+    keys = set()
+    name = product.get("name", "")
+    for variant in spelling_variants(name):
+        keys.add((variant, "name"))
+        words = variant.split(" ")
+        for start in range(1, len(words)):
+            keys.add((" ".join(words[start:]), "word"))
+
+    for variant in spelling_variants(product.get("brand", "")):
+        keys.add((variant, "brand"))
+
+    for alias in product.get("aliases", []) or []:
+        for variant in spelling_variants(alias):
+            keys.add((variant, "alias"))
+    return keys
+
+
+class SuggestionIndex:
+    """
+    Prefix search with popularity-weighted ranking
+
+    keys[i] is a normalized string; entries[i] is (product index, kind)
+    for the same position.
+    """
+
+    def __init__(self, products):
+        self.products = products
+        self.lock = threading.Lock()
+        self.popularity = [0] * len(products)
+
+        pairs = []
+        for index, product in enumerate(products):
+            for key, kind in product_keys(product):
+                pairs.append((key, index, kind))
+        pairs.sort()
+
+        self.keys = [key for key, _, _ in pairs]
+        self.entries = [(index, kind) for _, index, kind in pairs]
+
+    @classmethod
+    def from_sorted(cls, products, keys, entries):
+        """
+        An index over keys sorted earlier (e.g. read from an engine
+        snapshot, rag/snapshot.py); any sequences work, they become
+        lists on the first upsert
+        """
+        index = cls([])
+        index.products = products
+        index.popularity = [0] * len(products)
+        index.keys = keys
+        index.entries = entries
+        return index
+
+    def suggest(self, query, limit=8):
+        """
+        Best products for what the user has typed so far
+
+        Args:
+            query: Partial text (empty returns the most popular products)
+            limit: Most suggestions to return
+
+        Returns:
+            list: dicts with id, name, brand, category, matched, kind
+        """
+        prefix = normalize_text(query)
+        with self.lock:
+            if not prefix:
+                ranked = heapq.nlargest(limit, range(len(self.products)),
+                                        key=lambda index: (self.popularity[index], -index))
+                return [self._suggestion(index, "", "popular") for index in ranked]
+
+            start = bisect.bisect_left(self.keys, prefix)
+            end = bisect.bisect_left(self.keys, prefix + "\uffff", start, min(len(self.keys), start + MAX_SCAN))
+
+            # Best key per product
+            best = {}
+            for position in range(start, end):
+                index, kind = self.entries[position]
+                key = self.keys[position]
+                score = KIND_WEIGHTS[kind] + (1.0 if key == prefix else 0.0) + math.log1p(self.popularity[index])
+                if index not in best or score > best[index][0]:
+                    best[index] = (score, key, kind)
+
+            ranked = heapq.nlargest(limit, best.items(), key=lambda item: (item[1][0], -item[0]))
+            return [self._suggestion(index, key, kind) for index, (_, key, kind) in ranked]
+
+    def _suggestion(self, index, key, kind):
+        product = self.products[index]
+        return {
+            "id": product.get("id"),
+            "name": product.get("name"),
+            "brand": product.get("brand"),
+            "category": product.get("category"),
+            "matched": key,
+            "kind": kind,
+        }
+
+    def record_hit(self, index):
+        """Count one request for a product (raises it in future suggestions)"""
+        with self.lock:
+            if 0 <= index < len(self.popularity):
+                self.popularity[index] += 1
+
+    def upsert(self, index, old_product, product):
+        """
+        Update the keys of one product
+
+        Args:
+            index: Catalog index (len(products) for a new product)
+            old_product: The product being replaced, or None
+            product: New product data
+        """
+        with self.lock:
+            if not isinstance(self.keys, list):
+                self.keys = list(self.keys)
+                self.entries = list(self.entries)
+
+            if old_product is not None:
+                for key, kind in product_keys(old_product):
+                    position = bisect.bisect_left(self.keys, key)
+                    while position < len(self.keys) and self.keys[position] == key:
+                        if self.entries[position] == (index, kind):
+                            del self.keys[position]
+                            del self.entries[position]
+                            break
+                        position += 1
+
+            for key, kind in sorted(product_keys(product)):
+                position = bisect.bisect_right(self.keys, key)
+                self.keys.insert(position, key)
+                self.entries.insert(position, (index, kind))
+
+            if index == len(self.popularity):
+                self.popularity.append(0)
@@ -0,0 +1,243 @@
+"""
+Pre-generated Analysis Reports
+Agent reports for the whole catalog, written ahead of time by a batch run
+
+Without a user note, the agents write the same report for a product no
+matter who asks, and the catalog changes slowly. So the batch command
+
+    python backend/manage.py pregenerate-reports --workers 2
+
+runs the crew over every product and keeps each report in a small
+SQLite file, keyed by product id and a content hash. The hash covers
+the product's data, the pipeline mode, the LLM model and REPORT_VERSION,
+so a changed product (or prompt) makes its report stale. /api/analyze
+serves fresh reports straight away; a stale one is ignored until the
+next batch run regenerates it.
+
+Every report is committed as soon as it is written. The stored reports
+are the checkpoint: an interrupted run resumes with the products that
+are still missing or stale.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+BASE_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REPORTS_DATABASE = os.environ.get(
+    "ALLERPREDICT_REPORTS_DB", os.path.join(BASE_FOLDER, "data", "reports.sqlite3")
+)
+
+# Bump when the prompts or the allergen facts change, so every stored report becomes stale
+REPORT_VERSION = 3
+
+# Report fields written by the agents (the database facts are looked up fresh)
+REPORT_FIELDS = ("analysis", "recommendations", "full_report", "agents_used", "token_usage")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    product_id TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    product_name TEXT NOT NULL,
+    report TEXT NOT NULL,
+    generated_at REAL NOT NULL
+);
+"""
+
+
+def product_id(product, index):
+    """A product's id, or its catalog index when it has none"""
+    value = product.get("id")
+    return str(index) if value in (None, "") else str(value)
+
+
+def content_hash(product, mode, model):
+    """
+    SHA-256 of everything a product's report depends on
+
+    Args:
+        product: Product dict
+        mode: Pipeline mode ("dag" or "sequential")
+        model: LLM model name
+    """
+    content = json.dumps(
+        {"product": product, "mode": mode, "model": model, "version": REPORT_VERSION},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class ReportStore:
+    """
+    Stored reports, one per product (thread-safe)
+
+    Args:
+        path: SQLite file (":memory:" works for experiments)
+    """
+
+    def __init__(self, path=REPORTS_DATABASE):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.database = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.database.execute("PRAGMA journal_mode=WAL")
+        self.database.executescript(_SCHEMA)
+        self.lock = threading.Lock()
+
+    def get(self, product_id, content_hash):
+        """
+        The stored report of a product, if it is still fresh
+
+        Returns:
+            dict: REPORT_FIELDS plus generated_at, or None when missing
+            or stale (stored under another content hash)
+        """
+        with self.lock:
+            row = self.database.execute(
+                "SELECT report, generated_at FROM reports WHERE product_id = ? AND content_hash = ?",
+                (product_id, content_hash)
+            ).fetchone()
+        if row is None:
+            return None
+        report = json.loads(row[0])
+        report["generated_at"] = row[1]
+        return report
+
+    def put(self, product_id, content_hash, product_name, result):
+        """Save (or replace) a product's report from an analysis result"""
+        report = {field: result.get(field) for field in REPORT_FIELDS}
+        with self.lock:
+            self.database.execute(
+                "INSERT OR REPLACE INTO reports (product_id, content_hash, product_name, report, generated_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (product_id, content_hash, product_name, json.dumps(report, ensure_ascii=False), time.time())
+            )
+
+    def hashes(self):
+        """
+        Returns:
+            dict: product id -> content hash of its stored report
+        """
+        with self.lock:
+            return dict(self.database.execute("SELECT product_id, content_hash FROM reports"))
+
+    def remove_missing(self, product_ids):
+        """
+        Delete reports of products no longer in the catalog
+
+        Returns:
+            int: Reports deleted
+        """
+        keep = set(product_ids)
+        missing = [(stored,) for stored in self.hashes() if stored not in keep]
+        with self.lock:
+            self.database.executemany("DELETE FROM reports WHERE product_id = ?", missing)
+        return len(missing)
+
+    def stats(self):
+        with self.lock:
+            count, newest = self.database.execute("SELECT COUNT(*), MAX(generated_at) FROM reports").fetchone()
+        return {"reports": count, "newest": newest}
+
+    def close(self):
+        with self.lock:
+            self.database.close()
+
+
+def pregenerate_reports(crew, store, workers=2, limit=None, force=False, mode=None, progress_every=25):
+    """
+    Run the crew over the catalog and store every report
+
+    Products with a fresh report are skipped (unless force), so a second
+    run only regenerates what changed, and an interrupted run resumes.
+    Each product is asked for by GTIN or name; products whose name is
+    shared by others (so a query cannot single them out) are skipped.
+
+    Args:
+        crew: ProductAnalysisCrew
+        store: ReportStore
+        workers: Analyses running at once
+        limit: Most products to generate in this run (None = all)
+        force: Regenerate fresh reports too
+        mode: Pipeline mode (default: the crew's PIPELINE_MODE)
+        progress_every: Print a progress line every this many products
+
+    Returns:
+        dict: Counts of products: total, fresh, generated, failed,
+        skipped, plus removed (reports of deleted products)
+    """
+    analyzer = crew.analysis_tool.analyzer
+    stored = store.hashes()
+    counts = {"total": 0, "fresh": 0, "generated": 0, "failed": 0, "skipped": 0, "removed": 0}
+    cancel_event = threading.Event()
+
+    def work():
+        """(index, query, product id, hash) of every product to generate"""
+        queued = 0
+        for index, product in enumerate(analyzer.all_products):
+            counts["total"] += 1
+            key, digest = crew.report_key(index, mode)
+            if not force and stored.get(key) == digest:
+                counts["fresh"] += 1
+                continue
+
+            query = product.get("gtin") or product.get("name", "")
+            hit = analyzer.identity.match(query)
+            if hit is None or hit[0] != index:
+                counts["skipped"] += 1
+                continue
+
+            if limit is not None and queued >= limit:
+                continue
+            queued += 1
+            yield index, query, key, digest
+
+    def generate(index, query, key, digest):
+        result = crew.analyze_product(query, cancel_event=cancel_event, mode=mode, use_stored=False)
+        if not result.get("success") or result.get("degraded"):
+            return False
+        store.put(key, digest, analyzer.all_products[index].get("name", ""), result)
+        return True
+
+    def collect(finished):
+        for future in finished:
+            try:
+                ok = future.result()
+            except Exception as error:
+                print(f"❌ Report failed: {error}")
+                ok = False
+            counts["generated" if ok else "failed"] += 1
+            done = counts["generated"] + counts["failed"]
+            if done % progress_every == 0:
+                print(f"📝 {done} reports: {counts['generated']} written, {counts['failed']} failed")
+
+    start = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="allerpredict-report")
+    pending = set()
+    try:
+        for item in work():
+            # Bounded: never more than two analyses per worker queued up
+            if len(pending) >= 2 * workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+            pending.add(pool.submit(generate, *item))
+        collect(wait(pending).done)
+    except KeyboardInterrupt:
+        # Running crews stop at their next step; what was saved stays saved
+        cancel_event.set()
+        print("🛑 Stopped. Run the command again to resume.")
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    if not cancel_event.is_set() and limit is None:
+        ids = [product_id(product, index) for index, product in enumerate(analyzer.all_products)]
+        counts["removed"] = store.remove_missing(ids)
+
+    print(f"✅ {counts['generated']} reports written, {counts['fresh']} already fresh, "
+          f"{counts['failed']} failed, {counts['skipped']} skipped "
+          f"in {time.perf_counter() - start:.1f}s")
+    return counts
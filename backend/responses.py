@@ -0,0 +1,139 @@
+"""
+Fast JSON Responses
+Quicker encoding of big API payloads, and cached bytes for listings
+
+- FastJSONResponse: encodes with orjson when it is installed (optional,
+  see requirements.txt), otherwise with the json module, giving the same
+  compact output as FastAPI's JSONResponse. Returning a response object
+  also skips FastAPI's jsonable_encoder pass over the whole payload.
+- model_response: a Pydantic model serialized once by pydantic-core,
+  instead of being validated again against response_model and re-encoded
+- ResponseCache: the encoded bytes of listings that only change with
+  the catalog (all products, a category), dropped when the catalog
+  version changes
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from fastapi.responses import JSONResponse, Response
+
+from telemetry import record_cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Which encoder FastJSONResponse uses (shown in /api/health)
+JSON_ENCODER = "orjson" if orjson is not None else "json"
+
+# Cached listing bodies kept at once (least recently used dropped first)
+RESPONSE_CACHE_SIZE = int(os.environ.get("ALLERPREDICT_RESPONSE_CACHE_SIZE", "64"))
+
+
+def _default(value):
+    """Values the encoders do not know: Pydantic models, NumPy numbers and arrays"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content):
+    """
+    Compact UTF-8 JSON
+
+    Returns:
+        bytes: The encoded content
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded by dumps() (orjson when available)"""
+
+    def render(self, content):
+        return dumps(content)
+
+
+def model_response(model, status_code=200):
+    """
+    Response for a Pydantic model, serialized by pydantic-core
+
+    FastAPI would validate the returned model against response_model
+    and then encode it again; a ready Response skips both.
+    """
+    return Response(content=model.model_dump_json(), status_code=status_code, media_type="application/json")
+
+
+class ResponseCache:
+    """
+    Encoded response bodies, valid for one catalog version (thread-safe)
+
+    Args:
+        version: function() -> the current catalog version; when it
+            changes, every cached body is dropped
+        size: Most bodies kept
+    """
+
+    def __init__(self, version, size=RESPONSE_CACHE_SIZE):
+        self.version = version
+        self.size = size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()    # key -> body bytes
+        self.cached_version = None
+        self.hits = 0
+        self.misses = 0
+
+    def response(self, key, build):
+        """
+        The cached response for key, built and encoded on a miss
+
+        Args:
+            key: Anything hashable naming the payload ("products", ("category", "snacks"))
+            build: function() -> the content to encode
+
+        Returns:
+            Response: application/json with the encoded body
+        """
+        version = self.version()
+        with self.lock:
+            if version != self.cached_version:
+                self.entries.clear()
+                self.cached_version = version
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        record_cache("response", body is not None)
+
+        if body is None:
+            body = dumps(build())
+            with self.lock:
+                self.misses += 1
+                if self.size > 0 and self.cached_version == version:
+                    self.entries[key] = body
+                    while len(self.entries) > self.size:
+                        self.entries.popitem(last=False)
+
+        return Response(content=body, media_type="application/json")
+
+    def stats(self):
+        with self.lock:
+            return {
+                "encoder": JSON_ENCODER,
+                "entries": len(self.entries),
+                "bytes": sum(len(body) for body in self.entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "catalog_version": self.cached_version,
+            }
@@ -0,0 +1,306 @@
+"""
+Latency Tracing and Metrics
+Times each pipeline stage and exposes counters/histograms in Prometheus format
+
+Optional span export:
+- ALLERPREDICT_TRACE_FILE=/path/spans.jsonl  writes one JSON span per line
+- OTEL_EXPORTER_OTLP_ENDPOINT=http://localhost:4318  sends OpenTelemetry
+  spans to a local collector (needs opentelemetry-sdk and the OTLP exporter)
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Histogram buckets in seconds: sub-millisecond lookups up to long LLM runs
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0
+)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of counters and histograms
+
+    Metrics are created on first use; each (name, labels) pair is its
+    own series.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.help_text = {}
+        self.counters = {}     # name -> {labels: value}
+        self.histograms = {}   # name -> {labels: [bucket counts..., sum, count]}
+
+    def describe(self, name, help_text):
+        """Set the # HELP line for a metric"""
+        self.help_text[name] = help_text
+
+    def inc(self, name, amount=1, **labels):
+        """Add to a counter"""
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """Record one value in a histogram"""
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                state = [0] * len(LATENCY_BUCKETS) + [0.0, 0]
+                series[key] = state
+
+            for position, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    state[position] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self):
+        """
+        Export every metric in the Prometheus text format
+
+        Returns:
+            str: Exposition text for the /metrics endpoint
+        """
+        lines = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                self._header(lines, name, "counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_labels(key)} {value}")
+
+            for name, series in sorted(self.histograms.items()):
+                self._header(lines, name, "histogram")
+                for key, state in sorted(series.items()):
+                    for position, bound in enumerate(LATENCY_BUCKETS):
+                        bucket_key = key + (("le", repr(bound)),)
+                        lines.append(f"{name}_bucket{_labels(bucket_key)} {state[position]}")
+                    lines.append(f"{name}_bucket{_labels(key + (('le', '+Inf'),))} {state[-1]}")
+                    lines.append(f"{name}_sum{_labels(key)} {state[-2]}")
+                    lines.append(f"{name}_count{_labels(key)} {state[-1]}")
+
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines, name, kind):
+        if name in self.help_text:
+            lines.append(f"# HELP {name} {self.help_text[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def snapshot(self):
+        """
+        Plain-dict copy of all counters and histogram sums/counts
+
+        Handy for benchmarks and debugging.
+        """
+        with self.lock:
+            return {
+                "counters": {
+                    name: {_labels(key): value for key, value in series.items()}
+                    for name, series in self.counters.items()
+                },
+                "histograms": {
+                    name: {
+                        _labels(key): {"sum": state[-2], "count": state[-1]}
+                        for key, state in series.items()
+                    }
+                    for name, series in self.histograms.items()
+                },
+            }
+
+
+def _labels(key):
+    """Format a label tuple as {a="1",b="2"}"""
+    if not key:
+        return ""
+    parts = []
+    for label, value in key:
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{label}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+METRICS = MetricsRegistry()
+METRICS.describe("allerpredict_stage_seconds", "Time spent in each analysis pipeline stage")
+METRICS.describe("allerpredict_http_request_seconds", "HTTP request latency by route")
+METRICS.describe("allerpredict_queue_wait_seconds", "Time spent waiting for a free analysis slot")
+METRICS.describe("allerpredict_cache_requests_total", "Cache lookups by cache and result (hit/miss)")
+METRICS.describe("allerpredict_llm_tokens_total", "LLM tokens used, by kind (prompt/completion/total) and stage")
+METRICS.describe("allerpredict_encode_batches_total", "Model forward passes run for query embeddings")
+METRICS.describe("allerpredict_encoded_queries_total", "Query strings encoded by the model (over all batches)")
+METRICS.describe("allerpredict_admission_total", "Analysis requests by admission result (admitted/rejected/timed_out)")
+METRICS.describe("allerpredict_breaker_transitions_total", "LLM circuit breaker state changes, by new state")
+METRICS.describe("allerpredict_degraded_total", "Analyses answered from the database only, by reason")
+METRICS.describe("allerpredict_tool_calls_total", "Analysis tool reports returned, by format")
+METRICS.describe("allerpredict_tool_output_tokens_total", "Estimated tokens in analysis tool reports, by format")
+METRICS.describe("allerpredict_jobs_total", "Analysis jobs by lane and status (queued/succeeded/failed/cancelled)")
+
+
+# === Span export ===
+
+_current_span = contextvars.ContextVar("allerpredict_span", default=None)
+
+
+class JsonSpanWriter:
+    """Appends finished spans to a JSON-lines file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def write(self, span):
+        line = json.dumps(span, ensure_ascii=False)
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(line + "\n")
+
+
+def _create_otel_tracer():
+    """OpenTelemetry tracer if an OTLP endpoint is configured and the SDK is installed"""
+    if not os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return None
+
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError:
+        print("⚠️ OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-sdk is not installed")
+        return None
+
+    provider = TracerProvider(resource=Resource.create({"service.name": "allerpredict"}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    return trace.get_tracer("allerpredict")
+
+
+_trace_file = os.environ.get("ALLERPREDICT_TRACE_FILE")
+_span_writer = JsonSpanWriter(_trace_file) if _trace_file else None
+_otel_tracer = _create_otel_tracer()
+
+
+@contextmanager
+def stage(name, **attributes):
+    """
+    Time one pipeline stage
+
+    Records allerpredict_stage_seconds{stage=name} and, when span export
+    is configured, emits a span (nested under the current one).
+
+    Example:
+        with stage("query_encoding"):
+            embedding = model.encode(query)
+    """
+    otel_span = None
+    if _otel_tracer is not None:
+        otel_span = _otel_tracer.start_as_current_span(name, attributes=attributes)
+        otel_span.__enter__()
+
+    parent = _current_span.get()
+    span = {
+        "name": name,
+        "trace_id": parent["trace_id"] if parent else uuid.uuid4().hex,
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": parent["span_id"] if parent else None,
+        "attributes": attributes,
+    }
+    token = _current_span.set(span)
+
+    start_wall = time.time()
+    start = time.perf_counter()
+    error = None
+    try:
+        yield span
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _current_span.reset(token)
+        METRICS.observe("allerpredict_stage_seconds", elapsed, stage=name)
+
+        if _span_writer is not None:
+            span.update(
+                start_time=start_wall,
+                duration_seconds=elapsed,
+                status="error" if error else "ok",
+            )
+            _span_writer.write(span)
+
+        if otel_span is not None:
+            if error is not None:
+                otel_span.__exit__(type(error), error, error.__traceback__)
+            else:
+                otel_span.__exit__(None, None, None)
+
+
+def record_stage(name, seconds):
+    """Record a stage duration measured elsewhere (e.g. between callbacks)"""
+    METRICS.observe("allerpredict_stage_seconds", seconds, stage=name)
+
+
+def record_cache(cache, hit):
+    """Count one cache lookup"""
+    METRICS.inc("allerpredict_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def record_encode_batch(size):
+    """Count one query-encoding forward pass and how many queries it carried"""
+    METRICS.inc("allerpredict_encode_batches_total")
+    METRICS.inc("allerpredict_encoded_queries_total", size)
+
+
+def record_queue_wait(queue, seconds):
+    """Record how long a request waited before it could start"""
+    METRICS.observe("allerpredict_queue_wait_seconds", seconds, queue=queue)
+
+
+def record_admission(result):
+    """Count one admission decision for a crew run"""
+    METRICS.inc("allerpredict_admission_total", result=result)
+
+
+def record_breaker_transition(state):
+    """Count the LLM circuit breaker moving to a new state"""
+    METRICS.inc("allerpredict_breaker_transitions_total", state=state)
+
+
+def record_degraded(reason):
+    """Count one analysis answered without the LLM"""
+    METRICS.inc("allerpredict_degraded_total", reason=reason)
+
+
+def record_tool_output(style, tokens):
+    """Count one tool report and its estimated size in tokens"""
+    METRICS.inc("allerpredict_tool_calls_total", format=style)
+    METRICS.inc("allerpredict_tool_output_tokens_total", tokens, format=style)
+
+
+def record_job(lane, status):
+    """Count one analysis job reaching a status"""
+    METRICS.inc("allerpredict_jobs_total", lane=lane, status=status)
+
+
+def record_llm_tokens(usage, stage_name="crew"):
+    """
+    Count LLM tokens from a CrewAI usage dict
+
+    Args:
+        usage: e.g. {"prompt_tokens": 812, "completion_tokens": 240, "total_tokens": 1052}
+        stage_name: Pipeline stage that used them (e.g. "safety_agent")
+    """
+    if not usage:
+        return
+    for kind in ("prompt", "completion", "total"):
+        amount = usage.get(f"{kind}_tokens", 0)
+        if amount:
+            METRICS.inc("allerpredict_llm_tokens_total", amount, kind=kind, stage=stage_name)
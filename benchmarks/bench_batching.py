@@ -0,0 +1,88 @@
+"""
+Query Encoding Throughput: Batched vs Unbatched
+Many threads encode distinct queries at once, either each calling the
+model alone (the old path) or through MicroBatchEncoder
+
+Usage:
+    python benchmarks/bench_batching.py
+    python benchmarks/bench_batching.py --concurrency 1,8,32 --max-batch 32 --wait-ms 1,2,5
+    python benchmarks/bench_batching.py --encoder hash   # no model download (no real batching gain)
+"""
+import argparse
+import threading
+import time
+
+from common import HashEncoder, make_catalog, make_queries, save_report, summarize
+
+from rag.batching import MicroBatchEncoder
+
+
+def load_encoder(name):
+    if name == "hash":
+        return HashEncoder()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer("all-MiniLM-L6-v2")
+
+
+def run_threads(encode, queries, concurrency):
+    """
+    Split queries over `concurrency` threads and time every call
+
+    Returns:
+        dict: summarize() result
+    """
+    latencies = []
+    lock = threading.Lock()
+    chunks = [queries[start::concurrency] for start in range(concurrency)]
+
+    def worker(chunk):
+        mine = []
+        for query in chunk:
+            start = time.perf_counter()
+            encode(query)
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    wall_start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, wall_seconds=time.perf_counter() - wall_start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--encoder", default="minilm", choices=["minilm", "hash"])
+    parser.add_argument("--concurrency", default="1,4,16,32", help="Comma-separated thread counts")
+    parser.add_argument("--queries", type=int, default=512, help="Distinct queries per case")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--wait-ms", default="2", help="Comma-separated batching windows")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/batching-<rev>.json)")
+    args = parser.parse_args()
+
+    model = load_encoder(args.encoder)
+    queries = make_queries(make_catalog(max(args.queries, 1000)), args.queries)
+    for query in queries[:8]:
+        model.encode(query)  # Warm up
+
+    cases = {}
+    for concurrency in [int(value) for value in args.concurrency.split(",")]:
+        print(f"⏱️  unbatched @ {concurrency} threads...")
+        cases[f"unbatched/c{concurrency}"] = run_threads(model.encode, queries, concurrency)
+
+        for wait_ms in [float(value) for value in args.wait_ms.split(",")]:
+            print(f"⏱️  batched (wait {wait_ms} ms) @ {concurrency} threads...")
+            batcher = MicroBatchEncoder(model, max_batch=args.max_batch, max_wait_ms=wait_ms)
+            result = run_threads(batcher.encode, queries, concurrency)
+            batcher.close()
+            result["average_batch"] = round(batcher.encoded / batcher.batches, 2) if batcher.batches else 0.0
+            cases[f"batched_w{wait_ms:g}/c{concurrency}"] = result
+
+    save_report("batching", cases, args.output)
+
+
+if __name__ == "__main__":
+    main()
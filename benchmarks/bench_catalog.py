@@ -0,0 +1,143 @@
+"""
+Catalog Load: JSON vs compiled columnar file vs SQLite
+Time and Python memory to open the product catalog and its derived facts,
+and to read one page of products, over synthetic catalogs; plus FTS5
+text search on the SQLite catalog vs scanning every product
+
+Usage:
+    python benchmarks/bench_catalog.py --sizes 10000,100000,1000000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from common import make_catalog, save_report
+
+from rag.catalog import compile_catalog, load_catalog, read_source_products
+from rag.catalog_db import build_database, search_terms
+from rag.derived import ProductFactsTable
+
+PAGE_SIZE = 25
+
+# Text searches timed on the SQLite catalog (FTS5) and by scanning
+SEARCH_TEXTS = ["choc", "classic milk", "vanilla cookies", "sesame"]
+
+
+def scan_search(products, text):
+    """Indices whose name, brand or ingredients contain every word (no index)"""
+    terms = search_terms(text)
+    matches = []
+    for index, product in enumerate(products):
+        words = search_terms(" ".join(str(product.get(field, "")) for field in ("name", "brand", "ingredients")))
+        if all(any(word.startswith(term) for word in words) for term in terms):
+            matches.append(index)
+    return matches
+
+
+def measure(function):
+    """
+    Run function once for its time, then again for its peak memory
+
+    Returns:
+        tuple: (seconds, peak MiB allocated by Python)
+    """
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000", help="Comma-separated catalog sizes")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/catalog-<rev>.json)")
+    args = parser.parse_args()
+
+    cases = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for size in [int(value) for value in args.sizes.split(",")]:
+            json_path = os.path.join(folder, f"catalog-{size}.json")
+            compiled_path = os.path.join(folder, f"catalog-{size}.apcat")
+            with open(json_path, "w", encoding="utf-8") as file:
+                json.dump(make_catalog(size), file)
+
+            start = time.perf_counter()
+            compile_catalog(json_path, compiled_path)
+            cases[f"compile/{size}"] = {"seconds": round(time.perf_counter() - start, 3)}
+
+            def open_json():
+                products = load_catalog(json_path)
+                return products, ProductFactsTable.build(products)
+
+            def open_compiled():
+                products = load_catalog(compiled_path)
+                return products, products.facts()
+
+            for name, opener in (("json", open_json), ("compiled", open_compiled)):
+                seconds, peak_mib = measure(opener)
+                products, _ = opener()
+                start = time.perf_counter()
+                products[size // 2:size // 2 + PAGE_SIZE]
+                page_ms = (time.perf_counter() - start) * 1000
+
+                cases[f"{name}/{size}"] = {
+                    "seconds": round(seconds, 4),
+                    "peak_mib": round(peak_mib, 1),
+                    "page_ms": round(page_ms, 3),
+                }
+                print(f"📂 {name:8s} {size:>9,} products: open {seconds * 1000:9.1f} ms, "
+                      f"{peak_mib:8.1f} MiB, one page {page_ms:.3f} ms")
+
+            # SQLite: open, one page, and text search vs a full scan
+            sqlite_path = os.path.join(folder, f"catalog-{size}.sqlite3")
+            start = time.perf_counter()
+            build_database(read_source_products(json_path), sqlite_path)
+            cases[f"sqlite_build/{size}"] = {"seconds": round(time.perf_counter() - start, 3)}
+
+            start = time.perf_counter()
+            catalog = load_catalog(sqlite_path)
+            open_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            catalog[size // 2:size // 2 + PAGE_SIZE]
+            page_ms = (time.perf_counter() - start) * 1000
+            cases[f"sqlite/{size}"] = {"open_ms": round(open_ms, 3), "page_ms": round(page_ms, 3)}
+            print(f"🗄️ sqlite   {size:>9,} products: open {open_ms:9.1f} ms, one page {page_ms:.3f} ms")
+
+            products = load_catalog(json_path)
+            fts_ms, scan_ms = [], []
+            for text in SEARCH_TEXTS:
+                start = time.perf_counter()
+                found = catalog.search_text(text)
+                fts_ms.append((time.perf_counter() - start) * 1000)
+                start = time.perf_counter()
+                scanned = scan_search(products, text)
+                scan_ms.append((time.perf_counter() - start) * 1000)
+                if sorted(found) != scanned:
+                    print(f"⚠️ FTS5 and scan disagree for '{text}': {len(found)} vs {len(scanned)}")
+            cases[f"text_search/{size}"] = {
+                "fts5_mean_ms": round(sum(fts_ms) / len(fts_ms), 3),
+                "scan_mean_ms": round(sum(scan_ms) / len(scan_ms), 3),
+            }
+            print(f"🔎 text search {size:>9,} products: FTS5 {cases[f'text_search/{size}']['fts5_mean_ms']} ms, "
+                  f"scan {cases[f'text_search/{size}']['scan_mean_ms']} ms")
+            catalog.pool.close()
+
+            cases[f"file_mib/{size}"] = {
+                "json": round(os.path.getsize(json_path) / 2**20, 1),
+                "compiled": round(os.path.getsize(compiled_path) / 2**20, 1),
+                "sqlite": round(os.path.getsize(sqlite_path) / 2**20, 1),
+            }
+
+    save_report("catalog", cases, args.output)
+
+
+if __name__ == "__main__":
+    main()
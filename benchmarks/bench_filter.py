@@ -0,0 +1,106 @@
+"""
+Allergen Filter: Bitmask vs String Matching
+"Which products are safe if I avoid X, Y and Z (in category C)?" over
+synthetic catalogs, answered with the bitmask filter and with the old
+per-product extract_allergens() string splitting
+
+Usage:
+    python benchmarks/bench_filter.py
+    python benchmarks/bench_filter.py --sizes 100000,1000000,5000000 --queries 50
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from common import ALLERGENS, CATEGORIES, make_catalog, save_report, summarize, time_calls
+
+from rag.derived import ProductFactsTable, extract_allergens
+from rag.filters import filter_mask, lookup_codes
+from rag.profiles import profile_masks
+
+# Facts are built for at most this many products, then tiled (building
+# millions of rows only measures the build, which is not what we time)
+BUILD_LIMIT = 100_000
+
+
+def tiled_facts(facts, size):
+    """A ProductFactsTable with the columns repeated up to `size` rows"""
+    repeats = -(-size // len(facts))
+    big = ProductFactsTable()
+    big.bits, big.category_of, big.brand_of = facts.bits, facts.category_of, facts.brand_of
+    for column in ("allergen_masks", "trace_masks", "category_codes", "brand_codes"):
+        setattr(big, column, np.tile(getattr(facts, column), repeats)[:size])
+    return big
+
+
+def make_filter_queries(count, seed=11):
+    """(allergens to avoid, categories or None) pairs"""
+    rng = random.Random(seed)
+    return [
+        (rng.sample(ALLERGENS, rng.randint(1, 3)), [rng.choice(CATEGORIES)] if rng.random() < 0.5 else None)
+        for _ in range(count)
+    ]
+
+
+def bitmask_filter(facts, query):
+    avoid, categories = query
+    avoid_mask, trace_mask, _ = profile_masks(facts.bits, avoid)
+    category_codes, _ = lookup_codes(categories, facts.category_of)
+    return np.flatnonzero(filter_mask(facts, avoid_mask, trace_mask, category_codes))
+
+
+def string_filter(products, query):
+    """What the old code would do: split every product's warning text"""
+    avoid, categories = query
+    wanted = {category.lower() for category in categories} if categories else None
+    safe = []
+    for index, product in enumerate(products):
+        if wanted is not None and product["category"].lower() not in wanted:
+            continue
+        allergens = [item.lower() for item in extract_allergens(product.get("allergen_warnings", ""))]
+        if not any(name in allergen for name in avoid for allergen in allergens):
+            safe.append(index)
+    return safe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated catalog sizes")
+    parser.add_argument("--queries", type=int, default=100, help="Filter queries per size")
+    parser.add_argument("--string-limit", type=int, default=100_000,
+                        help="Skip the string baseline above this size (it is slow)")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/filter-<rev>.json)")
+    args = parser.parse_args()
+
+    sizes = [int(value) for value in args.sizes.split(",")]
+    catalog = make_catalog(min(max(sizes), BUILD_LIMIT))
+
+    start = time.perf_counter()
+    base_facts = ProductFactsTable.build(catalog)
+    build_seconds = time.perf_counter() - start
+    print(f"📦 Built facts for {len(catalog)} products in {build_seconds:.2f}s")
+
+    queries = make_filter_queries(args.queries)
+    cases = {"build": {"products": len(catalog), "seconds": round(build_seconds, 3)}}
+
+    for size in sizes:
+        facts = tiled_facts(base_facts, size)
+        print(f"⏱️  bitmask filter @ {size} products...")
+        cases[f"bitmask/{size}"] = summarize(time_calls(lambda query: bitmask_filter(facts, query), queries))
+        print(f"   p50 {cases[f'bitmask/{size}']['p50_ms']} ms")
+
+        if size <= min(args.string_limit, len(catalog)):
+            products = catalog[:size]
+            print(f"⏱️  string filter @ {size} products...")
+            cases[f"string/{size}"] = summarize(
+                time_calls(lambda query: string_filter(products, query), queries[:max(5, args.queries // 10)])
+            )
+            print(f"   p50 {cases[f'string/{size}']['p50_ms']} ms")
+
+    save_report("filter", cases, args.output)
+
+
+if __name__ == "__main__":
+    main()
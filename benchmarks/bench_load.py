@@ -0,0 +1,120 @@
+"""
+FastAPI Load Test
+Fires requests at a running server with a fixed number of concurrent
+clients and reports p50/p95/p99 latency and requests per second
+
+Usage (with the stub LLM so results are repeatable):
+    python benchmarks/stub_ollama.py --latency-ms 200 &
+    OLLAMA_BASE_URL=http://localhost:11435 python backend/main.py &
+    python benchmarks/bench_load.py --concurrency 1,4,16 --requests 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+import aiohttp
+
+from common import REPO_ROOT, save_report, summarize
+
+ALLERGENS = ["milk", "nuts", "soy", "gluten", "sesame"]
+
+
+def load_product_names():
+    """Product names from the real catalog, used as request payloads"""
+    with open(os.path.join(REPO_ROOT, "data", "metadata.json"), "r", encoding="utf-8") as file:
+        return [product["name"] for product in json.load(file)]
+
+
+def build_request(endpoint, rng, names):
+    """
+    Method, path and JSON body for one request
+
+    Returns:
+        tuple: (method, path, body or None)
+    """
+    if endpoint == "analyze":
+        return "POST", "/api/analyze", {"product_name": rng.choice(names), "user_context": ""}
+    if endpoint == "quick-check":
+        return "POST", "/api/quick-check", {"product_name": rng.choice(names), "allergen": rng.choice(ALLERGENS)}
+    if endpoint == "products":
+        return "GET", "/api/products", None
+    raise ValueError(f"Unknown endpoint: {endpoint}")
+
+
+async def run_level(session, base_url, endpoint, concurrency, total_requests, timeout, names):
+    """
+    Send total_requests with `concurrency` clients in flight
+
+    Returns:
+        dict: summarize() result for this endpoint and concurrency
+    """
+    rng = random.Random(f"{endpoint}:{concurrency}")
+    requests = [build_request(endpoint, rng, names) for _ in range(total_requests)]
+    queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+
+    latencies = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        while True:
+            try:
+                method, path, body = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                async with session.request(method, base_url + path, json=body,
+                                           timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    await response.read()
+                    if response.status >= 400:
+                        errors += 1
+                        continue
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    wall = time.perf_counter() - wall_start
+
+    return dict(summarize(latencies, wall_seconds=wall, errors=errors), concurrency=concurrency)
+
+
+async def run(args):
+    names = load_product_names()
+    cases = {}
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for endpoint in args.endpoints.split(","):
+            for concurrency in [int(value) for value in args.concurrency.split(",")]:
+                print(f"⏱️  {endpoint} @ concurrency {concurrency}...")
+                cases[f"{endpoint}/c{concurrency}"] = await run_level(
+                    session, args.url, endpoint, concurrency, args.requests, args.timeout, names
+                )
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="Server base URL")
+    parser.add_argument("--endpoints", default="quick-check,products,analyze",
+                        help="Comma-separated: analyze, quick-check, products")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated client counts")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint and level")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/load-<rev>.json)")
+    args = parser.parse_args()
+
+    cases = asyncio.run(run(args))
+    save_report("load", cases, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Agent Pipeline: sequential vs DAG
+Wall-clock time of one analysis and of every stage, with the two agents
+one after another (baseline) and with the three parallel agent stages
+
+Runs the real crew against the stub Ollama (started here, in-process),
+so the numbers show how much of the LLM wait the DAG overlaps. With a
+real Ollama, set OLLAMA_NUM_PARALLEL to 3 or more, otherwise the server
+queues the parallel requests and the gain disappears.
+
+Usage:
+    python benchmarks/bench_pipeline.py --latency-ms 500 --runs 5
+    python benchmarks/bench_pipeline.py --ollama http://localhost:11434 --runs 3
+"""
+import argparse
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+
+from common import save_report, summarize
+
+# Real catalog products plus one that is not found
+PRODUCTS = ["Oreo Cookies", "Nutella", "Nadec Milk", "Dragon Fruit Crisps"]
+
+
+def start_stub(latency_ms, port=11436):
+    """
+    Run the stub Ollama on a background thread
+
+    Returns:
+        str: Its base URL
+    """
+    from stub_ollama import StubOllamaHandler, StubSettings
+
+    StubSettings.latency_ms = latency_ms
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🤖 Stub Ollama on http://127.0.0.1:{port} (latency {latency_ms} ms)")
+    return f"http://127.0.0.1:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ollama", help="Real Ollama URL (default: in-process stub)")
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="Stub latency per LLM call")
+    parser.add_argument("--runs", type=int, default=5, help="Analyses per product and mode")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/pipeline-<rev>.json)")
+    args = parser.parse_args()
+
+    # The agents read OLLAMA_BASE_URL when they are imported
+    os.environ["OLLAMA_BASE_URL"] = args.ollama or start_stub(args.latency_ms)
+
+    from rag.rag_engine import ProductAnalysisTool
+    from agents.crew import PIPELINE_MODES, PIPELINE_STAGES, ProductAnalysisCrew
+
+    crew = ProductAnalysisCrew(ProductAnalysisTool())
+
+    cases = {}
+    for mode in PIPELINE_MODES:
+        latencies = []
+        stage_ms = {name: [] for name in PIPELINE_STAGES[mode]}
+        stage_sums = []
+        errors = 0
+
+        for product in PRODUCTS * args.runs:
+            start = time.perf_counter()
+            result = crew.analyze_product(product, mode=mode, use_stored=False)
+            latencies.append(time.perf_counter() - start)
+
+            if result.get("degraded") or "timings" not in result:
+                errors += 1
+                continue
+            for name, timing in result["timings"]["stages"].items():
+                stage_ms[name].append(timing["ms"])
+            stage_sums.append(result["timings"]["sequential_ms"])
+
+        cases[mode] = summarize(latencies, errors=errors)
+        cases[mode]["stage_mean_ms"] = {
+            name: round(float(np.mean(values)), 1) for name, values in stage_ms.items() if values
+        }
+        cases[mode]["sum_of_stages_mean_ms"] = round(float(np.mean(stage_sums)), 1) if stage_sums else None
+        print(f"⏱️ {mode:10s} p50 {cases[mode].get('p50_ms', 0):.0f} ms wall, "
+              f"stages add up to {cases[mode]['sum_of_stages_mean_ms']} ms")
+
+    if cases["sequential"].get("p50_ms") and cases["dag"].get("p50_ms"):
+        cases["speedup"] = {"p50": round(cases["sequential"]["p50_ms"] / cases["dag"]["p50_ms"], 2)}
+        print(f"🚀 DAG speedup (p50): {cases['speedup']['p50']}x")
+
+    save_report("pipeline", cases, args.output)
+
+
+if __name__ == "__main__":
+    main()
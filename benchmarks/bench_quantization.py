@@ -0,0 +1,129 @@
+"""
+Quantized Embedding Benchmark
+Compares float32, int8 and product-quantized (pq) embedding storage:
+memory, scoring latency, and accuracy against exact float32 scores
+
+Two parts:
+- Labelled: top-1 accuracy of find_product on benchmarks/labelled_queries.json
+  (real catalog, real model), per storage mode, with and without re-ranking
+- Synthetic: memory, build time, scoring latency and recall@10 of the
+  semantic scores over large synthetic catalogs (HashEncoder)
+
+Usage:
+    python benchmarks/bench_quantization.py
+    python benchmarks/bench_quantization.py --sizes 100000,1000000 --skip-labelled
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from common import HashEncoder, REPO_ROOT, make_catalog, make_queries, save_report, summarize, time_calls
+
+from rag.quantization import STORAGE_MODES, build_embedding_store
+
+LABELLED_QUERIES = os.path.join(REPO_ROOT, "benchmarks", "labelled_queries.json")
+
+# Re-rank settings tried on the labelled set (0 = no re-rank)
+RERANK_SETTINGS = (0, 50)
+
+
+def top_k(scores, k):
+    """Indices of the k highest scores (unordered)"""
+    k = min(k, len(scores))
+    return np.argpartition(-scores, k - 1)[:k]
+
+
+def bench_labelled(cases):
+    """Top-1 accuracy per storage mode on the hand-labelled real queries"""
+    from rag.rag_engine import AccurateProductAnalyzer
+
+    with open(LABELLED_QUERIES, "r", encoding="utf-8") as file:
+        labelled = json.load(file)
+
+    baseline = None
+    for mode in STORAGE_MODES:
+        for rerank in RERANK_SETTINGS:
+            print(f"\n🏷️  Labelled queries: {mode}, re-rank {rerank}...")
+            analyzer = AccurateProductAnalyzer(embedding_storage=mode, rerank_candidates=rerank)
+
+            correct = 0
+            latencies = []
+            for item in labelled:
+                start = time.perf_counter()
+                best_match = analyzer.find_product(item["query"], exact=False)[0]
+                latencies.append(time.perf_counter() - start)
+                if str(best_match["product"]["id"]) == item["expected_id"]:
+                    correct += 1
+
+            accuracy = correct / len(labelled)
+            if baseline is None:
+                baseline = accuracy  # float32 without re-rank is the reference
+
+            cases[f"labelled/{mode}/rerank{rerank}"] = dict(
+                summarize(latencies),
+                top1_accuracy=round(accuracy, 4),
+                accuracy_delta=round(accuracy - baseline, 4),
+                embedding_bytes=analyzer.product_embeddings.nbytes,
+            )
+
+
+def bench_synthetic(size, query_count, cases):
+    """Memory, latency and recall@10 per storage mode for one catalog size"""
+    print(f"\n📦 Encoding synthetic catalog with {size:,} products...")
+    products = make_catalog(size)
+    encoder = HashEncoder()
+    vectors = encoder.encode([f"{p['name']} {p['brand']} {p['category']}" for p in products])
+    queries = [encoder.encode(query) for query in make_queries(products, query_count)]
+
+    exact_store = build_embedding_store(vectors, "float32")
+    exact_top = [set(top_k(exact_store.scores(query), 10)) for query in queries]
+    float_bytes = exact_store.nbytes
+
+    for mode in STORAGE_MODES:
+        print(f"   {mode}...")
+        start = time.perf_counter()
+        store = build_embedding_store(vectors, mode)
+        build_seconds = time.perf_counter() - start
+
+        # recall@10: share of the exact top 10 that the quantized top 10 keeps,
+        # and with re-ranking the quantized top 100 (what float re-rank would see)
+        recall_10 = []
+        recall_100 = []
+        for query, exact in zip(queries, exact_top):
+            scores = store.scores(query)
+            recall_10.append(len(exact & set(top_k(scores, 10))) / len(exact))
+            recall_100.append(len(exact & set(top_k(scores, 100))) / len(exact))
+
+        cases[f"scores/{mode}/{size}"] = dict(
+            summarize(time_calls(store.scores, queries)),
+            build_seconds=round(build_seconds, 3),
+            embedding_bytes=store.nbytes,
+            bytes_per_product=round(store.nbytes / size, 1),
+            memory_saved_percent=round((1 - store.nbytes / float_bytes) * 100, 1),
+            recall_at_10=round(float(np.mean(recall_10)), 4),
+            recall_10_in_100=round(float(np.mean(recall_100)), 4),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000", help="Comma-separated synthetic catalog sizes")
+    parser.add_argument("--queries", type=int, default=50, help="Queries per synthetic catalog")
+    parser.add_argument("--skip-labelled", action="store_true", help="Skip the real-model labelled run")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/quantization-<rev>.json)")
+    args = parser.parse_args()
+
+    cases = {}
+    if not args.skip_labelled:
+        bench_labelled(cases)
+    for size in [int(value) for value in args.sizes.split(",")]:
+        bench_synthetic(size, args.queries, cases)
+
+    save_report("quantization", cases, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Search and Scoring Micro-Benchmarks
+Times AccurateProductAnalyzer.find_product and the scoring helpers
+over synthetic catalogs (1k to 1M products)
+
+Usage:
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --sizes 1000,10000,100000,1000000 --queries 50
+"""
+import argparse
+import time
+
+from common import HashEncoder, make_catalog, make_queries, save_report, summarize, time_calls
+
+from rag.rag_engine import AccurateProductAnalyzer
+from rag.derived import ProductFactsTable
+
+
+def bench_size(size, query_count, cases):
+    """Run every case for one catalog size"""
+    print(f"\n📦 Building synthetic catalog with {size:,} products...")
+    products = make_catalog(size)
+    queries = make_queries(products, query_count)
+
+    start = time.perf_counter()
+    analyzer = AccurateProductAnalyzer(products=products, search_model=HashEncoder())
+    cases[f"analyzer_build/{size}"] = {"count": 1, "seconds": round(time.perf_counter() - start, 3)}
+
+    # Whole-catalog derived fields (allergens, risk, ethics)
+    start = time.perf_counter()
+    ProductFactsTable.build(products)
+    elapsed = time.perf_counter() - start
+    cases[f"facts_table_build/{size}"] = {
+        "count": 1,
+        "seconds": round(elapsed, 3),
+        "products_per_second": round(size / elapsed, 1) if elapsed else None,
+    }
+
+    # Per-query retrieval
+    latencies = time_calls(analyzer.find_product, queries)
+    cases[f"find_product/{size}"] = summarize(latencies)
+
+    latencies = time_calls(analyzer.analyze_product, queries)
+    cases[f"analyze_product/{size}"] = summarize(latencies)
+
+    # Scoring helpers, one call per product
+    sample = products[:min(size, 20000)]
+    latencies = time_calls(
+        lambda product: analyzer.calculate_risk_level(
+            analyzer.extract_allergens(product["allergen_warnings"]), product["ingredients"]
+        ),
+        sample
+    )
+    cases[f"calculate_risk_level/{size}"] = summarize(latencies)
+
+    latencies = time_calls(lambda product: analyzer.calculate_ethical_score(product["ethical_notes"]), sample)
+    cases[f"calculate_ethical_score/{size}"] = summarize(latencies)
+
+    latencies = time_calls(
+        lambda pair: analyzer._calculate_name_similarity(pair[0], pair[1]["name"]),
+        list(zip(queries * (len(sample) // max(len(queries), 1) + 1), sample))
+    )
+    cases[f"name_similarity/{size}"] = summarize(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated catalog sizes")
+    parser.add_argument("--queries", type=int, default=100, help="Queries per catalog size")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/search-<rev>.json)")
+    args = parser.parse_args()
+
+    cases = {}
+    for size in [int(value) for value in args.sizes.split(",")]:
+        bench_size(size, args.queries, cases)
+
+    save_report("search", cases, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+API Serialization: JSONResponse vs orjson vs cached bytes
+CPU time per request to send the product listing and an analysis report,
+the way the API did before and after backend/responses.py
+
+A small FastAPI app (no engine, no LLM) serves the same payloads both
+ways; TestClient calls it in-process, and time.process_time() counts the
+CPU of the whole request, so the difference is the encoding.
+
+Usage:
+    python benchmarks/bench_serialization.py --sizes 1000,10000 --requests 50
+"""
+import argparse
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from common import HashEncoder, make_catalog, save_report, summarize
+
+from agents.schemas import ProductReport
+from rag.rag_engine import AccurateProductAnalyzer
+from responses import JSON_ENCODER, FastJSONResponse, ResponseCache, model_response
+
+
+def build_app(products, report):
+    """Routes that serve one listing and one report, old way and new way"""
+    app = FastAPI()
+    cache = ResponseCache(lambda: 0)
+
+    def payload():
+        return {"success": True, "total_products": len(products), "products": list(products)}
+
+    # Before: the standard library encoder on every request
+    @app.get("/before/products")
+    async def products_before():
+        return JSONResponse(content=payload())
+
+    @app.get("/before/report", response_model=ProductReport)
+    async def report_before():
+        return report
+
+    # After: orjson, the encoded listing cached, the model dumped once
+    @app.get("/after/products/uncached")
+    async def products_uncached():
+        return FastJSONResponse(content=payload())
+
+    @app.get("/after/products")
+    async def products_after():
+        return cache.response("products", payload)
+
+    @app.get("/after/report")
+    async def report_after():
+        return model_response(report)
+
+    return app
+
+
+def measure(client, path, requests):
+    """
+    CPU and wall time of repeated GETs
+
+    Returns:
+        dict: summarize() of the latencies plus cpu_ms per request and bytes
+    """
+    body = client.get(path).content  # warm-up (and fills the cache)
+
+    latencies = []
+    cpu_start = time.process_time()
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(path)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    cpu_ms = (time.process_time() - cpu_start) * 1000.0 / requests
+
+    summary = summarize(latencies)
+    summary["cpu_ms"] = round(cpu_ms, 3)
+    summary["bytes"] = len(body)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000", help="Catalog sizes for the listing")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per case")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/serialization-<rev>.json)")
+    args = parser.parse_args()
+
+    print(f"🧾 Encoder: {JSON_ENCODER}")
+
+    # One real analysis report (its size does not depend on the catalog)
+    analyzer = AccurateProductAnalyzer(products=make_catalog(200), search_model=HashEncoder())
+    report = ProductReport.from_analysis(analyzer.analyze_product(analyzer.all_products[0]["name"]))
+
+    cases = {}
+    for size in [int(value) for value in args.sizes.split(",")]:
+        products = make_catalog(size)
+        client = TestClient(build_app(products, report))
+
+        for name, path in [("before", "/before/products"),
+                           ("after_uncached", "/after/products/uncached"),
+                           ("after_cached", "/after/products")]:
+            case = f"products_{size}_{name}"
+            cases[case] = measure(client, path, args.requests)
+            print(f"📦 {case:32s} {cases[case]['cpu_ms']:9.3f} ms CPU, "
+                  f"p50 {cases[case]['p50_ms']} ms, {cases[case]['bytes'] / 1e6:.2f} MB")
+
+    client = TestClient(build_app([], report))
+    for name, path in [("before", "/before/report"), ("after", "/after/report")]:
+        case = f"report_{name}"
+        cases[case] = measure(client, path, args.requests * 10)
+        print(f"📝 {case:32s} {cases[case]['cpu_ms']:9.3f} ms CPU, p50 {cases[case]['p50_ms']} ms")
+
+    save_report("serialization", cases, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Startup-Time Benchmarks
+Measures cold start in fresh interpreters: imports, analyzer build
+(from the catalog and from the engine snapshot), shared engine and the
+full FastAPI app
+
+Set ALLERPREDICT_CATALOG to time a bigger catalog.
+
+Usage:
+    python benchmarks/bench_startup.py --repeat 3
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+from common import BACKEND_DIR, save_report, summarize
+
+# Each step runs in its own interpreter so nothing is already cached
+STEPS = {
+    "import_rag_engine": "import rag.rag_engine",
+    "import_crew": "import agents.crew",
+    "analyzer_build": (
+        "import os\n"
+        "os.environ['ALLERPREDICT_SNAPSHOT'] = ''\n"
+        "from rag.rag_engine import AccurateProductAnalyzer\n"
+        "AccurateProductAnalyzer()"
+    ),
+    "analyzer_from_snapshot": (
+        "from rag.rag_engine import AccurateProductAnalyzer\n"
+        "AccurateProductAnalyzer()"
+    ),
+    "engine_ready": "from engine import get_engine\nget_engine()",
+    "fastapi_app_ready": "import main",
+}
+
+RUNNER = """
+import sys, time, json
+sys.path.insert(0, {backend!r})
+start = time.perf_counter()
+exec(compile({code!r}, "<step>", "exec"))
+print("@@RESULT@@" + json.dumps(time.perf_counter() - start))
+"""
+
+# Steps run once untimed first (writes the engine snapshot if missing or stale)
+WARMUP_STEPS = {"analyzer_from_snapshot"}
+
+
+def run_step(code):
+    """
+    Run one step in a fresh interpreter
+
+    Returns:
+        float: Seconds taken by the step (interpreter start excluded)
+    """
+    completed = subprocess.run(
+        [sys.executable, "-c", RUNNER.format(backend=BACKEND_DIR, code=code)],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    for line in completed.stdout.splitlines():
+        if line.startswith("@@RESULT@@"):
+            return json.loads(line[len("@@RESULT@@"):])
+
+    raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else "step failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh runs per step")
+    parser.add_argument("--steps", default=",".join(STEPS), help="Comma-separated steps to run")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/startup-<rev>.json)")
+    args = parser.parse_args()
+
+    cases = {}
+    for name in args.steps.split(","):
+        latencies, errors = [], 0
+        if name in WARMUP_STEPS:
+            try:
+                run_step(STEPS[name])
+            except RuntimeError as error:
+                print(f"❌ {name} warm-up: {error}")
+        for _ in range(args.repeat):
+            try:
+                latencies.append(run_step(STEPS[name]))
+            except RuntimeError as error:
+                print(f"❌ {name}: {error}")
+                errors += 1
+        cases[name] = summarize(latencies, errors=errors)
+
+    save_report("startup", cases, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Tool Output Size: compact vs json vs full
+Estimated prompt tokens of the analysis tool's report for every product
+in the real catalog, per format; optionally real prompt-eval time on Ollama
+
+Usage:
+    python benchmarks/bench_tool_output.py
+    python benchmarks/bench_tool_output.py --ollama http://localhost:11434 --model mistral --samples 5
+"""
+import argparse
+import json
+import time
+import urllib.request
+
+import numpy as np
+
+from common import HashEncoder, save_report
+
+from rag.rag_engine import AccurateProductAnalyzer
+from rag.report_format import TOOL_FORMATS, estimate_tokens, format_report, report_fields
+
+# Queries that should not match anything (the "not found" report)
+MISSING_QUERIES = ["Dragon Fruit Crisps", "Moon Cheese Bites", "Zzz Energy Drink"]
+
+
+def check_fields(result, query, text):
+    """Names of fields whose value is missing from a report (case-insensitive)"""
+    missing = []
+    text = text.lower()
+    for key, value in report_fields(result, query).items():
+        values = value if isinstance(value, list) else [value]
+        for item in values:
+            if isinstance(item, str) and item and item.lower() not in text:
+                missing.append(key)
+    return missing
+
+
+def ollama_prompt_eval(url, model, text):
+    """
+    Prompt tokens and prompt-eval seconds for one tool report on Ollama
+
+    Returns:
+        tuple: (prompt tokens, seconds)
+    """
+    body = json.dumps({
+        "model": model,
+        "prompt": f"Tool result:\n{text}\n\nList the allergens.",
+        "stream": False,
+        "options": {"num_predict": 1},
+    }).encode()
+    request = urllib.request.Request(f"{url}/api/generate", data=body, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=300) as response:
+        reply = json.load(response)
+    return reply.get("prompt_eval_count", 0), reply.get("prompt_eval_duration", 0) / 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ollama", help="Ollama URL for real prompt token counts (optional)")
+    parser.add_argument("--model", default="mistral")
+    parser.add_argument("--samples", type=int, default=5, help="Products sent to Ollama per format")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/tool_output-<rev>.json)")
+    args = parser.parse_args()
+
+    analyzer = AccurateProductAnalyzer(search_model=HashEncoder())
+    queries = [product["name"] for product in analyzer.all_products] + MISSING_QUERIES
+    results = [(query, analyzer.analyze_product(query)) for query in queries]
+
+    cases = {}
+    for style in TOOL_FORMATS:
+        texts = [format_report(result, query, style) for query, result in results]
+        tokens = np.array([estimate_tokens(text) for text in texts])
+
+        # Every format must keep every value
+        incomplete = [query for (query, result), text in zip(results, texts) if check_fields(result, query, text)]
+
+        cases[style] = {
+            "count": len(texts),
+            "mean_tokens": round(float(tokens.mean()), 1),
+            "p95_tokens": round(float(np.percentile(tokens, 95)), 1),
+            "max_tokens": int(tokens.max()),
+            "mean_bytes": round(float(np.mean([len(text.encode("utf-8")) for text in texts])), 1),
+            "incomplete_reports": len(incomplete),
+        }
+        print(f"📏 {style:8s} mean ≈{cases[style]['mean_tokens']} tokens, "
+              f"max {cases[style]['max_tokens']}, incomplete {len(incomplete)}")
+
+        if args.ollama:
+            measured = [ollama_prompt_eval(args.ollama, args.model, text) for text in texts[:args.samples]]
+            cases[style]["ollama_prompt_tokens"] = round(float(np.mean([count for count, _ in measured])), 1)
+            cases[style]["ollama_prompt_eval_ms"] = round(float(np.mean([seconds for _, seconds in measured])) * 1000, 1)
+            print(f"   Ollama: {cases[style]['ollama_prompt_tokens']} prompt tokens, "
+                  f"{cases[style]['ollama_prompt_eval_ms']} ms prompt eval")
+
+    start = time.perf_counter()
+    for query, result in results:
+        format_report(result, query, "compact")
+    cases["format_seconds_per_report"] = {"seconds": round((time.perf_counter() - start) / len(results), 6)}
+
+    save_report("tool_output", cases, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Shared Benchmark Helpers
+Synthetic catalogs, a fast stand-in encoder, and latency reports
+"""
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import zlib
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(REPO_ROOT, "backend")
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+# Let benchmark scripts import backend modules the same way main.py does
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+# === Synthetic catalog ===
+
+BRANDS = ["Almarai", "Nadec", "Oreo", "PepsiCo", "Nestle", "Ferrero", "Kellogg", "Tiffany",
+          "Al-Arz", "Canaan", "Juhayna", "Mars", "Lipton", "Safi", "Al Reef", "Galaxy"]
+CATEGORIES = ["Snacks", "Beverage", "Dairy", "Spreads", "Cookies", "Juice", "Chocolate",
+              "Oils", "Tea", "Grains", "Cheese", "Nuts"]
+PRODUCT_WORDS = ["Classic", "Original", "Chocolate", "Vanilla", "Hazelnut", "Cheese", "Milk",
+                 "Orange", "Crunchy", "Smooth", "Spicy", "Light", "Organic", "Mini", "Family",
+                 "Honey", "Sesame", "Peanut", "Almond", "Yogurt", "Cola", "Biscuit", "Wafer"]
+INGREDIENTS = ["sugar", "wheat flour", "palm oil", "cocoa", "soy lecithin", "milk powder",
+               "hazelnuts", "peanuts", "sesame seeds", "salt", "whey", "egg", "almonds",
+               "carbonated water", "caramel color", "citric acid", "may contain traces of nuts"]
+ALLERGENS = ["gluten", "soy", "milk", "nuts", "peanuts", "sesame", "egg", "fish", "citrus"]
+ETHICAL_NOTES = [
+    "",
+    "Certified fair trade cocoa and sustainable packaging.",
+    "Faced criticism over palm oil sourcing.",
+    "Accused of child labor in its supply chain; ongoing investigation.",
+    "Organic ingredients, generally good reputation.",
+    "Some controversy about water usage.",
+]
+
+
+def make_catalog(size, seed=42):
+    """
+    Build a deterministic synthetic catalog shaped like data/metadata.json
+
+    Args:
+        size: Number of products
+        seed: Random seed (same seed, same catalog)
+
+    Returns:
+        list: Product dicts
+    """
+    rng = random.Random(seed)
+    products = []
+    for index in range(size):
+        brand = rng.choice(BRANDS)
+        words = rng.sample(PRODUCT_WORDS, rng.randint(1, 3))
+        name = f"{brand} {' '.join(words)} {index}"
+        ingredients = rng.sample(INGREDIENTS, rng.randint(2, 6))
+        allergens = rng.sample(ALLERGENS, rng.randint(0, 4))
+        products.append({
+            "id": str(index),
+            "name": name,
+            "category": rng.choice(CATEGORIES),
+            "brand": brand,
+            "description": f"{' '.join(words)} product by {brand}.",
+            "ingredients": ", ".join(ingredients),
+            "allergen_warnings": ", ".join(allergens),
+            "ethical_notes": rng.choice(ETHICAL_NOTES),
+            "recommendations": f"{rng.choice(BRANDS)} {rng.choice(PRODUCT_WORDS)}, "
+                               f"{rng.choice(BRANDS)} {rng.choice(PRODUCT_WORDS)}",
+        })
+    return products
+
+
+def make_queries(products, count, seed=7):
+    """
+    Pick realistic search strings: exact names, lowercase names and typos
+
+    Returns:
+        list: Query strings
+    """
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        name = rng.choice(products)["name"]
+        style = rng.random()
+        if style < 0.4:
+            queries.append(name)
+        elif style < 0.7:
+            queries.append(name.lower())
+        else:
+            position = rng.randrange(len(name))
+            queries.append(name[:position] + name[position + 1:])
+    return queries
+
+
+class HashEncoder:
+    """
+    Deterministic stand-in for SentenceTransformer('all-MiniLM-L6-v2')
+
+    Hashes character trigrams into a 384-dimensional unit vector. It has no
+    semantic quality; it exists so search benchmarks over huge catalogs
+    measure our code, not the transformer.
+    """
+
+    dimension = 384
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        if isinstance(sentences, str):
+            return self._encode_one(sentences)
+        return np.stack([self._encode_one(text) for text in sentences]) if sentences else \
+            np.zeros((0, self.dimension), dtype=np.float32)
+
+    def _encode_one(self, text):
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        padded = f"  {text.lower()}  "
+        for position in range(len(padded) - 2):
+            bucket = zlib.crc32(padded[position:position + 3].encode())
+            vector[bucket % self.dimension] += 1.0 if bucket & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+# === Timing and reports ===
+
+def time_calls(function, arguments, warmup=3):
+    """
+    Call function once per argument and time each call
+
+    Returns:
+        list: Latencies in seconds
+    """
+    for argument in arguments[:warmup]:
+        function(argument)
+
+    latencies = []
+    for argument in arguments:
+        start = time.perf_counter()
+        function(argument)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(latencies, wall_seconds=None, errors=0):
+    """
+    Latency percentiles and throughput for one benchmark case
+
+    Args:
+        latencies: Per-call latencies in seconds
+        wall_seconds: Total elapsed time (defaults to the sum of latencies)
+        errors: Number of failed calls
+
+    Returns:
+        dict: count, errors, rps, mean/p50/p95/p99/max in milliseconds
+    """
+    if not latencies:
+        return {"count": 0, "errors": errors}
+
+    values = np.array(latencies) * 1000.0
+    wall = wall_seconds if wall_seconds else float(np.sum(latencies))
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / wall, 2) if wall else None,
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def git_revision():
+    """Short commit hash of the working tree (or 'unknown')"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_report(suite, cases, output=None):
+    """
+    Write a benchmark report that compare.py can diff across commits
+
+    Args:
+        suite: Benchmark name (e.g. "search")
+        cases: dict of case name -> summarize() result (plus any extras)
+        output: Optional file path (default: benchmarks/results/<suite>-<rev>.json)
+
+    Returns:
+        str: Path of the written report
+    """
+    revision = git_revision()
+    report = {
+        "suite": suite,
+        "revision": revision,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cases": cases,
+    }
+
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{suite}-{revision}.json")
+
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+    print_cases(suite, cases)
+    print(f"\n📄 Report saved to {output}")
+    return output
+
+
+def print_cases(suite, cases):
+    """Print one line per case with the headline numbers"""
+    print(f"\n=== {suite} ===")
+    print(f"{'case':<40} {'count':>7} {'rps':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for name, result in cases.items():
+        print(
+            f"{name:<40} {result.get('count', '-'):>7} {str(result.get('rps', '-')):>10} "
+            f"{str(result.get('p50_ms', '-')):>10} {str(result.get('p95_ms', '-')):>10} "
+            f"{str(result.get('p99_ms', '-')):>10}"
+        )
@@ -0,0 +1,68 @@
+"""
+Compare Two Benchmark Reports
+Shows p50/p95/p99 and RPS side by side with the relative change
+
+Usage:
+    python benchmarks/compare.py benchmarks/results/search-abc123.json benchmarks/results/search-def456.json
+"""
+import argparse
+import json
+
+METRICS = ("rps", "p50_ms", "p95_ms", "p99_ms", "seconds")
+
+# Changes smaller than this are reported as noise
+NOISE_PERCENT = 5.0
+
+
+def load(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def change_percent(before, after):
+    if not before:
+        return None
+    return (after - before) / before * 100.0
+
+
+def verdict(metric, percent):
+    """'better', 'worse' or '' (within noise); higher RPS is better, lower latency is better"""
+    if percent is None or abs(percent) < NOISE_PERCENT:
+        return ""
+    better = percent > 0 if metric == "rps" else percent < 0
+    return "✅ better" if better else "❌ worse"
+
+
+def compare(baseline, candidate):
+    print(f"Baseline:  {baseline['suite']} @ {baseline['revision']} ({baseline['timestamp']})")
+    print(f"Candidate: {candidate['suite']} @ {candidate['revision']} ({candidate['timestamp']})\n")
+    print(f"{'case':<40} {'metric':<8} {'before':>12} {'after':>12} {'change':>9}")
+
+    for name, after_case in candidate["cases"].items():
+        before_case = baseline["cases"].get(name)
+        if before_case is None:
+            print(f"{name:<40} (new case)")
+            continue
+
+        for metric in METRICS:
+            if metric not in after_case or metric not in before_case:
+                continue
+            before, after = before_case[metric], after_case[metric]
+            if before is None or after is None:
+                continue
+            percent = change_percent(before, after)
+            shown = f"{percent:+.1f}%" if percent is not None else "n/a"
+            print(f"{name:<40} {metric:<8} {before:>12} {after:>12} {shown:>9} {verdict(metric, percent)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", help="Report from the older commit")
+    parser.add_argument("candidate", help="Report from the newer commit")
+    args = parser.parse_args()
+
+    compare(load(args.baseline), load(args.candidate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Deterministic Stub Ollama Server
+Answers /api/generate and /api/chat with fixed text after a configurable delay,
+so load tests measure our server instead of the LLM
+
+Usage:
+    python benchmarks/stub_ollama.py --port 11435 --latency-ms 200 --jitter-ms 50
+    OLLAMA_BASE_URL=http://localhost:11435 python backend/main.py
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubSettings:
+    """Latency settings shared by all handler threads"""
+    latency_ms = 200.0
+    jitter_ms = 0.0
+    chunks = 4
+    seed = 1234
+    requests_served = 0
+    lock = threading.Lock()
+
+
+def make_answer(prompt):
+    """
+    Fixed answer for a prompt
+
+    Uses CrewAI's ReAct format so agents finish in a single step.
+    The same prompt always gets the same text.
+    """
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+    return (
+        "Thought: I now know the final answer\n"
+        f"Final Answer: Stub report {digest}. "
+        "Detected Allergens: see structured data. Risk Level: see structured data. "
+        "Ethical Score: see structured data. Alternatives: see structured data."
+    )
+
+
+def delay_seconds(prompt):
+    """Latency for one request: base plus deterministic jitter from the prompt"""
+    jitter = 0.0
+    if StubSettings.jitter_ms:
+        rng = random.Random(f"{StubSettings.seed}:{prompt}")
+        jitter = rng.uniform(-StubSettings.jitter_ms, StubSettings.jitter_ms)
+    return max(0.0, StubSettings.latency_ms + jitter) / 1000.0
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Implements the parts of the Ollama API that LangChain uses"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": "mistral:latest"}]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path == "/api/generate":
+            prompt = payload.get("prompt", "")
+        elif self.path == "/api/chat":
+            prompt = "\n".join(message.get("content", "") for message in payload.get("messages", []))
+        else:
+            self._send_json({"error": "not found"}, status=404)
+            return
+
+        with StubSettings.lock:
+            StubSettings.requests_served += 1
+
+        answer = make_answer(prompt)
+        time.sleep(delay_seconds(prompt))
+
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion_tokens = max(1, len(answer) // 4)
+        final = {
+            "model": payload.get("model", "mistral"),
+            "done": True,
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": completion_tokens,
+        }
+
+        if payload.get("stream", True):
+            self._send_stream(self.path, answer, final)
+        else:
+            self._send_json(dict(final, **self._content(self.path, answer)))
+
+    def _content(self, path, text):
+        if path == "/api/chat":
+            return {"message": {"role": "assistant", "content": text}}
+        return {"response": text}
+
+    def _send_stream(self, path, answer, final):
+        """Send the answer as NDJSON chunks like the real server"""
+        size = max(1, len(answer) // StubSettings.chunks + 1)
+        lines = [
+            json.dumps(dict(self._content(path, answer[start:start + size]), done=False))
+            for start in range(0, len(answer), size)
+        ]
+        lines.append(json.dumps(dict(final, **self._content(path, ""))))
+        body = ("\n".join(lines) + "\n").encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port=11435, latency_ms=200.0, jitter_ms=0.0, host="127.0.0.1"):
+    """
+    Start the stub server (blocks)
+
+    Args:
+        port: Port to listen on (the real Ollama uses 11434)
+        latency_ms: Base delay per request
+        jitter_ms: +/- deterministic jitter per prompt
+    """
+    StubSettings.latency_ms = latency_ms
+    StubSettings.jitter_ms = jitter_ms
+
+    server = ThreadingHTTPServer((host, port), StubOllamaHandler)
+    print(f"🤖 Stub Ollama on http://{host}:{port} (latency {latency_ms}±{jitter_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {StubSettings.requests_served} requests")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    serve(args.port, args.latency_ms, args.jitter_ms, args.host)
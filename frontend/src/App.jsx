@@ -1,8 +1,16 @@
 import React, { useState, useRef, useEffect } from 'react'
 
+// Shown when the backend is not reachable
+const FALLBACK_PRODUCTS = [
+  { name: 'Nutella Hazelnut Spread', brand: 'Ferrero', category: 'Spreads' },
+  { name: 'Coca-Cola Classic', brand: 'Coca-Cola', category: 'Beverages' },
+  { name: 'Lay\'s Potato Chips', brand: 'PepsiCo', category: 'Snacks' },
+  { name: 'Oreo Cookies', brand: 'Mondelez', category: 'Cookies' },
+  { name: 'Kind Dark Chocolate', brand: 'Kind LLC', category: 'Bars' }
+]
+
 export default function App() {
   const [messages, setMessages] = useState([])
-  const [products, setProducts] = useState([])
   const [filteredProducts, setFilteredProducts] = useState([])
   const [input, setInput] = useState('')
   const [search, setSearch] = useState('')
@@ -13,40 +21,29 @@ export default function App() {
 
   useEffect(() => { scrollToBottom() }, [messages])
 
-  useEffect(() => {
-    const endpoint = useAgenticMode ? "/api/v2/products" : "/products"
-    
-    fetch(`http://localhost:8000${endpoint}`)
-      .then(res => res.json())
-      .then(data => {
-        const productList = data.products || data
-        setProducts(productList)
-        setFilteredProducts(productList)
-      })
-      .catch(err => {
-        console.error("Error loading products:", err)
-        const fallback = [
-          { name: 'Nutella Hazelnut Spread', brand: 'Ferrero', category: 'Spreads' },
-          { name: 'Coca-Cola Classic', brand: 'Coca-Cola', category: 'Beverages' },
-          { name: 'Lay\'s Potato Chips', brand: 'PepsiCo', category: 'Snacks' },
-          { name: 'Oreo Cookies', brand: 'Mondelez', category: 'Cookies' },
-          { name: 'Kind Dark Chocolate', brand: 'Kind LLC', category: 'Bars' }
-        ]
-        setProducts(fallback)
-        setFilteredProducts(fallback)
-      })
-  }, [useAgenticMode])
-
   const scrollToBottom = () => {
     chatEndRef.current?.scrollIntoView({ behavior: 'smooth' })
   }
 
+  // Ask the backend for matching products on every keystroke
+  // (an empty search returns the most popular products)
   useEffect(() => {
-    const filtered = products.filter(p =>
-      p.name.toLowerCase().includes(search.toLowerCase())
-    )
-    setFilteredProducts(filtered)
-  }, [search, products])
+    const controller = new AbortController()
+    const limit = search ? 20 : 50
+
+    fetch(`http://localhost:8000/api/suggest?q=${encodeURIComponent(search)}&limit=${limit}`, { signal: controller.signal })
+      .then(res => res.json())
+      .then(data => setFilteredProducts(data.suggestions || []))
+      .catch(err => {
+        if (err.name === 'AbortError') return
+        console.error("Error loading suggestions:", err)
+        setFilteredProducts(FALLBACK_PRODUCTS.filter(p =>
+          p.name.toLowerCase().includes(search.toLowerCase())
+        ))
+      })
+
+    return () => controller.abort()
+  }, [search])
 
   const analyzeProduct = async (productName) => {
     const userMessage = { type: 'user', text: productName }
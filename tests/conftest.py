@@ -0,0 +1,34 @@
+"""
+Test Setup
+Lets the tests import backend modules the same way main.py does, plus the
+synthetic catalog and stand-in encoder of benchmarks/common.py
+"""
+import json
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(REPO_ROOT, "backend")
+BENCHMARKS_DIR = os.path.join(REPO_ROOT, "benchmarks")
+
+for folder in (BENCHMARKS_DIR, BACKEND_DIR):
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
+
+
+@pytest.fixture
+def products():
+    """A small synthetic catalog (make_catalog), with string values"""
+    from common import make_catalog
+    from rag.catalog import normalize_products
+    return normalize_products(make_catalog(120))
+
+
+@pytest.fixture
+def catalog_json(tmp_path, products):
+    """The products written as a metadata.json file"""
+    path = tmp_path / "metadata.json"
+    path.write_text(json.dumps(products), encoding="utf-8")
+    return str(path)
@@ -0,0 +1,92 @@
+"""
+Overload Protection
+Admission limits and the circuit breaker's state machine
+"""
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, CircuitBreaker, Overloaded
+
+
+def test_admission_queues_then_rejects():
+    async def scenario():
+        admission = AdmissionController(max_in_flight=1, max_waiting=1, wait_seconds=5)
+        await admission.acquire()
+
+        waiter = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0)
+        assert admission.stats()["waiting"] == 1
+
+        # The waiting line is full: turned away at once
+        with pytest.raises(Overloaded):
+            await admission.acquire()
+
+        admission.release()
+        await waiter
+        assert admission.stats()["in_flight"] == 1
+        assert admission.stats()["waiting"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_admission_wait_times_out():
+    async def scenario():
+        admission = AdmissionController(max_in_flight=1, max_waiting=1, wait_seconds=0.05)
+        async with admission.slot():
+            with pytest.raises(Overloaded):
+                await admission.acquire()
+        assert admission.stats()["in_flight"] == 0
+        assert admission.stats()["waiting"] == 0
+
+    asyncio.run(scenario())
+
+
+def open_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    breaker.record_failure("timeout")
+    assert breaker.state == "closed"
+    breaker.record_failure("timeout")
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = open_breaker()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.stats()["last_error"] == "timeout"
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_trial_through():
+    breaker = open_breaker()
+    breaker.opened_at -= 60  # The reset time has passed
+
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()  # Only one trial at a time
+
+    # A cancelled trial frees the slot without a verdict
+    breaker.release_trial()
+    assert breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_trial_opens_again():
+    breaker = open_breaker()
+    breaker.opened_at -= 60
+    assert breaker.allow()
+
+    breaker.record_failure("still down")
+    assert breaker.state == "open"
+    assert not breaker.allow()
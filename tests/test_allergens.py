@@ -0,0 +1,52 @@
+"""
+Allergen Lexicon
+Regression cases for words that look like an allergen but are not one
+"""
+import pytest
+
+from rag.allergens import LEXICON
+
+
+@pytest.mark.parametrize("text, expected", [
+    # A bare "flour" says nothing about wheat
+    ("rice flour", set()),
+    ("corn flour", set()),
+    ("buckwheat flour", set()),
+    ("almond flour", {"tree nuts"}),
+    ("wheat flour", {"gluten", "wheat"}),
+    ("plain flour", {"gluten", "wheat"}),
+    # Free-from phrases exclude the allergen they name
+    ("nut-free chocolate", set()),
+    ("non-dairy creamer", set()),
+    ("egg-free dressing", set()),
+    ("dairy free", set()),
+    ("free from milk and eggs", set()),
+    ("free of peanuts, tree nuts", set()),
+    # ...but not the rest of the text
+    ("lactose-free milk", {"milk"}),
+    ("nut-free, whey powder", {"milk"}),
+    # Plant milks are their source allergen, not milk
+    ("soy milk", {"soy"}),
+    ("almond milk", {"tree nuts"}),
+    ("oat milk, sugar", {"gluten"}),
+    ("dairy-free almond milk", {"tree nuts"}),
+    ("rice milk", set()),
+    ("coconut milk", set()),
+    # Oats inside a longer word
+    ("oatmeal", {"gluten"}),
+    ("oat flour", {"gluten"}),
+])
+def test_canonical(text, expected):
+    assert LEXICON.canonical(text) == expected
+
+
+def test_ingredient_list_with_other_flours():
+    result = LEXICON.analyze("rice flour, corn flour, sugar, non-dairy creamer, may contain nuts")
+    assert result["inferred"] == []
+    assert result["traces"] == ["tree nuts"]
+
+
+def test_plant_milk_is_new_when_only_milk_is_declared():
+    result = LEXICON.analyze("water, almond milk, sugar", declared=["milk"])
+    assert result["inferred"] == ["tree nuts"]
+    assert result["new"] == ["tree nuts"]
@@ -0,0 +1,80 @@
+"""
+Compiled Product Catalog
+The mapped file reads back like the JSON list, upserts included
+"""
+import numpy as np
+import pytest
+
+from rag.catalog import ColumnarCatalog, compile_catalog, load_catalog
+from rag.derived import ProductFactsTable
+
+
+@pytest.fixture
+def compiled(tmp_path, catalog_json):
+    path = str(tmp_path / "catalog.bin")
+    compile_catalog(catalog_json, path)
+    return path
+
+
+def test_round_trip(compiled, products):
+    catalog = load_catalog(compiled)
+    assert isinstance(catalog, ColumnarCatalog)
+    assert len(catalog) == len(products)
+    assert list(catalog) == products
+    assert catalog[-1] == products[-1]
+    assert catalog[10:13] == products[10:13]
+
+
+def test_facts_match_a_fresh_build(compiled, products):
+    stored = ColumnarCatalog(compiled).facts()
+    built = ProductFactsTable.build(products)
+    for name in ("risk_codes", "ethical_scores", "allergen_masks", "trace_masks", "category_codes"):
+        assert np.array_equal(getattr(stored, name), getattr(built, name)), name
+    assert list(stored.allergens) == [tuple(values) for values in built.allergens]
+    assert stored.bits.names == built.bits.names
+
+
+def test_changes_stay_in_memory(compiled, products):
+    catalog = ColumnarCatalog(compiled)
+    renamed = dict(products[5], name="Renamed Bar")
+    added = dict(products[0], id="new", name="Brand New Bar", brand="Nobody")
+    catalog[5] = renamed
+    catalog.append(added)
+
+    assert catalog[5] == renamed
+    assert catalog[len(products)] == added
+    names, brands = catalog.names_and_brands()
+    assert names[5] == "Renamed Bar"
+    assert (names[-1], brands[-1]) == ("Brand New Bar", "Nobody")
+    assert names[:5] == [product["name"] for product in products[:5]]
+
+    # The file itself is unchanged
+    assert ColumnarCatalog(compiled)[5] == products[5]
+
+
+def test_wrong_file_is_rejected(catalog_json):
+    with pytest.raises(ValueError):
+        ColumnarCatalog(catalog_json)
+
+
+def test_upsert_matches_the_json_backend(compiled, products):
+    pytest.importorskip("crewai_tools")
+    from common import HashEncoder
+    from rag.rag_engine import AccurateProductAnalyzer
+
+    renamed = dict(products[7], name="Renamed Wafer", ingredients="wheat flour, milk powder")
+    added = dict(products[3], id="added-1", name="Added Sesame Bar", ingredients="sesame seeds, sugar")
+
+    results = []
+    for source in ([dict(product) for product in products], ColumnarCatalog(compiled)):
+        analyzer = AccurateProductAnalyzer(products=source, search_model=HashEncoder())
+        indices = (analyzer.upsert_product(renamed), analyzer.upsert_product(added))
+        results.append((
+            indices,
+            [analyzer.analyze_product(query)["detected_allergens"] for query in ("Renamed Wafer", "Added Sesame Bar")],
+            [match["index"] for match in analyzer.find_product("renamed wafr", exact=False)],
+        ))
+
+    assert results[0] == results[1]
+    assert results[0][0] == (7, len(products))
+    assert "sesame" in results[0][1][1]
@@ -0,0 +1,92 @@
+"""
+SQLite Product Catalog
+Rows, search tables and upserts agree with the JSON backend
+"""
+import threading
+
+import pytest
+
+from rag.catalog import load_catalog
+from rag.catalog_db import SQLiteCatalog, build_database
+
+
+@pytest.fixture
+def database(tmp_path, products):
+    path = str(tmp_path / "catalog.sqlite3")
+    build_database(products, path)
+    return path
+
+
+def test_round_trip(database, products):
+    catalog = load_catalog(database)
+    assert isinstance(catalog, SQLiteCatalog)
+    assert len(catalog) == len(products)
+    assert list(catalog) == products
+    assert catalog[-1] == products[-1]
+    assert catalog[10:16:2] == products[10:16:2]
+    with pytest.raises(IndexError):
+        catalog[len(products)]
+
+
+def test_names_and_brands(database, products):
+    names, brands = SQLiteCatalog(database).names_and_brands()
+    assert names == [product["name"] for product in products]
+    assert brands == [product["brand"] for product in products]
+
+
+def test_writes_update_every_table(database, products):
+    catalog = SQLiteCatalog(database)
+    catalog[4] = dict(products[4], name="Zesty Lupin Crackers", ingredients="lupin flour, salt")
+    index = len(catalog)
+    catalog.append(dict(products[0], id="new", name="Zesty Tahini Bar", ingredients="tahini, sugar"))
+
+    assert catalog[4]["name"] == "Zesty Lupin Crackers"
+    assert sorted(catalog.search_text("zesty")) == [4, index]
+    assert 4 in catalog.containing_allergens(["lupin"])
+    assert index in catalog.containing_allergens(["sesame"])
+    assert catalog.names_and_brands()[0][index] == "Zesty Tahini Bar"
+
+    # The old name is gone from the full-text index
+    assert 4 not in catalog.search_text(products[4]["name"])
+
+
+def test_concurrent_writers(database, products):
+    catalog = SQLiteCatalog(database)
+
+    def write(number):
+        catalog[number] = dict(products[number], name=f"Rewritten {number}")
+        catalog.append(dict(products[number], id=f"extra-{number}", name=f"Extra {number}"))
+
+    threads = [threading.Thread(target=write, args=(number,)) for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(catalog) == len(products) + 8
+    names = catalog.names_and_brands()[0]
+    assert sorted(names[len(products):]) == sorted(f"Extra {number}" for number in range(8))
+    assert names[:8] == [f"Rewritten {number}" for number in range(8)]
+
+
+def test_browse_and_upsert_match_the_json_backend(database, products):
+    pytest.importorskip("crewai_tools")
+    from common import HashEncoder
+    from rag.rag_engine import AccurateProductAnalyzer
+
+    added = dict(products[3], id="added-1", name="Added Sesame Bar", ingredients="sesame seeds, sugar")
+
+    results = []
+    for source in ([dict(product) for product in products], SQLiteCatalog(database)):
+        analyzer = AccurateProductAnalyzer(products=source, search_model=HashEncoder())
+        index = analyzer.upsert_product(added)
+        page = analyzer.browse_products(text="added", avoid=["peanuts"], limit=10)
+        results.append((
+            index,
+            [product["name"] for product in page["products"]],
+            analyzer.browse_products(category="snacks", avoid=["milk"])["total"],
+            [match["index"] for match in analyzer.find_product("added sesame", exact=False)],
+        ))
+
+    assert results[0] == results[1]
+    assert results[0][1] == ["Added Sesame Bar"]
@@ -0,0 +1,88 @@
+"""
+Async Crew Runs
+Stored answers skip admission; a timed-out run is counted once by the breaker
+"""
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("crewai")
+pytest.importorskip("langchain_community")
+
+from admission import AdmissionController, CircuitBreaker, Overloaded
+from agents.crew import ProductAnalysisCrew
+from reports import ReportStore
+
+
+class FakeAnalyzer:
+    def __init__(self):
+        self.lookups = 0
+
+    def analyze_product(self, product_query):
+        self.lookups += 1
+        return {
+            "found": False,
+            "message": f"Product '{product_query}' not found in database.",
+            "similar_products": []
+        }
+
+
+class FakeTool:
+    def __init__(self):
+        self.analyzer = FakeAnalyzer()
+
+
+@pytest.fixture
+def crew():
+    return ProductAnalysisCrew(FakeTool(), reports=ReportStore(":memory:"))
+
+
+def agent_output():
+    return {
+        "analysis": "safe", "recommendations": "none", "full_report": "safe",
+        "agents_used": ["Product Safety Analyst"], "token_usage": {}
+    }
+
+
+def test_stored_answer_needs_no_admission_slot(crew, monkeypatch):
+    monkeypatch.setattr(crew, "stored_analysis", lambda *args, **kwargs: {"success": True, "pregenerated": True})
+
+    async def scenario():
+        # No slot and no waiting line: any acquire is turned away
+        admission = AdmissionController(max_in_flight=1, max_waiting=0)
+        await admission.acquire()
+        result = await crew.analyze_product_async("Oreo Cookies", admission=admission)
+        with pytest.raises(Overloaded):
+            await crew.analyze_product_async("Oreo Cookies", "I have a nut allergy", admission=admission)
+        return result
+
+    assert asyncio.run(scenario())["pregenerated"]
+
+
+def test_timeout_is_one_failure_and_reuses_the_lookup(crew, monkeypatch):
+    crew.breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    finish = threading.Event()
+
+    def slow_agents(agent_query, clock, check_cancelled):
+        finish.wait(5)
+        return agent_output()  # Finishes without another agent step
+
+    monkeypatch.setattr(crew, "run_sequential", slow_agents)
+    monkeypatch.setattr("agents.crew.PIPELINE_MODE", "sequential")
+
+    async def scenario():
+        admission = AdmissionController(max_in_flight=1)
+        result = await crew.analyze_product_async("Oreo Cookies", timeout=0.1, admission=admission)
+        assert admission.in_flight == 1  # The thread still runs
+        finish.set()
+        while admission.in_flight:
+            await asyncio.sleep(0.01)
+        return result
+
+    result = asyncio.run(scenario())
+
+    assert result["degraded_reason"] == "llm_timeout"
+    assert crew.analysis_tool.analyzer.lookups == 1
+    # The late success does not close the breaker the timeout opened
+    assert crew.breaker.stats()["state"] == "open"
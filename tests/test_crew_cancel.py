@@ -0,0 +1,114 @@
+"""
+Crew Cancellation
+A cancel must stop the analysis it was meant for, also after earlier runs
+"""
+import threading
+
+import pytest
+
+pytest.importorskip("crewai")
+pytest.importorskip("langchain_community")
+
+from agents import crew as crew_module
+from agents.crew import AnalysisCancelled, ProductAnalysisCrew
+from reports import ReportStore
+
+
+class FakeAgent:
+    """Just the agent state a crew touches"""
+
+    def __init__(self, role):
+        self.role = role
+        self.step_callback = None
+        self.crew = None
+
+
+class FakeTask:
+    def __init__(self, description, agent, expected_output, context=None, callback=None):
+        self.agent = agent
+        self.callback = callback
+
+
+class FakeCrew:
+    """
+    Runs its tasks without an LLM, three agent steps each
+
+    Like CrewAI 0.35.8, kickoff only sets agent.step_callback when the
+    agent has none yet.
+    """
+    # Called at the start of every kickoff (a test sets a cancel event here)
+    on_kickoff = None
+
+    def __init__(self, agents, tasks, process, step_callback=None, verbose=False):
+        self.agents = agents
+        self.tasks = tasks
+        self.step_callback = step_callback
+
+    def kickoff(self):
+        for agent in self.agents:
+            if agent.step_callback is None:
+                agent.step_callback = self.step_callback
+            agent.crew = self
+
+        if FakeCrew.on_kickoff is not None:
+            FakeCrew.on_kickoff()
+
+        output = ""
+        for task in self.tasks:
+            for step in range(3):
+                task.agent.step_callback(step)
+            output = f"{task.agent.role} done"
+            task.output = output
+            if task.callback is not None:
+                task.callback(output)
+        return output
+
+
+class FakeAnalyzer:
+    def analyze_product(self, product_query):
+        return {
+            "found": False,
+            "message": f"Product '{product_query}' not found in database.",
+            "similar_products": []
+        }
+
+
+class FakeTool:
+    analyzer = FakeAnalyzer()
+
+
+@pytest.fixture
+def crew(monkeypatch):
+    monkeypatch.setattr(crew_module, "Crew", FakeCrew)
+    monkeypatch.setattr(crew_module, "Task", FakeTask)
+    monkeypatch.setattr(FakeCrew, "on_kickoff", None)
+    monkeypatch.setattr(ProductAnalysisCrew, "create_agents", lambda self: {
+        "safety": FakeAgent("Product Safety Analyst"),
+        "recommendation": FakeAgent("Product Recommendation Specialist"),
+        "ethics": FakeAgent("Ethics Analyst"),
+    })
+    return ProductAnalysisCrew(FakeTool(), reports=ReportStore(":memory:"))
+
+
+@pytest.mark.parametrize("mode", ["sequential", "dag"])
+def test_cancel_after_an_earlier_analysis(crew, mode):
+    first = crew.analyze_product("Oreo Cookies", cancel_event=threading.Event(), mode=mode)
+    assert first["success"] and not first.get("degraded")
+
+    # The second run is cancelled once its agents have started
+    cancel_event = threading.Event()
+    FakeCrew.on_kickoff = cancel_event.set
+    with pytest.raises(AnalysisCancelled):
+        crew.analyze_product("Oreo Cookies", cancel_event=cancel_event, mode=mode)
+
+
+@pytest.mark.parametrize("mode", ["sequential", "dag"])
+def test_cancelled_run_does_not_stop_later_ones(crew, mode):
+    cancel_event = threading.Event()
+    FakeCrew.on_kickoff = cancel_event.set
+    with pytest.raises(AnalysisCancelled):
+        crew.analyze_product("Oreo Cookies", cancel_event=cancel_event, mode=mode)
+
+    FakeCrew.on_kickoff = None
+    result = crew.analyze_product("Oreo Cookies", cancel_event=threading.Event(), mode=mode)
+    assert result["success"] and not result.get("degraded")
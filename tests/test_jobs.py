@@ -0,0 +1,140 @@
+"""
+Analysis Job Queue
+Lanes, idempotency keys, recovery after a restart and TTL cleanup
+"""
+import threading
+
+import pytest
+
+from jobs import MAX_ATTEMPTS, JobQueue
+
+
+def succeed(product_query, user_context, progress_callback, cancel_event):
+    return {"success": True, "analysis": f"ok {product_query}"}
+
+
+class BlockingRunner:
+    """Bulk jobs wait for `release`; interactive ones finish at once"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def __call__(self, product_query, user_context, progress_callback, cancel_event):
+        if product_query.startswith("bulk"):
+            self.release.wait(5)
+        return {"success": True}
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    queues = []
+
+    def make(runner=succeed, **settings):
+        queue = JobQueue(runner, path=str(tmp_path / "jobs.sqlite3"), **settings)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.close()
+
+
+def test_interactive_job_runs_while_bulk_jobs_hold_the_workers(make_queue):
+    runner = BlockingRunner()
+    queue = make_queue(runner, workers=2)
+    queue.start()
+    try:
+        first = queue.submit("bulk 1", lane="bulk")
+        second = queue.submit("bulk 2", lane="bulk")
+        interactive = queue.submit("Oreo Cookies")
+
+        assert queue.wait(interactive["job_id"], 5)["status"] == "succeeded"
+        # Bulk may use every worker but one: the second bulk job still waits
+        assert queue.get(first["job_id"])["status"] == "running"
+        assert queue.get(second["job_id"])["status"] == "queued"
+    finally:
+        runner.release.set()
+    assert queue.wait(second["job_id"], 5)["status"] == "succeeded"
+
+
+def test_interactive_lane_is_claimed_first(make_queue):
+    queue = make_queue()
+    queue.submit("bulk 1", lane="bulk")
+    interactive = queue.submit("Oreo Cookies")
+    assert interactive["queue_position"] == 0
+
+    with queue.lock:
+        assert queue._claim()["id"] == interactive["job_id"]
+
+
+def test_unknown_lane_is_rejected(make_queue):
+    with pytest.raises(ValueError):
+        make_queue().submit("Oreo Cookies", lane="urgent")
+
+
+def test_idempotency_key_returns_the_same_job(make_queue):
+    queue = make_queue()
+    first = queue.submit("Oreo Cookies", idempotency_key="order-1")
+    again = queue.submit("Oreo Cookies", idempotency_key="order-1")
+    other = queue.submit("Oreo Cookies", idempotency_key="order-2")
+
+    assert again["job_id"] == first["job_id"]
+    assert other["job_id"] != first["job_id"]
+
+
+def test_expired_idempotency_key_starts_a_new_job(make_queue):
+    queue = make_queue(ttl_seconds=-1)
+    first = queue.submit("Oreo Cookies", idempotency_key="order-1")
+    queue.cancel(first["job_id"])  # Finished, and already past its TTL
+
+    again = queue.submit("Oreo Cookies", idempotency_key="order-1")
+    assert again["job_id"] != first["job_id"]
+    assert again["status"] == "queued"
+
+
+def test_running_jobs_are_requeued_after_a_restart(make_queue):
+    queue = make_queue()
+    job = queue.submit("Oreo Cookies")
+    with queue.lock:
+        queue._claim()  # Running when the server "stops"
+    queue.database.close()
+
+    restarted = make_queue()
+    recovered = restarted.get(job["job_id"])
+    assert recovered["status"] == "queued"
+    assert recovered["attempts"] == 1
+
+    restarted.start()
+    assert restarted.wait(job["job_id"], 5)["status"] == "succeeded"
+
+
+def test_job_that_keeps_stopping_the_server_fails(make_queue):
+    queue = make_queue()
+    job = queue.submit("Oreo Cookies")
+    queue.database.execute(
+        "UPDATE jobs SET status = 'running', attempts = ? WHERE id = ?", (MAX_ATTEMPTS, job["job_id"])
+    )
+    queue.database.close()
+
+    recovered = make_queue().get(job["job_id"])
+    assert recovered["status"] == "failed"
+    assert "too many times" in recovered["error"]
+
+
+def test_finished_jobs_are_deleted_after_their_ttl(make_queue):
+    queue = make_queue(ttl_seconds=-1)
+    job = queue.submit("Oreo Cookies")
+    queue.cancel(job["job_id"])
+    assert queue.get(job["job_id"]) is None  # Hidden once expired
+
+    with queue.lock:
+        queue._cleanup(force=True)
+    assert queue.database.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+
+
+def test_cancel_queued_job(make_queue):
+    queue = make_queue()
+    job = queue.submit("Oreo Cookies")
+    cancelled = queue.cancel(job["job_id"])
+    assert cancelled["status"] == "cancelled"
+    assert queue.cancel("no-such-job") is None
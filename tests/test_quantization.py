@@ -0,0 +1,71 @@
+"""
+Quantized Embedding Storage
+int8 and product-quantized scores rank like the exact float32 scores
+"""
+import numpy as np
+import pytest
+
+from common import HashEncoder, make_catalog, make_queries
+from rag.quantization import (
+    Float32Store, Int8Store, ProductQuantizedStore, build_embedding_store,
+)
+
+
+@pytest.fixture(scope="module")
+def embeddings():
+    products = make_catalog(1000)
+    encoder = HashEncoder()
+    vectors = encoder.encode([f"{product['name']} {product['description']}" for product in products])
+    queries = [encoder.encode(query) for query in make_queries(products, 40)]
+    return vectors, queries
+
+
+@pytest.fixture(scope="module")
+def stores(embeddings):
+    vectors, _ = embeddings
+    return {"int8": Int8Store(vectors), "pq": ProductQuantizedStore(vectors)}
+
+
+def recall(exact, store, queries, k=10, candidates=10):
+    """Share of the exact top k found in the store's top `candidates`"""
+    found = 0
+    for query in queries:
+        wanted = set(np.argsort(-exact.scores(query))[:k])
+        found += len(wanted & set(np.argsort(-store.scores(query))[:candidates]))
+    return found / (k * len(queries))
+
+
+@pytest.mark.parametrize("mode, minimum", [("int8", 0.95), ("pq", 0.8)])
+def test_recall_against_float32(embeddings, stores, mode, minimum):
+    vectors, queries = embeddings
+    assert recall(Float32Store(vectors), stores[mode], queries) >= minimum
+
+
+def test_pq_candidates_cover_the_exact_top_10(embeddings, stores):
+    # What float re-ranking relies on: the exact top 10 sit in the top 50
+    vectors, queries = embeddings
+    assert recall(Float32Store(vectors), stores["pq"], queries, candidates=50) >= 0.98
+
+
+def test_quantized_stores_are_smaller(embeddings, stores):
+    vectors, _ = embeddings
+    assert stores["int8"].nbytes * 3 < vectors.astype(np.float32).nbytes
+    assert stores["pq"].codes.nbytes * 30 < vectors.astype(np.float32).nbytes
+
+
+@pytest.mark.parametrize("mode", ["float32", "int8", "pq"])
+def test_upsert_replaces_and_appends(embeddings, mode):
+    vectors, queries = embeddings
+    store = build_embedding_store(vectors[:300], mode)
+
+    store.upsert(5, queries[0])
+    store.upsert(len(store), queries[1])
+
+    assert len(store) == 301
+    assert int(np.argmax(store.scores(queries[0]))) == 5
+    assert int(np.argmax(store.scores(queries[1]))) == 300
+
+
+def test_unknown_storage_mode():
+    with pytest.raises(ValueError):
+        build_embedding_store(np.ones((2, 4), dtype=np.float32), "int4")
@@ -0,0 +1,36 @@
+"""
+Structured Report Schemas
+contains_allergen compares allergens, not substrings
+"""
+import pytest
+
+from agents.schemas import ProductReport
+
+
+def report(detected, inferred=()):
+    return ProductReport(found=True, detected_allergens=list(detected), inferred_allergens=list(inferred))
+
+
+@pytest.mark.parametrize("detected, allergen, expected", [
+    # Derivatives and more specific names of the same allergen
+    (["hazelnuts"], "tree nuts", True),
+    (["tree nuts"], "nuts", True),
+    (["whey"], "milk", True),
+    (["dairy"], "milk", True),
+    (["wheat"], "gluten", True),
+    # Substrings that are another allergen, or none
+    (["peanuts"], "nuts", False),
+    (["shellfish"], "fish", False),
+    (["eggplant"], "egg", False),
+    (["peanuts"], "peanut", True),
+    # Labels outside the lexicon: whole words only
+    (["citrus fruits"], "citrus", True),
+    (["citrus"], "rus", False),
+])
+def test_contains_allergen(detected, allergen, expected):
+    assert report(detected).contains_allergen(allergen) is expected
+
+
+def test_inferred_allergens_count():
+    assert report([], inferred=["soy"]).contains_allergen("soya lecithin")
+    assert not report([]).contains_allergen("  ")
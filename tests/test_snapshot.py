@@ -0,0 +1,112 @@
+"""
+Engine Snapshot
+A snapshot is only used when it matches the catalog, model, code and bytes
+"""
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("crewai_tools")
+
+from common import HashEncoder
+from rag import snapshot as snapshot_module
+from rag.encoders import search_model_id
+from rag.rag_engine import AccurateProductAnalyzer
+from rag.snapshot import StaleSnapshot, open_snapshot
+
+MODEL_ID = search_model_id(HashEncoder())
+
+
+@pytest.fixture
+def snapshot_path(tmp_path, catalog_json):
+    """A snapshot written by an analyzer built from catalog_json"""
+    path = str(tmp_path / "engine.snapshot")
+    AccurateProductAnalyzer(data_file_path=catalog_json, search_model=HashEncoder(), snapshot_path=path)
+    return path
+
+
+def test_fresh_snapshot_is_used(snapshot_path, catalog_json, products):
+    snapshot = open_snapshot(snapshot_path, catalog_json, MODEL_ID)
+    assert len(snapshot.catalog) == len(products)
+
+    analyzer = AccurateProductAnalyzer(data_file_path=catalog_json, search_model=HashEncoder(),
+                                       snapshot_path=snapshot_path)
+    assert analyzer.all_products.path == snapshot_path  # Opened from the snapshot, not rebuilt
+    assert analyzer.find_product(products[9]["name"])[0]["index"] == 9
+    assert analyzer.search(products[9]["name"], 3)
+
+
+def test_other_model_is_stale(snapshot_path, catalog_json):
+    with pytest.raises(StaleSnapshot, match="model"):
+        open_snapshot(snapshot_path, catalog_json, "all-MiniLM-L6-v2/torch")
+
+
+def test_other_format_version_is_stale(snapshot_path, catalog_json, monkeypatch):
+    monkeypatch.setattr(snapshot_module, "SNAPSHOT_VERSION", snapshot_module.SNAPSHOT_VERSION + 1)
+    with pytest.raises(StaleSnapshot, match="format"):
+        open_snapshot(snapshot_path, catalog_json, MODEL_ID)
+
+
+def test_changed_code_is_stale(snapshot_path, catalog_json, monkeypatch):
+    monkeypatch.setattr(snapshot_module, "code_fingerprint", lambda: "0" * 64)
+    with pytest.raises(StaleSnapshot, match="code"):
+        open_snapshot(snapshot_path, catalog_json, MODEL_ID)
+
+
+def test_changed_catalog_is_stale(snapshot_path, catalog_json, products):
+    changed = [dict(product) for product in products]
+    changed[0]["name"] = "Something Else"
+    with open(catalog_json, "w", encoding="utf-8") as file:
+        json.dump(changed, file)
+
+    with pytest.raises(StaleSnapshot, match="changed"):
+        open_snapshot(snapshot_path, catalog_json, MODEL_ID)
+
+
+def test_touched_but_identical_catalog_is_fresh(snapshot_path, catalog_json):
+    with open(catalog_json, "r", encoding="utf-8") as file:
+        content = file.read()
+    with open(catalog_json, "w", encoding="utf-8") as file:
+        file.write(content)
+
+    open_snapshot(snapshot_path, catalog_json, MODEL_ID)  # SHA-256 still matches
+
+
+def test_damaged_section_fails_its_checksum(snapshot_path, catalog_json):
+    snapshot = open_snapshot(snapshot_path, catalog_json, MODEL_ID)
+    offset = snapshot.catalog.header["sections"]["embeddings"]["offset"]
+    del snapshot
+
+    with open(snapshot_path, "r+b") as file:
+        file.seek(offset + 16)
+        byte = file.read(1)
+        file.seek(offset + 16)
+        file.write(bytes([byte[0] ^ 0xFF]))
+
+    with pytest.raises(StaleSnapshot, match="checksum mismatch in embeddings"):
+        open_snapshot(snapshot_path, catalog_json, MODEL_ID)
+    open_snapshot(snapshot_path, catalog_json, MODEL_ID, verify_checksums=False)
+
+
+def test_stale_snapshot_is_rebuilt(snapshot_path, catalog_json, products):
+    changed = [dict(product) for product in products]
+    changed[0]["name"] = "Something Else"
+    with open(catalog_json, "w", encoding="utf-8") as file:
+        json.dump(changed, file)
+
+    analyzer = AccurateProductAnalyzer(data_file_path=catalog_json, search_model=HashEncoder(),
+                                       snapshot_path=snapshot_path)
+    assert analyzer.all_products[0]["name"] == "Something Else"
+
+    # The rewritten snapshot is current again
+    snapshot = open_snapshot(snapshot_path, catalog_json, MODEL_ID)
+    assert snapshot.catalog[0]["name"] == "Something Else"
+    assert np.allclose(np.linalg.norm(snapshot.embeddings(), axis=1), 1.0, atol=1e-5)
+
+
+def test_unreadable_file_is_stale(tmp_path, catalog_json):
+    path = tmp_path / "engine.snapshot"
+    path.write_bytes(b"not a snapshot")
+    with pytest.raises(StaleSnapshot):
+        open_snapshot(str(path), catalog_json, MODEL_ID)